@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Benchmark the controller engine against the recording gamepad backend.
+
+Runs GamepadController's movement loop (and, as a separate scenario, the
+anti-AFK loop) for 1, 5, 10 and 20 concurrent controllers on a private
+TickScheduler, with RecordingBackend in place of vgamepad. Every run is a
+fresh subprocess, so CPU time and peak memory are not shared between runs.
+
+Reports achieved ticks/s, update() calls/s, report interval percentiles and
+jitter, scheduler timer wakeups/s, CPU time per controller and peak memory,
+as JSON.
+
+    python benchmarks/bench_controllers.py --duration 10 --output before.json
+"""
+
+import argparse
+import functools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SCENARIOS = ("movement", "anti_afk")
+DEFAULT_COUNTS = (1, 5, 10, 20)
+
+# Settings overrides per scenario: one movement phase spans the whole run
+# and the anti-AFK interval is shortened so it does real work.
+OVERRIDES = {
+    "movement": {
+        "min_movement_duration": 3600.0,
+        "max_movement_duration": 3600.0,
+    },
+    "anti_afk": {
+        "anti_afk_interval": 0.5,
+        "delay_between_buttons": 0.1,
+    },
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_single(scenario, count, duration, workers, trace_memory=False):
+    """Run one scenario in this process and return its measurements
+
+    tracemalloc slows every allocation, so Python heap tracing is opt-in;
+    peak RSS is always reported.
+    """
+    from config_schema import ControllerSettings
+    from gamepad_backends import RecordingBackend
+    from gamepad_control import GamepadController
+    from tick_scheduler import TickScheduler
+
+    scheduler = TickScheduler(workers=workers, name="bench")
+    settings = ControllerSettings(**OVERRIDES[scenario])
+    # Ring buffer sized to keep every report of the run (at most ~1 per tick)
+    backend_factory = functools.partial(RecordingBackend, capacity=int(duration * 200) + 1024)
+    if trace_memory:
+        tracemalloc.start()
+
+    controllers = []
+    for i in range(count):
+        controller = GamepadController(f"bench{i + 1}", scheduler=scheduler,
+                                       backend_factory=backend_factory, settings=settings)
+        controller.connect()
+        controller.start()
+        controllers.append(controller)
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    wakeups_start = scheduler.wakeups
+    for controller in controllers:
+        if scenario == "movement":
+            controller.toggle_movement()
+        else:
+            controller.toggle_anti_afk()
+    time.sleep(duration)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    wakeups = scheduler.wakeups - wakeups_start
+
+    peak_traced = None
+    if trace_memory:
+        _, peak_traced = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    scheduler_stats = scheduler.stats()["total"]
+
+    ticks = sum(controller.tick_count for controller in controllers)
+    updates = 0
+    intervals = []
+    for controller in controllers:
+        backend = controller.gamepad
+        retained = min(backend.count, backend.capacity)
+        stamps = [backend.timestamps[n % backend.capacity]
+                  for n in range(backend.count - retained, backend.count)]
+        intervals.extend(b - a for a, b in zip(stamps, stamps[1:]))
+        updates += backend.count
+    for controller in controllers:
+        controller.disconnect()
+    scheduler.shutdown()
+
+    intervals.sort()
+    mean = sum(intervals) / len(intervals) if intervals else 0.0
+    jitter = (sum((i - mean) ** 2 for i in intervals) / len(intervals)) ** 0.5 if intervals else 0.0
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {
+        "scenario": scenario,
+        "controllers": count,
+        "duration_s": round(wall, 3),
+        "ticks_per_s": round(ticks / wall, 1),
+        "ticks_per_s_per_controller": round(ticks / wall / count, 1),
+        "updates_per_s": round(updates / wall, 1),
+        "interval_ms": {
+            "mean": round(mean * 1000, 3),
+            "p50": round(percentile(intervals, 0.50) * 1000, 3),
+            "p90": round(percentile(intervals, 0.90) * 1000, 3),
+            "p99": round(percentile(intervals, 0.99) * 1000, 3),
+            "max": round(intervals[-1] * 1000, 3) if intervals else 0.0,
+            "jitter": round(jitter * 1000, 3),
+        },
+        "wakeups_per_s": round(wakeups / wall, 1),
+        "scheduler_lag_ms": {
+            "avg": round(scheduler_stats["lag_avg_ms"], 3),
+            "max": round(scheduler_stats["lag_max_ms"], 3),
+        },
+        "cpu_s": round(cpu, 3),
+        "cpu_percent": round(cpu / wall * 100, 1),
+        "cpu_ms_per_controller_s": round(cpu / wall / count * 1000, 2),
+        "peak_traced_kb": round(peak_traced / 1024, 1) if peak_traced is not None else None,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_kb": peak_rss_kb,
+    }
+
+
+def run_isolated(scenario, count, duration, workers, trace_memory, seed):
+    """Run one scenario in a fresh interpreter"""
+    args = [sys.executable, os.path.abspath(__file__), "--single", scenario, str(count),
+            "--duration", str(duration), "--workers", str(workers)]
+    if trace_memory:
+        args.append("--trace-memory")
+    env = dict(os.environ, NIZUA_LOG_LEVEL="WARNING")
+    if seed is not None:
+        # Each controller derives its random stream seed from this one
+        env["NIZUA_RANDOM_SEED"] = str(seed)
+    output = subprocess.run(args, check=True, capture_output=True, text=True, env=env).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--controllers", type=int, nargs="+", default=list(DEFAULT_COUNTS))
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--workers", type=int, default=2, help="scheduler worker threads")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also report the peak Python heap (tracemalloc, slows the run)")
+    parser.add_argument("--seed", type=int, help="base random seed, for runs that replay the same inputs")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--single", nargs=2, metavar=("SCENARIO", "COUNT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        scenario, count = args.single
+        print(json.dumps(run_single(scenario, int(count), args.duration, args.workers, args.trace_memory)))
+        return
+
+    results = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "duration_s": args.duration,
+            "workers": args.workers,
+            "trace_memory": args.trace_memory,
+            "seed": args.seed,
+        },
+        "runs": [],
+    }
+    for scenario in args.scenarios:
+        for count in args.controllers:
+            run = run_isolated(scenario, count, args.duration, args.workers, args.trace_memory, args.seed)
+            results["runs"].append(run)
+            print(f"{scenario:9} x{count:<3} {run['ticks_per_s']:>8} ticks/s "
+                  f"{run['updates_per_s']:>8} updates/s {run['wakeups_per_s']:>7} wakeups/s  "
+                  f"p99 {run['interval_ms']['p99']} ms  "
+                  f"cpu {run['cpu_percent']}%", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
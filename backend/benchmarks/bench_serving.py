@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Compare the Flask development server (--dev) with the production server.
+
+Starts backend/server.py in each mode on a spare port with the recording
+gamepad backend, then runs concurrent HTTP/1.1 clients against a read
+endpoint and reports throughput and latency percentiles as JSON.
+
+    python benchmarks/bench_serving.py --clients 1 8 32 --duration 5
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_SCRIPT = os.path.join(BACKEND_DIR, "server.py")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(dev, port, workdir):
+    args = [sys.executable, SERVER_SCRIPT, "--port", str(port)]
+    if dev:
+        args.append("--dev")
+    env = dict(os.environ, NIZUA_GAMEPAD_BACKEND="recording")
+    process = subprocess.Popen(args, cwd=workdir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/status")
+            conn.getresponse().read()
+            conn.close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+def client(port, path, stop_at, latencies, errors):
+    """Issue requests back to back, reusing the connection while the server allows it"""
+    conn = None
+    while time.perf_counter() < stop_at:
+        if conn is None:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        started = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - started)
+            if response.will_close:
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException):
+            errors.append(1)
+            conn.close()
+            conn = None
+    if conn is not None:
+        conn.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_load(port, path, clients, duration):
+    latencies, errors = [], []
+    stop_at = time.perf_counter() + duration
+    threads = [threading.Thread(target=client, args=(port, path, stop_at, latencies, errors))
+               for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p90_ms": round(percentile(latencies, 0.90) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--path", default="/api/controller/status-all")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
+
+    results = {"path": args.path, "duration": args.duration, "modes": {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode, dev in (("dev", True), ("production", False)):
+            port = free_port()
+            process = start_server(dev, port, workdir)
+            try:
+                run_load(port, args.path, 1, 1.0)  # Warm-up
+                results["modes"][mode] = [run_load(port, args.path, clients, args.duration)
+                                          for clients in args.clients]
+            finally:
+                process.terminate()
+                process.wait(timeout=15)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Benchmark tick jitter with controllers in-process vs. spread over shards.
+
+Runs the movement loop of 20 lobbies (by default) with the recording
+backend, either in this process (--shards 0, the default server mode) or in
+1..N shard processes through ShardedControllerPool. Meanwhile a few threads
+in the coordinating process serialize status payloads in a loop, standing
+in for HTTP request handlers competing for the GIL.
+
+Every report is captured with input_trace (NIZUA_TRACE_DIR); jitter is
+computed from the recorded report intervals. Each configuration runs in a
+fresh interpreter.
+
+    python benchmarks/bench_shards.py --shards 0 1 4 --duration 10 --output shards.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+DEFAULT_SHARDS = (0, 1, 4)
+# One movement phase spans the whole run
+OVERRIDES = {
+    "min_movement_duration": 3600.0,
+    "max_movement_duration": 3600.0,
+}
+# Reports in the first second (connect, warm-up) are left out
+WARMUP = 1.0
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def make_pool(shards, lobbies, settings):
+    from controller_pool import ControllerPool
+    from controller_shards import ShardedControllerPool
+    from gamepad_control import GamepadController
+    from input_trace import backend_factory_for
+    from tick_scheduler import TickScheduler
+
+    if shards > 0:
+        return ShardedControllerPool(shards, lambda: settings, max_controllers=lobbies), None
+    scheduler = TickScheduler(workers=2, name="bench")
+
+    def create(lobby_id):
+        return GamepadController(lobby_id, scheduler=scheduler,
+                                 backend_factory=backend_factory_for(lobby_id), settings=settings)
+
+    return ControllerPool(create, max_controllers=lobbies), scheduler
+
+
+def coordinator_load(stop, counter):
+    """Serialize a status-all sized payload in a loop, like a busy request handler"""
+    payload = {f"lobby{i}": {"connected": True, "movement_enabled": True, "anti_afk_enabled": False,
+                             "phase": "movement", "last_error": None, "controller_id": i,
+                             "tick_rate": {"target_hz": 100.0, "achieved_hz": 99.8, "ticks": 12345}}
+               for i in range(1, 21)}
+    done = 0
+    while not stop.is_set():
+        json.dumps(payload)
+        done += 1
+    counter.append(done)
+
+
+def run_single(shards, lobbies, duration, load_threads):
+    """Run one configuration in this process and return its measurements"""
+    trace_dir = tempfile.mkdtemp(prefix="nizua-bench-")
+    os.environ["NIZUA_TRACE_DIR"] = trace_dir
+    os.environ["NIZUA_GAMEPAD_BACKEND"] = "recording"
+    from concurrent.futures import ThreadPoolExecutor
+    from config_schema import ControllerSettings
+    from input_trace import TraceReader
+
+    settings = ControllerSettings(**OVERRIDES)
+    pool, scheduler = make_pool(shards, lobbies, settings)
+    if shards > 0:
+        pool.start()
+    lobby_ids = [f"lobby{i + 1}" for i in range(lobbies)]
+    with ThreadPoolExecutor(max_workers=lobbies) as executor:
+        list(executor.map(pool.connect, lobby_ids))
+    for lobby_id in lobby_ids:
+        pool.get(lobby_id).toggle_movement()
+
+    stop = threading.Event()
+    counts = []
+    threads = [threading.Thread(target=coordinator_load, args=(stop, counts)) for _ in range(load_threads)]
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    pool.shutdown()
+    if scheduler is not None:
+        scheduler.shutdown()
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    intervals = []
+    reports = 0
+    for path in glob.glob(os.path.join(trace_dir, "*.nztrace")):
+        with TraceReader(path) as reader:
+            stamps = [record[0] for record in reader.records() if record[0] >= WARMUP]
+        reports += len(stamps)
+        intervals.extend(b - a for a, b in zip(stamps, stamps[1:]))
+    shutil.rmtree(trace_dir, ignore_errors=True)
+
+    intervals.sort()
+    mean = sum(intervals) / len(intervals) if intervals else 0.0
+    jitter = (sum((i - mean) ** 2 for i in intervals) / len(intervals)) ** 0.5 if intervals else 0.0
+    measured = max(duration - WARMUP, 1e-9)
+    return {
+        "shards": shards,
+        "lobbies": lobbies,
+        "duration_s": round(wall, 3),
+        "reports_per_s": round(reports / measured, 1),
+        "reports_per_s_per_lobby": round(reports / measured / lobbies, 1),
+        "interval_ms": {
+            "mean": round(mean * 1000, 3),
+            "p50": round(percentile(intervals, 0.50) * 1000, 3),
+            "p90": round(percentile(intervals, 0.90) * 1000, 3),
+            "p99": round(percentile(intervals, 0.99) * 1000, 3),
+            "max": round(intervals[-1] * 1000, 3) if intervals else 0.0,
+            "jitter": round(jitter * 1000, 3),
+        },
+        "coordinator_load_ops_per_s": round(sum(counts) / wall, 1),
+        "coordinator_cpu_percent": round(cpu / wall * 100, 1),
+        "shard_cpu_s": round(children.ru_utime + children.ru_stime, 3),
+    }
+
+
+def run_isolated(shards, lobbies, duration, load_threads):
+    """Run one configuration in a fresh interpreter"""
+    args = [sys.executable, os.path.abspath(__file__), "--single", str(shards),
+            "--lobbies", str(lobbies), "--duration", str(duration), "--load-threads", str(load_threads)]
+    env = dict(os.environ, NIZUA_LOG_LEVEL="WARNING")
+    output = subprocess.run(args, check=True, capture_output=True, text=True, env=env).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, nargs="+", default=list(DEFAULT_SHARDS),
+                        help="shard counts to compare (0 = in-process)")
+    parser.add_argument("--lobbies", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--load-threads", type=int, default=2,
+                        help="busy threads in the coordinating process (0 to disable)")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--single", type=int, metavar="SHARDS", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        print(json.dumps(run_single(args.single, args.lobbies, args.duration, args.load_threads)))
+        return
+
+    results = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "lobbies": args.lobbies,
+            "duration_s": args.duration,
+            "load_threads": args.load_threads,
+        },
+        "runs": [],
+    }
+    for shards in args.shards:
+        run = run_isolated(shards, args.lobbies, args.duration, args.load_threads)
+        results["runs"].append(run)
+        print(f"shards {shards:<2} {run['reports_per_s_per_lobby']:>6} reports/s/lobby  "
+              f"p99 {run['interval_ms']['p99']} ms  jitter {run['interval_ms']['jitter']} ms  "
+              f"load {run['coordinator_load_ops_per_s']} ops/s", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
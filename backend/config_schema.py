@@ -0,0 +1,129 @@
+from collections import namedtuple
+from dataclasses import field, make_dataclass, replace
+
+from log_setup import get_logger
+
+log = get_logger('config')
+
+# One gamepad setting: where it lives in config.ini, the GamepadController
+# attribute it drives, its type, default and inclusive bounds
+Param = namedtuple('Param', 'section key attr type default minimum maximum')
+
+PARAMS = (
+    # Movement settings
+    Param('Movement', 'look_intensity', 'look_intensity', float, 3.0, 0.0, 10.0),
+    Param('Movement', 'move_intensity', 'move_intensity', float, 2.0, 0.0, 10.0),
+    Param('Movement', 'forward_intensity', 'forward_intensity', float, 2.0, 0.0, 10.0),
+    Param('Movement', 'ads_chance', 'ads_chance', float, 0.040000000000000036, 0.0, 1.0),
+    Param('Movement', 'jump_chance', 'jump_chance', float, 1.0, 0.0, 1.0),
+    Param('Movement', 'jump_interval', 'jump_interval', float, 1.0, 0.0, 3600.0),
+    Param('Movement', 'weapon_switch_chance', 'weapon_switch_chance', float, 1.0, 0.0, 1.0),
+    Param('Movement', 'weapon_switch_interval', 'weapon_switch_interval', float, 15.0, 0.0, 3600.0),
+    Param('Movement', 'strafe_chance', 'strafe_chance', float, 0.25, 0.0, 1.0),
+    Param('Movement', 'forward_bias', 'forward_bias', float, 0.4, 0.0, 1.0),
+    Param('Movement', 'shoot_chance', 'shoot_chance', float, 0.09999999999999998, 0.0, 1.0),
+    Param('Movement', 'shoot_duration', 'shoot_duration', float, 0.29799999999999993, 0.0, 60.0),
+    Param('Movement', 'crouch_chance', 'crouch_chance', float, 0.3, 0.0, 1.0),
+    Param('Movement', 'x_button_chance', 'x_button_chance', float, 0.3, 0.0, 1.0),
+    Param('Movement', 'x_button_interval', 'x_button_interval', float, 5.0, 0.0, 3600.0),
+    Param('Movement', 'min_movement_duration', 'min_movement_duration', float, 9.377633711507293, 0.0, 3600.0),
+    Param('Movement', 'max_movement_duration', 'max_movement_duration', float, 14.817396002160994, 0.0, 3600.0),
+    Param('Movement', 'min_break_duration', 'min_break_duration', float, 1.0, 0.0, 3600.0),
+    Param('Movement', 'max_break_duration', 'max_break_duration', float, 3.1766612641815235, 0.0, 3600.0),
+    # Anti-AFK settings
+    Param('AntiAFK', 'interval', 'anti_afk_interval', float, 60.599999999999994, 0.0, 3600.0),
+    Param('AntiAFK', 'right_bumper_duration', 'right_bumper_duration', float, 0.1359999999999999, 0.0, 60.0),
+    Param('AntiAFK', 'left_bumper_duration', 'left_bumper_duration', float, 0.1417857142857143, 0.0, 60.0),
+    Param('AntiAFK', 'delay_between_buttons', 'delay_between_buttons', float, 1.012, 0.0, 60.0),
+)
+
+# (section, key) -> Param, for constant-time lookups
+BY_KEY = {(param.section, param.key): param for param in PARAMS}
+
+
+# Immutable snapshot of every parameter, one slot per controller attribute.
+# Readers grab the current instance once; writers build a new one and swap it.
+ControllerSettings = make_dataclass(
+    'ControllerSettings',
+    [(param.attr, param.type, field(default=param.default)) for param in PARAMS],
+    frozen=True,
+    slots=True
+)
+ControllerSettings.__doc__ = "Frozen snapshot of the gamepad settings"
+ControllerSettings.__module__ = __name__  # Keeps snapshots picklable
+
+
+def coerce(param, value):
+    """Convert a raw value to the parameter's type and check its bounds"""
+    try:
+        value = param.type(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{param.section}.{param.key}: invalid value {value!r}") from None
+    if not param.minimum <= value <= param.maximum:
+        raise ValueError(
+            f"{param.section}.{param.key}: {value} is outside [{param.minimum}, {param.maximum}]"
+        )
+    return value
+
+
+def typed_value(section, key, raw):
+    """A config.ini string as its schema type; custom entries are read as int or float when they parse"""
+    param = BY_KEY.get((section, key))
+    if param is not None:
+        try:
+            return param.type(raw)
+        except ValueError:
+            return raw
+    try:
+        return float(raw) if '.' in raw else int(raw)
+    except ValueError:
+        return raw
+
+
+def load_values(config):
+    """Read every parameter from a ConfigParser; returns {attr: value}
+
+    Missing or invalid entries fall back to the schema default.
+    """
+    values = {}
+    for param in PARAMS:
+        raw = config.get(param.section, param.key, fallback=None)
+        if raw is None:
+            values[param.attr] = param.default
+            continue
+        try:
+            values[param.attr] = coerce(param, raw)
+        except ValueError as e:
+            log.warning("Invalid config value, using default: %s", e)
+            values[param.attr] = param.default
+    return values
+
+
+def default_values():
+    """Return {attr: default} for every parameter"""
+    return {param.attr: param.default for param in PARAMS}
+
+
+def to_sections(values):
+    """Convert {attr: value} to config.ini sections of strings"""
+    sections = {}
+    for param in PARAMS:
+        sections.setdefault(param.section, {})[param.key] = str(values[param.attr])
+    return sections
+
+
+def settings_from_config(config):
+    """Build a ControllerSettings snapshot from a ConfigParser"""
+    return ControllerSettings(**load_values(config))
+
+
+def with_value(settings, section, key, value):
+    """Return a copy of settings with one parameter changed
+
+    Returns None for keys outside the schema; raises ValueError for values
+    of the wrong type or out of bounds.
+    """
+    param = BY_KEY.get((section, key))
+    if param is None:
+        return None
+    return replace(settings, **{param.attr: coerce(param, value)})
@@ -0,0 +1,114 @@
+import os
+import threading
+from collections import deque
+
+from log_setup import get_logger
+
+log = get_logger('config')
+
+# Own writes registered but not seen by the watcher yet
+PENDING_WRITES = 16
+
+
+class ConfigWatcher:
+    """Calls on_change when a file is modified outside this process
+
+    Uses watchdog (inotify on Linux, ReadDirectoryChangesW on Windows) when
+    it is installed and falls back to polling the file's mtime and size.
+    Writes made by the application itself are skipped through ignore_current(),
+    called with the new file's stat before it replaces the watched one.
+    """
+
+    def __init__(self, path, on_change, poll_interval=1.0):
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self._known = self._signature()
+        # Signatures of our own writes, oldest first
+        self._pending = deque(maxlen=PENDING_WRITES)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._observer = None
+        self._thread = None
+
+    def _signature(self, stat=None):
+        if stat is None:
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def ignore_current(self, stat=None):
+        """Treat a state of the file as already applied (our own writes)
+
+        stat is the os.stat_result of the file about to be renamed over the
+        watched one: the file may still be seen in its previous state before
+        the rename, so that state stays known too. Without stat, the file's
+        current state is taken.
+        """
+        signature = self._signature(stat)
+        with self._lock:
+            if stat is None:
+                self._known = signature
+                self._pending.clear()
+            else:
+                self._pending.append(signature)
+
+    def check(self):
+        """Fire on_change if the file differs from the last known state"""
+        with self._lock:
+            signature = self._signature()
+            if signature is None or signature == self._known:
+                return False
+            self._known = signature
+            if signature in self._pending:
+                # Our own write: the ones before it are replaced already
+                while self._pending.popleft() != signature:
+                    pass
+                return False
+            self._pending.clear()
+        try:
+            self.on_change()
+        except Exception:
+            log.exception("Error while reloading %s", self.path)
+        return True
+
+    def start(self):
+        """Start watching; returns the mode in use ('watchdog' or 'polling')"""
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            self._thread = threading.Thread(target=self._poll_loop, name="config-watcher")
+            self._thread.daemon = True
+            self._thread.start()
+            return 'polling'
+
+        watcher = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = (getattr(event, 'src_path', None), getattr(event, 'dest_path', None))
+                if watcher.path in [os.path.abspath(p) for p in paths if p]:
+                    watcher.check()
+
+        self._observer = Observer()
+        self._observer.daemon = True
+        self._observer.schedule(_Handler(), os.path.dirname(self.path), recursive=False)
+        self._observer.start()
+        return 'watchdog'
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            self.check()
+
+    def stop(self):
+        self._stop.set()
+        if self._observer:
+            self._observer.stop()
+            self._observer.join(timeout=1)
+            self._observer = None
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
@@ -0,0 +1,12 @@
+# Shared by the server, the shards and the status board; kept free of heavy
+# imports so that importing it does not load gamepad_control
+
+# Movement loop cadence
+TICK_INTERVAL = 0.01
+TARGET_HZ = 1 / TICK_INTERVAL
+
+
+def lobby_number(lobby_id):
+    """Number of a lobby ("lobby3" -> 3), or None for other ids"""
+    suffix = lobby_id[len("lobby"):] if lobby_id.startswith("lobby") else ""
+    return int(suffix) if suffix.isdigit() else None
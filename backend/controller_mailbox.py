@@ -0,0 +1,173 @@
+import threading
+import types
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+
+# Commands waiting for one controller before post() refuses more
+MAILBOX_CAPACITY = 64
+# Longest wait for a command's result from a connect or "wait" request
+COMMAND_TIMEOUT = 30.0
+# A request handler answers "queued" rather than wait longer than this
+REPLY_TIMEOUT = 1.0
+
+
+class MailboxFullError(RuntimeError):
+    """Raised when a controller already has MAILBOX_CAPACITY commands waiting"""
+
+
+class MailboxClosedError(RuntimeError):
+    """Raised for commands posted to a controller that is being released"""
+
+
+def _settle(set_outcome, value):
+    try:
+        set_outcome(value)
+    except InvalidStateError:
+        pass  # Cancelled meanwhile
+
+
+class Mailbox:
+    """Commands for one controller, run one at a time in arrival order
+
+    post() queues fn(*args) and returns a Future right away. A scheduler
+    task drains the queue: a plain command runs in one step, a command
+    returning a generator (a connect waiting for the driver) is driven like
+    any scheduler task, so its waits hold no worker and the next command
+    starts when it is done. Since commands never overlap, they need no lock
+    on the controller state.
+
+    post_macro() queues a macro: when its turn comes it is started as its
+    own scheduler task and the next command runs at once, so a 7 s macro
+    never delays a toggle or a disconnect. Its Future completes when the
+    macro ends.
+
+    Cancelling a Future skips a queued command, or stops a running
+    generator or macro before its next step.
+    """
+
+    def __init__(self, name, scheduler, capacity=MAILBOX_CAPACITY):
+        self.name = name
+        self.capacity = capacity
+        self._scheduler = scheduler
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._closed = False
+        # Futures of the macros running as their own tasks
+        self._macros = set()
+        # Parked with an empty queue: only then does post() wake the task,
+        # a running generator's waits are never cut short
+        self._idle = False
+        self._task = scheduler.spawn(self._drain(), name=f"{name}:mailbox")
+
+    def __len__(self):
+        return len(self._queue)
+
+    def _wake(self):
+        with self._lock:
+            idle, self._idle = self._idle, False
+        if idle:
+            self._task.wake()
+
+    def post(self, fn, *args):
+        """Queue fn(*args); returns a Future for its result
+
+        Raises MailboxFullError or MailboxClosedError instead of queueing.
+        """
+        return self._put(fn, args, False)
+
+    def post_macro(self, fn, *args):
+        """Queue a macro: fn(*args) returns the scheduler generator to start"""
+        return self._put(fn, args, True)
+
+    def _put(self, fn, args, macro):
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise MailboxClosedError(f"{self.name} is being released")
+            if len(self._queue) >= self.capacity:
+                raise MailboxFullError(f"{self.name} has {self.capacity} commands waiting")
+            self._queue.append((fn, args, future, macro))
+        self._wake()
+        return future
+
+    def cancel_macros(self):
+        """Stop every running macro (the controller is stopping)"""
+        with self._lock:
+            macros = list(self._macros)
+        for future in macros:
+            future.cancel()
+
+    def close(self, fn=None, *args):
+        """Refuse new commands; the queued ones run, then fn(*args), then the task ends
+
+        Returns the Future of fn, or None.
+        """
+        future = Future() if fn is not None else None
+        with self._lock:
+            self._closed = True
+            if fn is not None:
+                self._queue.append((fn, args, future, False))
+        self._wake()
+        return future
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                item = self._queue.popleft() if self._queue else None
+                if item is None:
+                    if self._closed:
+                        return
+                    self._idle = True
+            if item is None:
+                yield None  # Parked until post() wakes the task
+                continue
+            fn, args, future, macro = item
+            if future.cancelled():
+                continue
+            try:
+                result = fn(*args)
+                if macro:
+                    self._start_macro(result, future)
+                    continue
+                if isinstance(result, types.GeneratorType):
+                    result = yield from self._drive(result, future)
+            except Exception as e:
+                _settle(future.set_exception, e)
+            else:
+                _settle(future.set_result, result)
+
+    def _start_macro(self, gen, future):
+        """Run a macro as its own task; its outcome goes to future"""
+        def run():
+            try:
+                result = yield from gen
+            except Exception as e:
+                _settle(future.set_exception, e)
+            else:
+                _settle(future.set_result, result)
+
+        task = self._scheduler.spawn(run(), name=f"{self.name}:macro")
+
+        def finished(future):
+            with self._lock:
+                self._macros.discard(future)
+            if future.cancelled():
+                task.cancel()
+
+        with self._lock:
+            self._macros.add(future)
+        future.add_done_callback(finished)
+
+    def _drive(self, gen, future):
+        """Step a generator command; returns its value, or None once cancelled"""
+        # A cancel wakes the task so the command stops without waiting out its delay
+        future.add_done_callback(lambda f: self._task.wake())
+        while True:
+            if future.cancelled():
+                gen.close()
+                return None
+            try:
+                delay = next(gen)
+            except StopIteration as done:
+                return done.value
+            yield delay
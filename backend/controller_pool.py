@@ -0,0 +1,115 @@
+import threading
+from concurrent import futures
+
+from controller_mailbox import COMMAND_TIMEOUT, REPLY_TIMEOUT, MailboxClosedError, MailboxFullError
+from log_setup import get_logger
+
+log = get_logger('pool')
+
+
+class PoolFullError(Exception):
+    """Raised when the pool already holds its maximum number of controllers"""
+
+
+class ControllerPool:
+    """Registry of independent controllers keyed by lobby id"""
+
+    def __init__(self, factory, max_controllers=20):
+        # factory(lobby_id) builds a new controller for that lobby
+        self._factory = factory
+        self.max_controllers = max_controllers
+        self._controllers = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._controllers)
+
+    def __contains__(self, lobby_id):
+        return lobby_id in self._controllers
+
+    def get(self, lobby_id):
+        """Return the controller for a lobby, or None"""
+        return self._controllers.get(lobby_id)
+
+    def items(self):
+        """Return a snapshot of (lobby_id, controller) pairs"""
+        with self._lock:
+            return list(self._controllers.items())
+
+    def values(self):
+        """Return a snapshot of the live controllers"""
+        with self._lock:
+            return list(self._controllers.values())
+
+    def acquire(self, lobby_id):
+        """Return the controller for a lobby, creating it if needed"""
+        with self._lock:
+            controller = self._controllers.get(lobby_id)
+            if controller is None:
+                if len(self._controllers) >= self.max_controllers:
+                    raise PoolFullError(
+                        f"Maximum of {self.max_controllers} controllers reached"
+                    )
+                controller = self._factory(lobby_id)
+                self._controllers[lobby_id] = controller
+            return controller
+
+    def connect(self, lobby_id):
+        """Create, connect and start the controller for a lobby
+
+        Returns True when a new pad was connected, False if it already was.
+        The driver call runs on this thread; attaching and starting go
+        through the controller's mailbox, so a concurrent connect or
+        disconnect of the same lobby is ordered, not interleaved.
+        """
+        controller = self.acquire(lobby_id)
+        if controller.gamepad is not None:
+            return False
+        gamepad = None
+        try:
+            gamepad = controller.backend_factory()
+            connecting = controller.submit('connect', gamepad)
+            starting = controller.submit('start')
+            created = connecting.result(COMMAND_TIMEOUT)
+            starting.result(COMMAND_TIMEOUT)
+        except Exception:
+            if gamepad is not None and controller.gamepad is not gamepad:
+                gamepad.close()
+            self.release(lobby_id)
+            raise
+        return created
+
+    def apply_settings(self, settings):
+        """Push one settings snapshot to every live controller"""
+        for controller in self.values():
+            try:
+                controller.submit('apply_settings', settings)
+            except MailboxFullError:
+                # A snapshot swap is atomic: apply it now rather than drop it
+                controller.apply_settings(settings)
+            except MailboxClosedError:
+                pass  # Being released
+
+    def release(self, lobby_id):
+        """Disconnect and forget the controller for a lobby"""
+        with self._lock:
+            controller = self._controllers.pop(lobby_id, None)
+        if controller is None:
+            return False
+        try:
+            controller.close().result(REPLY_TIMEOUT)
+        except futures.TimeoutError:
+            pass  # Queued last: runs as soon as the commands ahead of it are done
+        return True
+
+    def shutdown(self):
+        """Disconnect every controller in the pool"""
+        with self._lock:
+            controllers = list(self._controllers.values())
+            self._controllers.clear()
+        closing = [controller.close() for controller in controllers]
+        for future in closing:
+            try:
+                future.result(COMMAND_TIMEOUT)
+            except Exception:
+                log.exception("Error while disconnecting controller")
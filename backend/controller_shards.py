@@ -0,0 +1,556 @@
+import itertools
+import multiprocessing
+import signal
+import threading
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import metrics
+from controller_defs import TARGET_HZ, lobby_number
+from controller_pool import ControllerPool, PoolFullError
+from log_setup import get_logger
+from status_board import StatusBoard
+
+log = get_logger('shards')
+
+# Tick rates are pushed by each shard this often
+STATS_INTERVAL = 1.0
+# A command a shard has not answered within this is failed
+CALL_TIMEOUT = 30.0
+# Wait before restarting a crashed shard
+RESTART_DELAY = 1.0
+# Threads per shard running blocking commands (a connect waits ~1 s for the driver)
+COMMAND_THREADS = 8
+# Scheduler workers inside each shard process
+SHARD_SCHEDULER_WORKERS = 2
+
+
+class ShardCrashedError(RuntimeError):
+    """Raised for commands pending on a shard whose process died"""
+
+
+def shard_index(lobby_id, shards):
+    """Shard owning a lobby: lobbyN goes to shard (N - 1) % shards"""
+    number = lobby_number(lobby_id)
+    if number is not None:
+        return (number - 1) % shards
+    return zlib.crc32(lobby_id.encode('utf-8')) % shards
+
+
+def _remote_error(kind, message):
+    """Rebuild an exception raised inside a shard"""
+    if kind == 'PoolFullError':
+        return PoolFullError(message)
+    if kind == 'ShardCrashedError':
+        return ShardCrashedError(message)
+    return RuntimeError(message)
+
+
+# --- Shard process side ---
+
+_PENDING = object()  # Call whose reply is sent when its Future settles
+
+
+class _ShardWorker:
+    """Runs one shard's controllers on a private TickScheduler
+
+    Calls arrive on the pipe as ('call', request_id, method, args); quick
+    ones run on the receiving thread, connect/release on a small thread pool.
+    Controller commands go to the controller's mailbox and are answered when
+    they complete. Replies, status changes and periodic tick rates go back
+    on the same pipe.
+    """
+
+    BLOCKING = ('connect', 'release')
+
+    def __init__(self, index, conn, settings, board=None):
+        from gamepad_control import GamepadController
+        from input_trace import backend_factory_for
+        from tick_scheduler import TickScheduler
+
+        self.index = index
+        self.conn = conn
+        self.settings = settings
+        self.board = board
+        self._send_lock = threading.Lock()
+        self.scheduler = TickScheduler(workers=SHARD_SCHEDULER_WORKERS, name=f"shard{index}")
+
+        def create(lobby_id):
+            controller = GamepadController(lobby_id, scheduler=self.scheduler,
+                                           backend_factory=backend_factory_for(lobby_id),
+                                           settings=self.settings,
+                                           status_row=board.row_for(lobby_id) if board else None)
+            controller.on_status_change = lambda c: self.send(('status', c.name, c.status()))
+            return controller
+
+        self.pool = ControllerPool(create, max_controllers=1000)
+        # Futures of queued controller commands, by request id (see do_cancel)
+        self.commands = {}
+        self.executor = ThreadPoolExecutor(max_workers=COMMAND_THREADS, thread_name_prefix=f"shard{index}")
+        self.stopping = threading.Event()
+
+    def send(self, message):
+        with self._send_lock:
+            self.conn.send(message)
+
+    def reply(self, request_id, ok, value):
+        try:
+            self.send(('reply', request_id, ok, value))
+        except (OSError, EOFError):
+            pass  # Coordinator gone
+
+    def run_command(self, request_id, method, args):
+        try:
+            value = getattr(self, 'do_' + method)(request_id, *args)
+        except Exception as e:
+            self.reply(request_id, False, (type(e).__name__, str(e)))
+            return
+        if value is not _PENDING:
+            self.reply(request_id, True, value)
+
+    def do_connect(self, request_id, lobby_id):
+        created = self.pool.connect(lobby_id)
+        return created, self.pool.get(lobby_id).status()
+
+    def do_release(self, request_id, lobby_id):
+        return self.pool.release(lobby_id)
+
+    def do_command(self, request_id, lobby_id, command, args):
+        """Queue a command to a controller; answered when it completes"""
+        controller = self.pool.get(lobby_id)
+        if controller is None:
+            raise RuntimeError("Controller not connected")
+        future = controller.submit(command, *args)
+        self.commands[request_id] = future
+
+        def settled(future):
+            self.commands.pop(request_id, None)
+            if future.cancelled():
+                self.reply(request_id, False, ('CancelledError', "Cancelled"))
+            elif future.exception() is not None:
+                error = future.exception()
+                self.reply(request_id, False, (type(error).__name__, str(error)))
+            else:
+                self.reply(request_id, True, future.result())
+
+        future.add_done_callback(settled)
+        return _PENDING
+
+    def do_cancel(self, request_id, target_id):
+        future = self.commands.get(target_id)
+        return future is not None and future.cancel()
+
+    def do_apply_settings(self, request_id, settings):
+        self.settings = settings
+        self.pool.apply_settings(settings)
+        return True
+
+    def do_scheduler_stats(self, request_id):
+        return self.scheduler.stats()
+
+    def do_metrics(self, request_id):
+        """This process's metric samples (controller loops, updates, actions, phases)"""
+        return metrics.REGISTRY.collect()
+
+    def _report_stats(self):
+        while not self.stopping.wait(STATS_INTERVAL):
+            rates = {lobby_id: controller.tick_rate() for lobby_id, controller in self.pool.items()}
+            try:
+                self.send(('stats', rates))
+            except (OSError, EOFError):
+                return
+
+    def run(self):
+        threading.Thread(target=self._report_stats, name=f"shard{self.index}-stats", daemon=True).start()
+        try:
+            while True:
+                try:
+                    message = self.conn.recv()
+                except (EOFError, OSError):
+                    break  # Coordinator exited
+                if message[0] == 'stop':
+                    break
+                _, request_id, method, args = message
+                if method in self.BLOCKING:
+                    self.executor.submit(self.run_command, request_id, method, args)
+                else:
+                    self.run_command(request_id, method, args)
+        finally:
+            self.stopping.set()
+            self.pool.shutdown()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.scheduler.shutdown()
+
+
+def _shard_main(index, conn, settings, board_name=None, board_rows=0):
+    """Entry point of a shard process"""
+    from log_setup import setup_logging, shutdown_logging
+
+    # Ctrl+C reaches the whole process group: shutdown is driven by the coordinator
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_logging()
+    log.info("Shard %d started", index)
+    # Controllers write their state straight into the coordinator's status board
+    board = StatusBoard.attach(board_name, board_rows) if board_name else None
+    try:
+        _ShardWorker(index, conn, settings, board).run()
+    finally:
+        if board is not None:
+            board.close()
+        log.info("Shard %d stopped", index)
+        shutdown_logging()
+
+
+# --- Coordinator side ---
+
+class RemoteController:
+    """Coordinator-side stand-in for a controller living in a shard
+
+    Offers the GamepadController calls the server uses. State comes from the
+    status and tick rates pushed by the shard, so reading it never waits on
+    the pipe; submit() forwards a command to the controller's mailbox in the
+    shard and returns a Future for its result.
+    """
+
+    def __init__(self, name, shard):
+        self.name = name
+        self.shard = shard
+        self.on_status_change = None
+        self._status = {"connected": False, "movement_enabled": False, "anti_afk_enabled": False,
+                        "phase": "idle", "last_error": None}
+        self._tick_rate = {"target_hz": TARGET_HZ, "achieved_hz": 0.0, "ticks": 0}
+
+    @property
+    def gamepad(self):
+        """Truthy while the shard holds a connected pad (mirrors GamepadController.gamepad)"""
+        return True if self._status["connected"] else None
+
+    @property
+    def movement_enabled(self):
+        return self._status["movement_enabled"]
+
+    @property
+    def anti_afk_enabled(self):
+        return self._status["anti_afk_enabled"]
+
+    def status(self):
+        return dict(self._status)
+
+    def tick_rate(self):
+        return dict(self._tick_rate)
+
+    def update_status(self, status):
+        self._status = status
+        if not status["connected"]:
+            self._tick_rate = {"target_hz": TARGET_HZ, "achieved_hz": 0.0, "ticks": 0}
+        if self.on_status_change:
+            try:
+                self.on_status_change(self)
+            except Exception:
+                log.exception("Error in status listener")
+
+    def submit(self, command, *args):
+        """Queue a command in the shard (see GamepadController.submit)
+
+        Cancelling the Future cancels the command in the shard too. The
+        shard's status changes arrive before the reply, so the cached state
+        is current when the Future completes.
+        """
+        request_id, future = self.shard.submit('command', self.name, command, args)
+        if request_id is not None:
+            future.add_done_callback(
+                lambda f: f.cancelled() and self.shard.submit('cancel', request_id))
+        return future
+
+    def toggle_movement(self):
+        return self.submit('toggle_movement').result(CALL_TIMEOUT)
+
+    def toggle_anti_afk(self):
+        return self.submit('toggle_anti_afk').result(CALL_TIMEOUT)
+
+    def select_class(self):
+        return self.submit('select_class').result(CALL_TIMEOUT)
+
+    def apply_settings(self, settings):
+        """Settings are broadcast to the shards by the pool"""
+
+
+class _Shard:
+    """One worker process, its pipe and the requests awaiting an answer"""
+
+    def __init__(self, index, pool):
+        self.index = index
+        self.pool = pool
+        self.process = None
+        self.conn = None
+        self.alive = False
+        self.stopping = False
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self, settings, board=None):
+        context = multiprocessing.get_context('spawn')
+        parent_conn, child_conn = context.Pipe()
+        board_args = (board.name, board.rows) if board is not None else ()
+        process = context.Process(target=_shard_main, args=(self.index, child_conn, settings) + board_args,
+                                  name=f"nizua-shard{self.index}", daemon=True)
+        process.start()
+        child_conn.close()
+        with self._lock:
+            self.process = process
+            self.conn = parent_conn
+            self.alive = True
+        threading.Thread(target=self._read, args=(parent_conn,), name=f"shard{self.index}-reader",
+                         daemon=True).start()
+
+    def submit(self, method, *args):
+        """Send a command; returns (request_id, Future)"""
+        future = Future()
+        with self._lock:
+            if not self.alive:
+                future.set_exception(ShardCrashedError(f"Shard {self.index} is not running"))
+                return None, future
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            try:
+                self.conn.send(('call', request_id, method, args))
+            except (OSError, EOFError, ValueError) as e:
+                del self._pending[request_id]
+                future.set_exception(ShardCrashedError(f"Shard {self.index}: {e}"))
+        return request_id, future
+
+    def call(self, method, *args):
+        return self.submit(method, *args)[1]
+
+    def _read(self, conn):
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            kind = message[0]
+            if kind == 'reply':
+                _, request_id, ok, value = message
+                with self._lock:
+                    future = self._pending.pop(request_id, None)
+                if future is not None and not future.done():
+                    if ok:
+                        future.set_result(value)
+                    elif value[0] == 'CancelledError':
+                        future.cancel()  # Cancelled in the shard (e.g. its controller stopped)
+                    else:
+                        future.set_exception(_remote_error(*value))
+            elif kind == 'status':
+                self.pool._on_status(message[1], message[2])
+            elif kind == 'stats':
+                self.pool._on_stats(message[1])
+        self._died()
+
+    def _died(self):
+        with self._lock:
+            self.alive = False
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_exception(ShardCrashedError(f"Shard {self.index} exited"))
+        if not self.stopping:
+            self.pool._on_crash(self)
+
+    def stop(self, timeout=2.0):
+        self.stopping = True
+        with self._lock:
+            conn = self.conn
+        if conn is not None:
+            try:
+                conn.send(('stop',))
+            except (OSError, EOFError, ValueError):
+                pass
+        if self.process is not None:
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout)
+        if conn is not None:
+            conn.close()
+
+
+class ShardedControllerPool:
+    """ControllerPool spread over worker processes, one GIL per shard
+
+    Same interface as ControllerPool. Each lobby always lives in the same
+    shard (see shard_index); this process only forwards commands and keeps
+    the state the shards push. A crashed shard fails its pending commands,
+    reports its lobbies as disconnected and is restarted empty; the other
+    shards are unaffected.
+    """
+
+    def __init__(self, shards, settings, on_status_change=None, max_controllers=20, status_board=None):
+        # settings() returns the current ControllerSettings snapshot
+        self._settings = settings
+        # Shared with the shards, which write their controllers' rows
+        self.status_board = status_board
+        self.on_status_change = on_status_change
+        self.max_controllers = max_controllers
+        self._shards = [_Shard(i, self) for i in range(shards)]
+        self._proxies = {}
+        self._controllers = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+    @property
+    def shards(self):
+        return len(self._shards)
+
+    def start(self):
+        """Start the shard processes (otherwise done on first use)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        settings = self._settings()
+        for shard in self._shards:
+            shard.start(settings, self.status_board)
+        log.info("Started %d controller shards", len(self._shards))
+
+    def __len__(self):
+        return len(self._controllers)
+
+    def __contains__(self, lobby_id):
+        return lobby_id in self._controllers
+
+    def get(self, lobby_id):
+        """Return the controller for a lobby, or None"""
+        return self._controllers.get(lobby_id)
+
+    def items(self):
+        with self._lock:
+            return list(self._controllers.items())
+
+    def values(self):
+        with self._lock:
+            return list(self._controllers.values())
+
+    def _proxy(self, lobby_id):
+        """Proxy for a lobby, created once (lock held)"""
+        proxy = self._proxies.get(lobby_id)
+        if proxy is None:
+            shard = self._shards[shard_index(lobby_id, len(self._shards))]
+            proxy = RemoteController(lobby_id, shard)
+            proxy.on_status_change = self.on_status_change
+            self._proxies[lobby_id] = proxy
+        return proxy
+
+    def acquire(self, lobby_id):
+        """Return the controller for a lobby, registering it if needed"""
+        self.start()
+        with self._lock:
+            proxy = self._controllers.get(lobby_id)
+            if proxy is None:
+                if len(self._controllers) >= self.max_controllers:
+                    raise PoolFullError(f"Maximum of {self.max_controllers} controllers reached")
+                proxy = self._controllers[lobby_id] = self._proxy(lobby_id)
+            return proxy
+
+    def connect(self, lobby_id):
+        """Connect and start the controller for a lobby in its shard
+
+        Returns True when a new pad was connected, False if it already was.
+        """
+        proxy = self.acquire(lobby_id)
+        if proxy.gamepad is not None:
+            return False
+        try:
+            created, status = proxy.shard.call('connect', lobby_id).result(CALL_TIMEOUT)
+        except Exception:
+            with self._lock:
+                self._controllers.pop(lobby_id, None)
+            raise
+        proxy.update_status(status)
+        return created
+
+    def apply_settings(self, settings):
+        """Push one settings snapshot to every shard"""
+        if not self._started:
+            return
+        for shard in self._shards:
+            shard.call('apply_settings', settings)
+
+    def release(self, lobby_id):
+        """Disconnect and forget the controller for a lobby"""
+        with self._lock:
+            proxy = self._controllers.pop(lobby_id, None)
+        if proxy is None:
+            return False
+        return proxy.shard.call('release', lobby_id).result(CALL_TIMEOUT)
+
+    def scheduler_stats(self):
+        """Tick lag of every shard's scheduler"""
+        futures = [shard.call('scheduler_stats') for shard in self._shards]
+        stats = {}
+        for shard, future in zip(self._shards, futures):
+            try:
+                stats[f"shard{shard.index}"] = future.result(CALL_TIMEOUT)
+            except Exception as e:
+                stats[f"shard{shard.index}"] = {"error": str(e)}
+        return stats
+
+    def collect_metrics(self):
+        """Metric samples of every running shard, for metrics.render()"""
+        if not self._started:
+            return []
+        futures = [shard.call('metrics') for shard in self._shards]
+        collected = []
+        for shard, future in zip(self._shards, futures):
+            try:
+                collected.append(future.result(CALL_TIMEOUT))
+            except Exception as e:
+                log.warning("No metrics from shard %d: %s", shard.index, e)
+        return collected
+
+    def shutdown(self):
+        """Stop every shard (their controllers disconnect on the way out)"""
+        with self._lock:
+            self._controllers.clear()
+            started = self._started
+        if started:
+            for shard in self._shards:
+                shard.stop()
+
+    def _on_status(self, lobby_id, status):
+        with self._lock:
+            proxy = self._proxies.get(lobby_id)
+        if proxy is not None:
+            proxy.update_status(status)
+
+    def _on_stats(self, rates):
+        for lobby_id, rate in rates.items():
+            proxy = self._proxies.get(lobby_id)
+            if proxy is not None:
+                proxy._tick_rate = rate
+
+    def _on_crash(self, shard):
+        """Report the shard's lobbies as disconnected and restart it"""
+        code = shard.process.exitcode if shard.process is not None else None
+        log.error("Shard %d exited unexpectedly (code %s), restarting", shard.index, code)
+        with self._lock:
+            lost = [proxy for lobby_id, proxy in self._controllers.items() if proxy.shard is shard]
+            for proxy in lost:
+                del self._controllers[proxy.name]
+        for proxy in lost:
+            status = {"connected": False, "movement_enabled": False, "anti_afk_enabled": False,
+                      "phase": "idle", "last_error": f"Shard {shard.index} crashed"}
+            # The shard can no longer write its rows (one may have been left mid-write)
+            row = self.status_board.row_for(proxy.name) if self.status_board else None
+            if row is not None:
+                row.write(status)
+            proxy.update_status(status)
+
+        def restart():
+            if not shard.stopping:
+                shard.start(self._settings(), self.status_board)
+
+        timer = threading.Timer(RESTART_DELAY, restart)
+        timer.daemon = True
+        timer.start()
@@ -0,0 +1,163 @@
+import threading
+
+from log_setup import get_logger
+
+log = get_logger('catalog')
+
+# /api/games page size when the client gives none, and the largest allowed
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _name_key(name):
+    return name.strip().casefold()
+
+
+class GameCatalog:
+    """Games indexed by id and by name
+
+    Stored game dicts are never modified in place: an update stores a new
+    dict, so a reader (or the JSON serializer) holding one is never torn.
+    Treat returned games as read-only. on_change() is called after every
+    mutation, e.g. to schedule the write of nizua_config.json.
+    """
+
+    def __init__(self, games=(), on_change=None):
+        self.on_change = on_change
+        self._by_id = {}
+        self._by_name = {}
+        self._lock = threading.RLock()
+        self.load(games)
+
+    def load(self, games):
+        """Replace the catalog with games from the config file
+
+        Entries without a usable id or name, or with a duplicate one, are
+        skipped with a warning.
+        """
+        by_id = {}
+        by_name = {}
+        for game in games:
+            try:
+                game = self._validate(game)
+            except ValueError as e:
+                log.warning("Skipping game: %s", e)
+                continue
+            game_id = game.get('id')
+            key = _name_key(game['name'])
+            if not isinstance(game_id, int) or game_id in by_id or key in by_name:
+                log.warning("Skipping game with a missing or duplicate id or name: %s", game.get('name'))
+                continue
+            by_id[game_id] = game
+            by_name[key] = game_id
+        with self._lock:
+            self._by_id = by_id
+            self._by_name = by_name
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, game_id):
+        return game_id in self._by_id
+
+    def get(self, game_id):
+        """Return a game by id, or None"""
+        return self._by_id.get(game_id)
+
+    def find_by_name(self, name):
+        """Return a game by name (case-insensitive), or None"""
+        game_id = self._by_name.get(_name_key(name))
+        return self._by_id.get(game_id) if game_id is not None else None
+
+    def games(self):
+        """Return a snapshot of every game in insertion order"""
+        with self._lock:
+            return list(self._by_id.values())
+
+    def query(self, search=None, installed=None, offset=0, limit=DEFAULT_PAGE_SIZE):
+        """Filter and paginate the catalog
+
+        search matches a case-insensitive substring of the name, installed
+        filters on that flag. Returns (page, total matching).
+        """
+        limit = max(0, min(limit, MAX_PAGE_SIZE))
+        offset = max(0, offset)
+        games = self.games()
+        if search:
+            needle = search.casefold()
+            games = [game for game in games if needle in game['name'].casefold()]
+        if installed is not None:
+            games = [game for game in games if bool(game.get('installed', False)) == installed]
+        return games[offset:offset + limit], len(games)
+
+    def _validate(self, game):
+        if not isinstance(game, dict):
+            raise ValueError("a game must be a JSON object")
+        name = game.get('name')
+        if not isinstance(name, str) or not name.strip():
+            raise ValueError("a game needs a name")
+        if 'path' in game and not isinstance(game['path'], str):
+            raise ValueError("path must be a string")
+        return dict(game, name=name.strip())
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
+
+    def add(self, game):
+        """Add a game and return it; the id is assigned when missing
+
+        Raises ValueError for an invalid game or an id or name already used.
+        """
+        game = self._validate(game)
+        with self._lock:
+            game_id = game.get('id')
+            if game_id is None:
+                game_id = max(self._by_id, default=0) + 1
+                game = {'id': game_id, **game}
+            elif not isinstance(game_id, int) or isinstance(game_id, bool) or game_id <= 0:
+                raise ValueError("id must be a positive integer")
+            if game_id in self._by_id:
+                raise ValueError(f"id {game_id} is already used")
+            key = _name_key(game['name'])
+            if key in self._by_name:
+                raise ValueError(f"a game named '{game['name']}' already exists")
+            self._by_id[game_id] = game
+            self._by_name[key] = game_id
+        self._changed()
+        return game
+
+    def update(self, game_id, fields):
+        """Merge fields into a game and return it, or None if unknown
+
+        The id cannot change. Raises ValueError for an invalid result or a
+        name used by another game.
+        """
+        with self._lock:
+            current = self._by_id.get(game_id)
+            if current is None:
+                return None
+            merged = dict(current)
+            merged.update(fields)
+            merged['id'] = game_id
+            game = self._validate(merged)
+            old_key = _name_key(current['name'])
+            key = _name_key(game['name'])
+            if key != old_key:
+                if key in self._by_name:
+                    raise ValueError(f"a game named '{game['name']}' already exists")
+                del self._by_name[old_key]
+                self._by_name[key] = game_id
+            self._by_id[game_id] = game
+        self._changed()
+        return game
+
+    def remove(self, game_id):
+        """Remove a game and return it, or None if unknown"""
+        with self._lock:
+            game = self._by_id.pop(game_id, None)
+            if game is None:
+                return None
+            del self._by_name[_name_key(game['name'])]
+        self._changed()
+        return game
@@ -0,0 +1,290 @@
+import math
+import os
+import threading
+import time
+from array import array
+from enum import IntFlag
+
+
+class Button(IntFlag):
+    """Xbox 360 button bits (same values as vgamepad's XUSB_BUTTON)"""
+    DPAD_UP = 0x0001
+    DPAD_DOWN = 0x0002
+    DPAD_LEFT = 0x0004
+    DPAD_RIGHT = 0x0008
+    START = 0x0010
+    BACK = 0x0020
+    LEFT_THUMB = 0x0040
+    RIGHT_THUMB = 0x0080
+    LEFT_SHOULDER = 0x0100
+    RIGHT_SHOULDER = 0x0200
+    GUIDE = 0x0400
+    A = 0x1000
+    B = 0x2000
+    X = 0x4000
+    Y = 0x8000
+
+
+class GamepadBackend:
+    """Output interface driven by GamepadController
+
+    Setters stage the next report; update() sends it.
+    """
+    # Seconds to wait after creation before the pad accepts input
+    init_delay = 0.0
+
+    def press_button(self, button):
+        raise NotImplementedError
+
+    def release_button(self, button):
+        raise NotImplementedError
+
+    def left_joystick_float(self, x_value_float, y_value_float):
+        raise NotImplementedError
+
+    def right_joystick_float(self, x_value_float, y_value_float):
+        raise NotImplementedError
+
+    def left_trigger_float(self, value_float):
+        raise NotImplementedError
+
+    def right_trigger_float(self, value_float):
+        raise NotImplementedError
+
+    def update(self):
+        raise NotImplementedError
+
+    def close(self):
+        """Release the underlying device"""
+
+
+class VGamepadBackend(GamepadBackend):
+    """Virtual Xbox 360 pad on the ViGEm bus through vgamepad"""
+    init_delay = 1.0
+
+    def __init__(self):
+        # Imported here so the module loads on machines without the driver
+        import vgamepad as vg
+        self._buttons = vg.XUSB_BUTTON
+        self._pad = vg.VX360Gamepad()
+
+    def press_button(self, button):
+        self._pad.press_button(button=self._buttons(int(button)))
+
+    def release_button(self, button):
+        self._pad.release_button(button=self._buttons(int(button)))
+
+    def left_joystick_float(self, x_value_float, y_value_float):
+        self._pad.left_joystick_float(x_value_float=x_value_float, y_value_float=y_value_float)
+
+    def right_joystick_float(self, x_value_float, y_value_float):
+        self._pad.right_joystick_float(x_value_float=x_value_float, y_value_float=y_value_float)
+
+    def left_trigger_float(self, value_float):
+        self._pad.left_trigger_float(value_float=value_float)
+
+    def right_trigger_float(self, value_float):
+        self._pad.right_trigger_float(value_float=value_float)
+
+    def update(self):
+        self._pad.update()
+
+    def close(self):
+        # Dropping the last reference unplugs the virtual pad
+        self._pad = None
+
+
+class RecordingBackend(GamepadBackend):
+    """Records every report with its timestamp into a preallocated ring buffer
+
+    Axes are stored per report as (lx, ly, rx, ry, lt, rt); once the buffer
+    is full the oldest reports are overwritten.
+    """
+    AXES = 6
+
+    def __init__(self, capacity=65536, clock=time.perf_counter):
+        self.capacity = capacity
+        self._clock = clock
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.axes = array('f', bytes(4 * self.AXES * capacity))
+        self.buttons = array('H', bytes(2 * capacity))
+        self.count = 0
+        self._axes = [0.0] * self.AXES
+        self._button_bits = 0
+
+    def press_button(self, button):
+        self._button_bits |= int(button)
+
+    def release_button(self, button):
+        self._button_bits &= ~int(button)
+
+    def left_joystick_float(self, x_value_float, y_value_float):
+        self._axes[0] = x_value_float
+        self._axes[1] = y_value_float
+
+    def right_joystick_float(self, x_value_float, y_value_float):
+        self._axes[2] = x_value_float
+        self._axes[3] = y_value_float
+
+    def left_trigger_float(self, value_float):
+        self._axes[4] = value_float
+
+    def right_trigger_float(self, value_float):
+        self._axes[5] = value_float
+
+    def update(self):
+        index = self.count % self.capacity
+        self.timestamps[index] = self._clock()
+        base = index * self.AXES
+        axes = self.axes
+        state = self._axes
+        axes[base] = state[0]
+        axes[base + 1] = state[1]
+        axes[base + 2] = state[2]
+        axes[base + 3] = state[3]
+        axes[base + 4] = state[4]
+        axes[base + 5] = state[5]
+        self.buttons[index] = self._button_bits
+        self.count += 1
+
+    def reports(self):
+        """Return the retained reports, oldest first, as (timestamp, axes, buttons)"""
+        retained = min(self.count, self.capacity)
+        start = self.count - retained
+        result = []
+        for n in range(start, self.count):
+            index = n % self.capacity
+            base = index * self.AXES
+            result.append((self.timestamps[index], tuple(self.axes[base:base + self.AXES]), self.buttons[index]))
+        return result
+
+    def stats(self):
+        """Update rate and inter-report timing jitter over the retained window"""
+        retained = min(self.count, self.capacity)
+        start = self.count - retained
+        stamps = [self.timestamps[n % self.capacity] for n in range(start, self.count)]
+        intervals = sorted(b - a for a, b in zip(stamps, stamps[1:]))
+        result = {'reports': self.count, 'retained': retained}
+        if not intervals:
+            return result
+        duration = stamps[-1] - stamps[0]
+        mean = duration / len(intervals)
+        variance = sum((i - mean) ** 2 for i in intervals) / len(intervals)
+
+        def percentile(p):
+            return intervals[min(len(intervals) - 1, int(p * len(intervals)))] * 1000
+
+        result.update({
+            'duration_s': duration,
+            'rate_hz': len(intervals) / duration if duration > 0 else 0.0,
+            'interval_mean_ms': mean * 1000,
+            'interval_p50_ms': percentile(0.50),
+            'interval_p90_ms': percentile(0.90),
+            'interval_p99_ms': percentile(0.99),
+            'interval_max_ms': intervals[-1] * 1000,
+            'jitter_ms': math.sqrt(variance) * 1000
+        })
+        return result
+
+    def clear(self):
+        self.count = 0
+
+
+class PadReport:
+    """Accumulates stick, trigger and button changes into a single report
+
+    flush() sends only the fields that changed, with one backend update(),
+    and skips the backend entirely when nothing changed since the last one.
+    update_latency, if given, observes the duration of each update() call.
+    """
+
+    def __init__(self, backend, update_latency=None):
+        self.backend = backend
+        self.update_latency = update_latency
+        self._lock = threading.Lock()
+        # [lx, ly, rx, ry, lt, rt]
+        self._axes = [0.0] * 6
+        self._buttons = 0
+        self._sent_axes = None
+        self._sent_buttons = 0
+
+    def set_left_stick(self, x, y):
+        with self._lock:
+            self._axes[0] = x
+            self._axes[1] = y
+
+    def set_right_stick(self, x, y):
+        with self._lock:
+            self._axes[2] = x
+            self._axes[3] = y
+
+    def set_left_trigger(self, value):
+        with self._lock:
+            self._axes[4] = value
+
+    def set_right_trigger(self, value):
+        with self._lock:
+            self._axes[5] = value
+
+    def press(self, buttons):
+        with self._lock:
+            self._buttons |= int(buttons)
+
+    def release(self, buttons):
+        with self._lock:
+            self._buttons &= ~int(buttons)
+
+    def neutral(self):
+        """Center both sticks and release both triggers"""
+        with self._lock:
+            self._axes[:] = [0.0] * 6
+
+    def flush(self):
+        """Send pending changes as one report; returns False if there were none"""
+        with self._lock:
+            axes = self._axes
+            sent = self._sent_axes
+            buttons = self._buttons
+            if axes == sent and buttons == self._sent_buttons:
+                return False
+            backend = self.backend
+            if sent is None or axes[0:2] != sent[0:2]:
+                backend.left_joystick_float(x_value_float=axes[0], y_value_float=axes[1])
+            if sent is None or axes[2:4] != sent[2:4]:
+                backend.right_joystick_float(x_value_float=axes[2], y_value_float=axes[3])
+            if sent is None or axes[4] != sent[4]:
+                backend.left_trigger_float(value_float=axes[4])
+            if sent is None or axes[5] != sent[5]:
+                backend.right_trigger_float(value_float=axes[5])
+            changed = buttons ^ self._sent_buttons
+            while changed:
+                bit = changed & -changed
+                if buttons & bit:
+                    backend.press_button(button=Button(bit))
+                else:
+                    backend.release_button(button=Button(bit))
+                changed ^= bit
+            if self.update_latency is None:
+                backend.update()
+            else:
+                started = time.perf_counter()
+                backend.update()
+                self.update_latency.observe(time.perf_counter() - started)
+            self._sent_axes = list(axes)
+            self._sent_buttons = buttons
+            return True
+
+
+BACKENDS = {
+    'vgamepad': VGamepadBackend,
+    'recording': RecordingBackend
+}
+
+
+def get_backend_factory(name=None):
+    """Return the backend class by name (default from NIZUA_GAMEPAD_BACKEND)"""
+    name = name or os.environ.get('NIZUA_GAMEPAD_BACKEND', 'vgamepad')
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown gamepad backend: {name}") from None
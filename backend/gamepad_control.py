@@ -1,133 +1,217 @@
-import vgamepad as vg
 import time
-import random
 import math
-import threading
 import configparser
+import dataclasses
+import logging
 import os
+import threading
+
+from controller_defs import TARGET_HZ, TICK_INTERVAL
+from controller_mailbox import Mailbox
+from config_schema import ControllerSettings, settings_from_config, to_sections, with_value
+from gamepad_backends import Button, PadReport, get_backend_factory
+from log_setup import Sampler, controller_logger, setup_logging
+from random_stream import RandomStream, seed_for
+from metrics import ControllerMetrics
+from tick_scheduler import get_scheduler
+
+BUTTON_PRESS_DURATION = 0.1
+
+# Commands accepted by GamepadController.submit(), and the method running each
+COMMANDS = {
+    'connect': 'connect_steps',
+    'start': 'start',
+    'stop': 'stop',
+    'disconnect': 'disconnect',
+    'toggle_movement': 'toggle_movement',
+    'toggle_anti_afk': 'toggle_anti_afk',
+    'set_movement': 'set_movement',
+    'set_anti_afk': 'set_anti_afk',
+    'apply_settings': 'apply_settings',
+    'update_config': 'update_config',
+    'select_class': 'select_class_steps',
+}
+# Commands started as their own scheduler task: later commands do not wait for them
+MACROS = ('select_class',)
  
 class GamepadController:
-    def __init__(self):
+    def __init__(self, name="gamepad", scheduler=None, backend_factory=None, settings=None, seed=None,
+                 status_row=None):
+        self.name = name
+        # Leveled logger tagged with this controller's name
+        self.log = controller_logger(name)
+        # Output backend (vgamepad by default); created on connect
+        self.backend_factory = backend_factory or get_backend_factory()
         self.gamepad = None
+        # Pending report state, flushed to the gamepad once per tick
+        self.report = None
+        # Latest hold per input; a release only applies if no newer hold replaced it
+        self._holds = {}
+        # Achieved movement tick rate, measured over ~1 s windows
+        self.tick_count = 0
+        self.achieved_tick_rate = 0.0
+        self._rate_window_start = 0.0
+        self._rate_window_ticks = 0
         self.running = False
         self.movement_enabled = False
         self.anti_afk_enabled = False
-        self.thread = None
-        self.anti_afk_thread = None
+        # 'idle', 'movement' or 'break'; reported with the status
+        self.phase = 'idle'
+        self.last_error = None
+        # Called with the controller after every status change (see status())
+        self.on_status_change = None
+        # Row of the shared status board written on every change and tick (status_board.py)
+        self.status_row = status_row
+        # Per-controller random stream; the seed replays a session's random choices
+        self.rng = RandomStream(seed if seed is not None else seed_for(name))
+        # Loop timing, update latency, action and phase metrics (see /api/metrics)
+        self.metrics = ControllerMetrics(name)
+        # Timed loops run as tasks on a scheduler shared by every controller
+        self.scheduler = scheduler or get_scheduler()
+        self.movement_task = None
+        self.anti_afk_task = None
+        # Commands from other threads, run one at a time on the scheduler (see submit())
+        self.mailbox = Mailbox(name, self.scheduler)
         
-        # Load config
+        # Current settings snapshot; replaced as a whole, never mutated
+        self.settings = ControllerSettings()
+        self._settings_lock = threading.Lock()
+        
+        # Load config (skipped when the caller already parsed it)
         self.config = configparser.ConfigParser()
         self.config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.ini")
-        self.load_config()
+        if settings is None:
+            self.load_config()
+        else:
+            self.apply_settings(settings)
+        
+        if status_row is not None:
+            status_row.write(self.status(), 0, 0.0)
     
     def load_config(self):
         """Load settings from config file"""
         self.config.read(self.config_path)
-        
-        # Movement settings
-        self.look_intensity = self.config.getfloat('Movement', 'look_intensity', fallback=1.5)  # Increased default
-        self.move_intensity = self.config.getfloat('Movement', 'move_intensity', fallback=0.3)
-        self.forward_intensity = self.config.getfloat('Movement', 'forward_intensity', fallback=1.0)
-        self.ads_chance = self.config.getfloat('Movement', 'ads_chance', fallback=0.1)
-        self.jump_chance = self.config.getfloat('Movement', 'jump_chance', fallback=0.15)
-        self.jump_interval = self.config.getfloat('Movement', 'jump_interval', fallback=3.0)
-        self.weapon_switch_chance = self.config.getfloat('Movement', 'weapon_switch_chance', fallback=0.1)
-        self.weapon_switch_interval = self.config.getfloat('Movement', 'weapon_switch_interval', fallback=5.0)
-        self.strafe_chance = self.config.getfloat('Movement', 'strafe_chance', fallback=0.2)
-        self.forward_bias = self.config.getfloat('Movement', 'forward_bias', fallback=0.7)
-        self.shoot_chance = self.config.getfloat('Movement', 'shoot_chance', fallback=0.3)
-        self.shoot_duration = self.config.getfloat('Movement', 'shoot_duration', fallback=0.2)
-        self.crouch_chance = self.config.getfloat('Movement', 'crouch_chance', fallback=0.3)
-        self.x_button_chance = self.config.getfloat('Movement', 'x_button_chance', fallback=0.3)
-        self.x_button_interval = self.config.getfloat('Movement', 'x_button_interval', fallback=5.0)
-        self.min_movement_duration = self.config.getfloat('Movement', 'min_movement_duration', fallback=2.0)
-        self.max_movement_duration = self.config.getfloat('Movement', 'max_movement_duration', fallback=8.0)
-        self.min_break_duration = self.config.getfloat('Movement', 'min_break_duration', fallback=3.0)
-        self.max_break_duration = self.config.getfloat('Movement', 'max_break_duration', fallback=12.0)
-        
-        # Anti-AFK settings
-        self.anti_afk_interval = self.config.getfloat('AntiAFK', 'interval', fallback=60)
-        self.right_bumper_duration = self.config.getfloat('AntiAFK', 'right_bumper_duration', fallback=0.1)
-        self.left_bumper_duration = self.config.getfloat('AntiAFK', 'left_bumper_duration', fallback=0.1)
-        self.delay_between_buttons = self.config.getfloat('AntiAFK', 'delay_between_buttons', fallback=0.5)
+        self.apply_settings(settings_from_config(self.config))
+    
+    def reload_config(self):
+        """Re-read the config file and apply it to the running loops"""
+        self.config = configparser.ConfigParser()
+        self.load_config()
+    
+    def apply_settings(self, settings):
+        """Swap in a new settings snapshot; running loops pick it up on their next step"""
+        self.settings = settings
     
     def save_config(self):
         """Save current settings to config file"""
-        # Movement settings
-        self.config['Movement'] = {
-            'look_intensity': str(self.look_intensity),
-            'move_intensity': str(self.move_intensity),
-            'forward_intensity': str(self.forward_intensity),
-            'ads_chance': str(self.ads_chance),
-            'jump_chance': str(self.jump_chance),
-            'jump_interval': str(self.jump_interval),
-            'weapon_switch_chance': str(self.weapon_switch_chance),
-            'weapon_switch_interval': str(self.weapon_switch_interval),
-            'strafe_chance': str(self.strafe_chance),
-            'forward_bias': str(self.forward_bias),
-            'shoot_chance': str(self.shoot_chance),
-            'shoot_duration': str(self.shoot_duration),
-            'crouch_chance': str(self.crouch_chance),
-            'x_button_chance': str(self.x_button_chance),
-            'x_button_interval': str(self.x_button_interval),
-            'min_movement_duration': str(self.min_movement_duration),
-            'max_movement_duration': str(self.max_movement_duration),
-            'min_break_duration': str(self.min_break_duration),
-            'max_break_duration': str(self.max_break_duration)
-        }
-        
-        # Anti-AFK settings
-        self.config['AntiAFK'] = {
-            'interval': str(self.anti_afk_interval),
-            'right_bumper_duration': str(self.right_bumper_duration),
-            'left_bumper_duration': str(self.left_bumper_duration),
-            'delay_between_buttons': str(self.delay_between_buttons)
-        }
+        for section, section_values in to_sections(dataclasses.asdict(self.settings)).items():
+            self.config[section] = section_values
         
         with open(self.config_path, 'w') as configfile:
             self.config.write(configfile)
     
     def update_config(self, section, key, value):
-        """Update a specific config value"""
-        if section == 'Movement':
-            if key == 'look_intensity': self.look_intensity = float(value)
-            elif key == 'move_intensity': self.move_intensity = float(value)
-            elif key == 'forward_intensity': self.forward_intensity = float(value)
-            elif key == 'ads_chance': self.ads_chance = float(value)
-            elif key == 'jump_chance': self.jump_chance = float(value)
-            elif key == 'jump_interval': self.jump_interval = float(value)
-            elif key == 'weapon_switch_chance': self.weapon_switch_chance = float(value)
-            elif key == 'weapon_switch_interval': self.weapon_switch_interval = float(value)
-            elif key == 'strafe_chance': self.strafe_chance = float(value)
-            elif key == 'forward_bias': self.forward_bias = float(value)
-            elif key == 'shoot_chance': self.shoot_chance = float(value)
-            elif key == 'shoot_duration': self.shoot_duration = float(value)
-            elif key == 'crouch_chance': self.crouch_chance = float(value)
-            elif key == 'x_button_chance': self.x_button_chance = float(value)
-            elif key == 'x_button_interval': self.x_button_interval = float(value)
-            elif key == 'min_movement_duration': self.min_movement_duration = float(value)
-            elif key == 'max_movement_duration': self.max_movement_duration = float(value)
-            elif key == 'min_break_duration': self.min_break_duration = float(value)
-            elif key == 'max_break_duration': self.max_break_duration = float(value)
-        elif section == 'AntiAFK':
-            if key == 'interval': self.anti_afk_interval = float(value)
-            elif key == 'right_bumper_duration': self.right_bumper_duration = float(value)
-            elif key == 'left_bumper_duration': self.left_bumper_duration = float(value)
-            elif key == 'delay_between_buttons': self.delay_between_buttons = float(value)
+        """Update a specific config value
+
+        Returns False for keys the controller does not use; raises
+        ValueError for values of the wrong type or out of bounds.
+        """
+        # Writers serialize on the lock; readers just load self.settings
+        with self._settings_lock:
+            settings = with_value(self.settings, section, key, value)
+            if settings is None:
+                return False
+            self.settings = settings
+        return True
+    
+    def submit(self, command, *args):
+        """Queue a command (a key of COMMANDS); returns a Future for its result
+
+        Commands run in order, one at a time, so concurrent callers never
+        interleave on the controller state. Raises MailboxFullError when
+        too many commands are waiting.
+        """
+        if command not in COMMANDS:
+            raise ValueError(f"Unknown controller command: {command}")
+        post = self.mailbox.post_macro if command in MACROS else self.mailbox.post
+        return post(getattr(self, COMMANDS[command]), *args)
+    
+    def close(self):
+        """Queue the disconnect as the last command; returns its Future"""
+        return self.mailbox.close(self.disconnect)
+    
+    def _run_blocking(self, steps):
+        """Drive a scheduler generator on the calling thread"""
+        try:
+            while True:
+                time.sleep(next(steps))
+        except StopIteration as done:
+            return done.value
+    
+    def status(self):
+        """Return the controller state published to status listeners"""
+        return {
+            "connected": self.gamepad is not None,
+            "movement_enabled": self.movement_enabled,
+            "anti_afk_enabled": self.anti_afk_enabled,
+            "phase": self.phase,
+            "last_error": self.last_error
+        }
+    
+    def _notify(self):
+        """Tell the status listener that the controller state changed"""
+        if self.status_row is not None:
+            self.status_row.write(self.status())
+        if self.on_status_change:
+            try:
+                self.on_status_change(self)
+            except Exception:
+                self.log.exception("Error in status listener")
+    
+    def _set_phase(self, phase):
+        if self.phase != phase:
+            self.phase = phase
+            self.metrics.phase_changed(phase)
+            self._notify()
+    
+    def _set_error(self, error):
+        self.last_error = str(error) if error else None
+        self._notify()
     
     def connect(self):
-        """Connect the virtual gamepad"""
-        if self.gamepad is None:
-            self.gamepad = vg.VX360Gamepad()
-            time.sleep(1)  # Wait for gamepad to initialize
-            return True
-        return False
+        """Connect the virtual gamepad (blocks while the driver initializes)"""
+        if self.gamepad is not None:
+            return False
+        return self._run_blocking(self.connect_steps(self.backend_factory()))
+    
+    def connect_steps(self, gamepad):
+        """Attach a gamepad as a scheduler generator; returns True if it was attached
+
+        The caller builds gamepad with backend_factory() on its own thread:
+        the driver call blocks and must not hold a scheduler worker. If a pad
+        is already attached, gamepad is closed and False returned.
+        """
+        if self.gamepad is not None:
+            gamepad.close()
+            return False
+        if gamepad.init_delay:
+            yield gamepad.init_delay  # Wait for gamepad to initialize
+        self.report = PadReport(gamepad, update_latency=self.metrics.update)
+        self.gamepad = gamepad
+        # Phase time is counted while a pad is attached
+        self.metrics.phase_changed(self.phase)
+        self._notify()
+        return True
     
     def disconnect(self):
         """Disconnect the virtual gamepad"""
         self.stop()
         if self.gamepad:
+            self.gamepad.close()
             self.gamepad = None
+            self.report = None
+            self.metrics.phase_changed(None)
+            self._notify()
     
     def _smooth_value(self, current, target, smooth_factor=0.1):
         """Smoothly interpolate between current and target value"""
@@ -135,114 +219,201 @@ class GamepadController:
     
     def _generate_smooth_random(self, intensity):
         """Generate a smooth random value between -intensity and +intensity"""
-        return (random.random() * 2 - 1) * intensity
+        return (self.rng.random() * 2 - 1) * intensity
+    
+    def _hold(self, report, key, duration, press, release):
+        """Apply press now and schedule release after duration without blocking"""
+        token = self._holds.get(key, 0) + 1
+        self._holds[key] = token
+        press()
+        self.scheduler.call_later(duration, self._end_hold, report, key, token, release)
+    
+    def _end_hold(self, report, key, token, release):
+        """Scheduled release of a hold, skipped if a newer hold superseded it
+        or the pad it was pressed on is gone"""
+        if self.report is not report or self._holds.get(key) != token:
+            return
+        release()
+        report.flush()
+    
+    def _pulse_button(self, report, button, duration=BUTTON_PRESS_DURATION):
+        """Press a button and schedule its release"""
+        self._hold(report, button, duration, lambda: report.press(button), lambda: report.release(button))
+    
+    def _pull_trigger(self, report, side, duration):
+        """Fully pull the left or right trigger and schedule its release"""
+        set_trigger = report.set_left_trigger if side == 'left' else report.set_right_trigger
+        self._hold(report, side, duration, lambda: set_trigger(1.0), lambda: set_trigger(0.0))
+    
+    def _detached(self, report):
+        """True once report is no longer this controller's live pad (stopped or disconnected)
+
+        disconnect() may run on another scheduler worker while a loop step is
+        in progress: the step keeps the report it read and stops at its next
+        check, and an error raised by the closed pad is not recorded.
+        """
+        return not self.running or report is None or self.report is not report
+    
+    def _count_tick(self, now):
+        """Update the achieved tick rate once per measurement window"""
+        self.tick_count += 1
+        self._rate_window_ticks += 1
+        elapsed = now - self._rate_window_start
+        if elapsed >= 1.0:
+            self.achieved_tick_rate = self._rate_window_ticks / elapsed
+            self._rate_window_start = now
+            self._rate_window_ticks = 0
+        if self.status_row is not None:
+            self.status_row.set_ticks(self.tick_count, self.achieved_tick_rate)
+    
+    def tick_rate(self):
+        """Return achieved vs. target movement tick rate"""
+        return {
+            "target_hz": TARGET_HZ,
+            "achieved_hz": round(self.achieved_tick_rate, 1),
+            "ticks": self.tick_count
+        }
     
     def _anti_afk_loop(self):
-        """Anti-AFK loop that periodically presses buttons"""
-        print("Anti-AFK loop started")
-        while self.running and self.gamepad:
+        """Anti-AFK loop that periodically presses buttons (scheduler task)"""
+        self.log.info("Anti-AFK loop started")
+        while True:
+            report = self.report
+            if self._detached(report):
+                break
             try:
                 if not self.anti_afk_enabled:
-                    time.sleep(0.1)
+                    yield None  # Parked until toggled
                     continue
  
-                print("Anti-AFK: Pressing right bumper")
-                self.gamepad.press_button(button=vg.XUSB_BUTTON.XUSB_GAMEPAD_RIGHT_SHOULDER)
-                self.gamepad.update()
-                time.sleep(self.right_bumper_duration)
-                self.gamepad.release_button(button=vg.XUSB_BUTTON.XUSB_GAMEPAD_RIGHT_SHOULDER)
-                self.gamepad.update()
+                cfg = self.settings
+                self.log.debug("Anti-AFK: Pressing right bumper")
+                self._pulse_button(report, Button.RIGHT_SHOULDER, cfg.right_bumper_duration)
+                self.metrics.action('right_bumper')
+                report.flush()
+                yield cfg.right_bumper_duration + cfg.delay_between_buttons
+                if self._detached(report):
+                    break
  
-                time.sleep(self.delay_between_buttons)
+                self.log.debug("Anti-AFK: Pressing left bumper")
+                self._pulse_button(report, Button.LEFT_SHOULDER, cfg.left_bumper_duration)
+                self.metrics.action('left_bumper')
+                report.flush()
  
-                print("Anti-AFK: Pressing left bumper")
-                self.gamepad.press_button(button=vg.XUSB_BUTTON.XUSB_GAMEPAD_LEFT_SHOULDER)
-                self.gamepad.update()
-                time.sleep(self.left_bumper_duration)
-                self.gamepad.release_button(button=vg.XUSB_BUTTON.XUSB_GAMEPAD_LEFT_SHOULDER)
-                self.gamepad.update()
- 
-                print(f"Anti-AFK: Waiting {self.anti_afk_interval} seconds")
-                time.sleep(self.anti_afk_interval)
+                self.log.debug("Anti-AFK: Waiting %s seconds", cfg.anti_afk_interval)
+                yield cfg.left_bumper_duration + cfg.anti_afk_interval
  
             except Exception as e:
-                print(f"Error in anti-AFK loop: {e}")
-                time.sleep(1)
+                if self._detached(report):
+                    break  # Pad closed by a disconnect mid-step
+                self.log.exception("Error in anti-AFK loop")
+                self._set_error(e)
+                yield 1
  
-        print("Anti-AFK loop ended")
+        self.log.info("Anti-AFK loop ended")
     
     def start(self):
         """Start the controller"""
         if not self.running and self.gamepad:
-            print("Starting controller...")
+            self.log.info("Starting controller (random seed %d)...", self.rng.seed)
             self.running = True
             self.movement_enabled = False  # Start with movement disabled
             
-            # Start movement thread
-            self.thread = threading.Thread(target=self._movement_loop)
-            self.thread.daemon = True
-            self.thread.start()
+            # Start movement task
+            self.movement_task = self.scheduler.spawn(self._movement_loop(), name=f"{self.name}:movement",
+                                                      metrics=self.metrics.movement)
             
-            print("Controller started")
+            self.log.info("Controller started")
     
     def stop(self):
         """Stop the controller"""
         self.running = False
         self.movement_enabled = False
         self.anti_afk_enabled = False
-        if self.thread:
-            self.thread.join(timeout=1)
-            self.thread = None
-        if self.anti_afk_thread:
-            self.anti_afk_thread.join(timeout=1)
-            self.anti_afk_thread = None
-        print("Controller stopped")
+        if self.movement_task:
+            self.movement_task.cancel()
+            self.movement_task = None
+        if self.anti_afk_task:
+            self.anti_afk_task.cancel()
+            self.anti_afk_task = None
+        # A running macro (class selection) stops pressing buttons too
+        self.mailbox.cancel_macros()
+        if self.phase != 'idle':
+            self.phase = 'idle'
+            self.metrics.phase_changed('idle')
+        self._notify()
+        self.log.info("Controller stopped")
     
     def toggle_movement(self):
         """Toggle movement bot"""
-        print(f"Toggling movement from {self.movement_enabled} to {not self.movement_enabled}")
+        self.log.info("Toggling movement from %s to %s", self.movement_enabled, not self.movement_enabled)
         self.movement_enabled = not self.movement_enabled
+        # Wake the loop so the change applies now rather than at its next step
+        if self.movement_task:
+            self.movement_task.wake()
+        self._notify()
+        return self.movement_enabled
+    
+    def set_movement(self, enabled):
+        """Enable or disable movement; no-op if already in that state"""
+        if self.movement_enabled != enabled:
+            self.toggle_movement()
         return self.movement_enabled
     
     def toggle_anti_afk(self):
         """Toggle anti-AFK"""
-        print(f"Toggling anti-AFK from {self.anti_afk_enabled} to {not self.anti_afk_enabled}")
+        self.log.info("Toggling anti-AFK from %s to %s", self.anti_afk_enabled, not self.anti_afk_enabled)
         if not self.anti_afk_enabled:
             self.anti_afk_enabled = True
-            self.anti_afk_thread = threading.Thread(target=self._anti_afk_loop)
-            self.anti_afk_thread.daemon = True
-            self.anti_afk_thread.start()
+            # Never a second loop pressing bumpers alongside a live one
+            if self.anti_afk_task is None or self.anti_afk_task.done:
+                self.anti_afk_task = self.scheduler.spawn(self._anti_afk_loop(), name=f"{self.name}:anti-afk",
+                                                          metrics=self.metrics.anti_afk)
         else:
             self.anti_afk_enabled = False
-            if self.anti_afk_thread:
-                self.anti_afk_thread.join(timeout=1)
-                self.anti_afk_thread = None
+            if self.anti_afk_task:
+                self.anti_afk_task.cancel()
+                self.anti_afk_task = None
+        self._notify()
+        return self.anti_afk_enabled
+    
+    def set_anti_afk(self, enabled):
+        """Enable or disable anti-AFK; no-op if already in that state"""
+        if self.anti_afk_enabled != enabled:
+            self.toggle_anti_afk()
         return self.anti_afk_enabled
     
     def select_class(self):
-        """Select a class by pressing A button 5 times"""
+        """Select a class by pressing A button 5 times (blocks for about 7 s)"""
         if not self.gamepad:
-            print("Gamepad not connected")
+            self.log.warning("Gamepad not connected")
             return False
-            
-        print("Selecting class...")
-        time.sleep(2)  # Initial wait
+        
+        return self._run_blocking(self.select_class_steps())
+    
+    def select_class_steps(self):
+        """Class selection macro as a scheduler generator; returns True when done"""
+        if self.report is None:
+            raise RuntimeError("Gamepad not connected")
+        self.log.info("Selecting class...")
+        yield 2  # Initial wait
         
         for i in range(5):
-            print(f"Class selection press {i+1}/5")
-            self.gamepad.press_button(button=vg.XUSB_BUTTON.XUSB_GAMEPAD_A)
-            self.gamepad.update()
-            time.sleep(0.1)  # Short press duration
-            self.gamepad.release_button(button=vg.XUSB_BUTTON.XUSB_GAMEPAD_A)
-            self.gamepad.update()
-            time.sleep(0.9)  # Wait remaining time to make it 1 second total
+            report = self.report
+            if report is None:
+                raise RuntimeError("Gamepad disconnected during class selection")
+            self.log.debug("Class selection press %d/5", i + 1)
+            self._pulse_button(report, Button.A)  # Released by the scheduler after the press duration
+            self.metrics.action('select_class')
+            report.flush()
+            yield 1  # One press per second
             
-        print("Class selection complete")
+        self.log.info("Class selection complete")
         return True
     
     def _movement_loop(self):
-        """Movement loop that simulates random controller inputs with breaks"""
-        print("Movement loop started")
+        """Movement loop that simulates random controller inputs with breaks (scheduler task)"""
+        self.log.info("Movement loop started")
         last_x_press = 0  # Track last X button press time
         last_movement_was_forward = False  # Track last movement direction
         current_move_x = 0  # Track current movement values for smooth transitions
@@ -251,31 +422,41 @@ class GamepadController:
         current_look_y = 0
         last_jump_time = 0  # Track last jump time
         last_weapon_switch_time = 0  # Track last weapon switch time
+        log_enabled = self.log.isEnabledFor  # Level check is cached by logging
+        tick_sampler = Sampler()
+        rng = self.rng
         
-        while self.running and self.gamepad:
+        while True:
+            # Read once per step: disconnect() may clear it from another worker
+            report = self.report
+            if self._detached(report):
+                break
             try:
                 if not self.movement_enabled:
-                    # Reset controller state when movement is disabled
-                    self.gamepad.left_joystick_float(x_value_float=0, y_value_float=0)
-                    self.gamepad.right_joystick_float(x_value_float=0, y_value_float=0)
-                    self.gamepad.left_trigger_float(value_float=0)
-                    self.gamepad.right_trigger_float(value_float=0)
-                    self.gamepad.update()
-                    time.sleep(0.1)
+                    # Reset controller state when movement is disabled (sent only once)
+                    report.neutral()
+                    report.flush()
+                    self._set_phase('idle')
+                    yield None  # Parked until toggle_movement wakes the task
                     continue
                 
-                # Automatically disable Anti-AFK when movement starts
+                # Automatically disable Anti-AFK when movement starts; queued
+                # like any other command rather than run from this task
                 if self.anti_afk_enabled:
-                    print("Automatically disabling Anti-AFK")
-                    self.toggle_anti_afk()
+                    self.log.info("Automatically disabling Anti-AFK")
+                    self.submit('set_anti_afk', False)
+                
+                # Settings snapshot for this phase; each tick re-reads it once
+                cfg = self.settings
                 
                 # Randomize movement duration for this cycle
-                current_movement_duration = random.uniform(self.min_movement_duration, self.max_movement_duration)
-                current_break_duration = random.uniform(self.min_break_duration, self.max_break_duration)
+                current_movement_duration = rng.uniform(cfg.min_movement_duration, cfg.max_movement_duration)
+                current_break_duration = rng.uniform(cfg.min_break_duration, cfg.max_break_duration)
                 
                 # Movement phase
-                print(f"Starting movement phase for {current_movement_duration:.1f} seconds")
+                self.log.info("Starting movement phase for %.1f seconds", current_movement_duration)
                 movement_start_time = time.time()
+                self._set_phase('movement')
                 
                 # Choose movement type based on previous movement
                 if last_movement_was_forward:
@@ -284,56 +465,59 @@ class GamepadController:
                     movement_type = 'forward'
                 last_movement_was_forward = (movement_type == 'forward')
                 
-                print(f"Movement type: {movement_type}")
+                self.log.debug("Movement type: %s", movement_type)
+                
+                # Ticks are scheduled on a fixed cadence from the phase start
+                next_tick = time.monotonic()
+                self._rate_window_start = next_tick
+                self._rate_window_ticks = 0
                 
                 # Continue movement until duration is reached or movement is disabled
-                while self.running and self.movement_enabled and (time.time() - movement_start_time) < current_movement_duration:
+                while self.movement_enabled and (time.time() - movement_start_time) < current_movement_duration:
+                    if self._detached(report):
+                        break
+                    cfg = self.settings
                     current_time = time.time()
+                    self._count_tick(time.monotonic())
+                    # Every random value of this tick, from one pre-drawn row
+                    r_x, r_jump, r_weapon, r_look_x, r_look_y, r_move_x, r_move_y, r_ads, r_shoot = rng.tick()
                     
+                    # Button presses release themselves through scheduled events
                     # X button press check
-                    if current_time - last_x_press >= self.x_button_interval and random.random() < self.x_button_chance:
-                        print("X button pressed")
-                        self.gamepad.press_button(button=vg.XUSB_BUTTON.XUSB_GAMEPAD_X)
-                        self.gamepad.update()
-                        time.sleep(0.1)
-                        self.gamepad.release_button(button=vg.XUSB_BUTTON.XUSB_GAMEPAD_X)
-                        self.gamepad.update()
+                    if current_time - last_x_press >= cfg.x_button_interval and r_x < cfg.x_button_chance:
+                        self.log.debug("X button pressed")
+                        self._pulse_button(report, Button.X)
+                        self.metrics.action('x')
                         last_x_press = current_time
                     
                     # Jump check
-                    if current_time - last_jump_time >= self.jump_interval and random.random() < self.jump_chance:
-                        print("Jumping")
-                        self.gamepad.press_button(button=vg.XUSB_BUTTON.XUSB_GAMEPAD_A)
-                        self.gamepad.update()
-                        time.sleep(0.1)
-                        self.gamepad.release_button(button=vg.XUSB_BUTTON.XUSB_GAMEPAD_A)
-                        self.gamepad.update()
+                    if current_time - last_jump_time >= cfg.jump_interval and r_jump < cfg.jump_chance:
+                        self.log.debug("Jumping")
+                        self._pulse_button(report, Button.A)
+                        self.metrics.action('jump')
                         last_jump_time = current_time
                     
                     # Weapon switch check
-                    if current_time - last_weapon_switch_time >= self.weapon_switch_interval and random.random() < self.weapon_switch_chance:
-                        print("Switching weapon")
-                        self.gamepad.press_button(button=vg.XUSB_BUTTON.XUSB_GAMEPAD_Y)
-                        self.gamepad.update()
-                        time.sleep(0.1)
-                        self.gamepad.release_button(button=vg.XUSB_BUTTON.XUSB_GAMEPAD_Y)
-                        self.gamepad.update()
+                    if current_time - last_weapon_switch_time >= cfg.weapon_switch_interval and r_weapon < cfg.weapon_switch_chance:
+                        self.log.debug("Switching weapon")
+                        self._pulse_button(report, Button.Y)
+                        self.metrics.action('weapon_switch')
                         last_weapon_switch_time = current_time
                     
                     # Generate target look values
-                    target_look_x = random.uniform(-1, 1) * self.look_intensity * 1.5  # Increased look intensity
-                    target_look_y = random.uniform(-1, 1) * self.look_intensity * 1.5  # Increased look intensity
+                    target_look_x = (r_look_x * 2 - 1) * cfg.look_intensity * 1.5  # Increased look intensity
+                    target_look_y = (r_look_y * 2 - 1) * cfg.look_intensity * 1.5  # Increased look intensity
                     
                     # Smoothly interpolate look values
                     current_look_x = self._smooth_value(current_look_x, target_look_x, 0.1)
                     current_look_y = self._smooth_value(current_look_y, target_look_y, 0.1)
                     
                     # Set movement based on type with smooth transitions
-                    target_move_x = random.uniform(-0.3, 0.3) * self.move_intensity  # Small side-to-side movement
+                    target_move_x = (r_move_x * 0.6 - 0.3) * cfg.move_intensity  # Small side-to-side movement
                     if movement_type == 'forward':
-                        target_move_y = random.uniform(0.7, 1.0) * self.forward_intensity
+                        target_move_y = (0.7 + r_move_y * 0.3) * cfg.forward_intensity
                     else:  # backward
-                        target_move_y = random.uniform(-0.7, -1.0) * self.forward_intensity
+                        target_move_y = (-0.7 - r_move_y * 0.3) * cfg.forward_intensity
                     
                     # Smoothly interpolate movement values
                     current_move_x = self._smooth_value(current_move_x, target_move_x, 0.15)
@@ -345,55 +529,66 @@ class GamepadController:
                     current_move_x = max(min(current_move_x, 1), -1)
                     current_move_y = max(min(current_move_y, 1), -1)
                     
-                    print(f"Movement: type={movement_type}, pos=({current_move_x:.2f}, {current_move_y:.2f})")
+                    # Per-tick line: skipped entirely unless debug is on, then sampled
+                    if log_enabled(logging.DEBUG) and tick_sampler.allow():
+                        self.log.debug("Movement: type=%s, pos=(%.2f, %.2f)", movement_type, current_move_x, current_move_y)
                     
-                    self.gamepad.right_joystick_float(x_value_float=current_look_x, y_value_float=current_look_y)
-                    self.gamepad.left_joystick_float(x_value_float=current_move_x, y_value_float=current_move_y)
+                    report.set_right_stick(current_look_x, current_look_y)
+                    report.set_left_stick(current_move_x, current_move_y)
                     
                     # Random actions with configured chances
-                    if random.random() < self.ads_chance:
-                        print("ADS triggered")
-                        self.gamepad.left_trigger_float(value_float=1.0)
-                        time.sleep(0.1)
-                    else:
-                        self.gamepad.left_trigger_float(value_float=0.0)
+                    if r_ads < cfg.ads_chance:
+                        self.log.debug("ADS triggered")
+                        self._pull_trigger(report, 'left', BUTTON_PRESS_DURATION)
+                        self.metrics.action('ads')
+                    
+                    if r_shoot < cfg.shoot_chance:
+                        self.log.debug("Shooting")
+                        self._pull_trigger(report, 'right', cfg.shoot_duration)
+                        self.metrics.action('shoot')
                     
-                    if random.random() < self.shoot_chance:
-                        print("Shooting")
-                        self.gamepad.right_trigger_float(value_float=1.0)
-                        self.gamepad.update()
-                        time.sleep(self.shoot_duration)
-                        self.gamepad.right_trigger_float(value_float=0.0)
-                        self.gamepad.update()
+                    # One report for everything that changed this tick
+                    report.flush()
                     
-                    self.gamepad.update()
-                    time.sleep(0.01)  # Small sleep to prevent excessive CPU usage
+                    # Keep the cadence; resync instead of bursting after a stall
+                    next_tick += TICK_INTERVAL
+                    delay = next_tick - time.monotonic()
+                    if delay < -TICK_INTERVAL:
+                        next_tick = time.monotonic()
+                        delay = 0
+                    yield max(delay, 0)
                 
                 # Break phase - only if movement is still enabled
-                if self.running and self.movement_enabled:
-                    print(f"Starting break phase for {current_break_duration:.1f} seconds")
+                if self.movement_enabled and not self._detached(report):
+                    self.log.info("Starting break phase for %.1f seconds", current_break_duration)
                     
                     # Reset controller state during break
-                    self.gamepad.left_joystick_float(x_value_float=0, y_value_float=0)
-                    self.gamepad.right_joystick_float(x_value_float=0, y_value_float=0)
-                    self.gamepad.left_trigger_float(value_float=0)
-                    self.gamepad.right_trigger_float(value_float=0)
-                    self.gamepad.update()
+                    report.neutral()
+                    report.flush()
+                    self._set_phase('break')
                     
-                    break_start = time.time()
-                    while self.running and self.movement_enabled and (time.time() - break_start) < current_break_duration:
-                        time.sleep(0.1)  # Check movement state every 100ms
+                    # A toggle wakes the task early, ending the break at once
+                    break_end = time.monotonic() + current_break_duration
+                    while self.movement_enabled and not self._detached(report):
+                        remaining = break_end - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        yield remaining
                     
-                    print("Break phase complete")
+                    self.log.debug("Break phase complete")
             
             except Exception as e:
-                print(f"Error in movement loop: {e}")
-                time.sleep(1)
+                if self._detached(report):
+                    break  # Pad closed by a disconnect mid-step
+                self.log.exception("Error in movement loop")
+                self._set_error(e)
+                yield 1
         
-        print("Movement loop ended")
+        self.log.info("Movement loop ended")
  
 if __name__ == "__main__":
     # Example usage
+    setup_logging()
     controller = GamepadController()
     
     try:
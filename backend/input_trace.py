@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Binary input traces: record every report a controller sends, replay it later.
+
+A trace is a 16-byte header followed by fixed-width 20-byte records:
+
+    timestamp  float64  seconds since the first report
+    lx ly rx ry  int16  stick axes scaled to [-32767, 32767]
+    lt rt        uint8  triggers scaled to [0, 255]
+    buttons     uint16  XUSB button bitmask
+
+The integer ranges are the ones the XUSB report itself uses, so a trace
+holds exactly what reaches the driver. Readers memory-map the file.
+The server records every controller when NIZUA_TRACE_DIR is set.
+
+    python input_trace.py info lobby1.nztrace
+    python input_trace.py replay lobby1.nztrace --backend vgamepad
+    python input_trace.py compare before.nztrace after.nztrace
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+
+from gamepad_backends import BACKENDS, Button, GamepadBackend, get_backend_factory
+
+MAGIC = b'NZTR'
+VERSION = 1
+HEADER = struct.Struct('<4sHHd')  # magic, version, record size, wall-clock start
+RECORD = struct.Struct('<dhhhhBBH')
+AXIS_SCALE = 32767
+TRIGGER_SCALE = 255
+# Replay sleeps until this close to a report's time, then spins
+SPIN_THRESHOLD = 0.002
+TRACE_SUFFIX = '.nztrace'
+
+
+def _axis(value):
+    return max(-AXIS_SCALE, min(AXIS_SCALE, round(value * AXIS_SCALE)))
+
+
+def _trigger(value):
+    return max(0, min(TRIGGER_SCALE, round(value * TRIGGER_SCALE)))
+
+
+class TraceWriter:
+    """Appends fixed-width report records to a trace file"""
+
+    def __init__(self, path, clock=time.perf_counter):
+        self.path = path
+        self._clock = clock
+        self._file = open(path, 'wb', buffering=64 * 1024)
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, time.time()))
+        self._start = None
+        self.count = 0
+
+    def write(self, axes, buttons, timestamp=None):
+        """Record one report: axes is (lx, ly, rx, ry, lt, rt) as floats"""
+        now = self._clock() if timestamp is None else timestamp
+        if self._start is None:
+            self._start = now
+        self._file.write(RECORD.pack(
+            now - self._start,
+            _axis(axes[0]), _axis(axes[1]), _axis(axes[2]), _axis(axes[3]),
+            _trigger(axes[4]), _trigger(axes[5]),
+            buttons
+        ))
+        self.count += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TracingBackend(GamepadBackend):
+    """Backend that records each report to a trace, then forwards it to an inner backend"""
+
+    def __init__(self, path, inner=None):
+        self.inner = inner
+        self.init_delay = inner.init_delay if inner is not None else 0.0
+        self.writer = TraceWriter(path)
+        self._axes = [0.0] * 6
+        self._button_bits = 0
+
+    def press_button(self, button):
+        self._button_bits |= int(button)
+        if self.inner is not None:
+            self.inner.press_button(button=button)
+
+    def release_button(self, button):
+        self._button_bits &= ~int(button)
+        if self.inner is not None:
+            self.inner.release_button(button=button)
+
+    def left_joystick_float(self, x_value_float, y_value_float):
+        self._axes[0] = x_value_float
+        self._axes[1] = y_value_float
+        if self.inner is not None:
+            self.inner.left_joystick_float(x_value_float=x_value_float, y_value_float=y_value_float)
+
+    def right_joystick_float(self, x_value_float, y_value_float):
+        self._axes[2] = x_value_float
+        self._axes[3] = y_value_float
+        if self.inner is not None:
+            self.inner.right_joystick_float(x_value_float=x_value_float, y_value_float=y_value_float)
+
+    def left_trigger_float(self, value_float):
+        self._axes[4] = value_float
+        if self.inner is not None:
+            self.inner.left_trigger_float(value_float=value_float)
+
+    def right_trigger_float(self, value_float):
+        self._axes[5] = value_float
+        if self.inner is not None:
+            self.inner.right_trigger_float(value_float=value_float)
+
+    def update(self):
+        self.writer.write(self._axes, self._button_bits)
+        if self.inner is not None:
+            self.inner.update()
+
+    def close(self):
+        self.writer.close()
+        if self.inner is not None:
+            self.inner.close()
+
+
+def tracing_factory(inner_factory, directory, name):
+    """Backend factory recording each connection of controller name to a new trace
+
+    Files are named <name>-<date>-<time>.nztrace in directory, in front of
+    backends built by inner_factory (None records without any output).
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    def factory():
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(directory, f"{name}-{stamp}{TRACE_SUFFIX}")
+        suffix = 1
+        while os.path.exists(path):
+            suffix += 1
+            path = os.path.join(directory, f"{name}-{stamp}-{suffix}{TRACE_SUFFIX}")
+        return TracingBackend(path, inner_factory() if inner_factory else None)
+    return factory
+
+
+def backend_factory_for(name):
+    """Backend factory for controller name: traced when NIZUA_TRACE_DIR is set
+
+    Returns None otherwise, leaving GamepadController on its default backend.
+    """
+    trace_dir = os.environ.get('NIZUA_TRACE_DIR')
+    if not trace_dir:
+        return None
+    return tracing_factory(get_backend_factory(), trace_dir, name)
+
+
+class TraceReader:
+    """Memory-mapped, random-access view of a trace file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER.size:
+            self._file.close()
+            raise ValueError(f"{path}: not a trace file (too short)")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, self.started_at = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path}: unsupported trace (magic {magic!r}, version {version})")
+        # A partially written last record (crash while recording) is ignored
+        self.count = (size - HEADER.size) // RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def record(self, index):
+        """Raw record: (timestamp, lx, ly, rx, ry, lt, rt, buttons) as stored"""
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return RECORD.unpack_from(self._map, HEADER.size + index * RECORD.size)
+
+    def __getitem__(self, index):
+        """Decoded report: (timestamp, (lx, ly, rx, ry, lt, rt) as floats, buttons)"""
+        if index < 0:
+            index += self.count
+        t, lx, ly, rx, ry, lt, rt, buttons = self.record(index)
+        return (t, (lx / AXIS_SCALE, ly / AXIS_SCALE, rx / AXIS_SCALE, ry / AXIS_SCALE,
+                    lt / TRIGGER_SCALE, rt / TRIGGER_SCALE), buttons)
+
+    def records(self):
+        """Iterate over the raw records without copying the file"""
+        view = memoryview(self._map)[HEADER.size:HEADER.size + self.count * RECORD.size]
+        try:
+            yield from RECORD.iter_unpack(view)
+        finally:
+            view.release()
+
+    def duration(self):
+        return self.record(self.count - 1)[0] if self.count else 0.0
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def replay(reader, backend, speed=1.0, clock=time.perf_counter, sleep=time.sleep):
+    """Send every report of a trace to backend at its recorded time
+
+    Sleeps until shortly before each report is due, then spins, so reports
+    go out within microseconds of their schedule. Returns timing stats.
+    """
+    sent_buttons = 0
+    late_total = 0.0
+    late_max = 0.0
+    count = 0
+    start = clock()
+    for t, lx, ly, rx, ry, lt, rt, buttons in reader.records():
+        due = start + t / speed
+        remaining = due - clock()
+        if remaining > SPIN_THRESHOLD:
+            sleep(remaining - SPIN_THRESHOLD)
+        while clock() < due:
+            pass
+
+        backend.left_joystick_float(x_value_float=lx / AXIS_SCALE, y_value_float=ly / AXIS_SCALE)
+        backend.right_joystick_float(x_value_float=rx / AXIS_SCALE, y_value_float=ry / AXIS_SCALE)
+        backend.left_trigger_float(value_float=lt / TRIGGER_SCALE)
+        backend.right_trigger_float(value_float=rt / TRIGGER_SCALE)
+        changed = buttons ^ sent_buttons
+        while changed:
+            bit = changed & -changed
+            if buttons & bit:
+                backend.press_button(button=Button(bit))
+            else:
+                backend.release_button(button=Button(bit))
+            changed ^= bit
+        sent_buttons = buttons
+        backend.update()
+
+        late = clock() - due
+        late_total += late
+        if late > late_max:
+            late_max = late
+        count += 1
+    return {
+        'reports': count,
+        'duration_s': clock() - start,
+        'late_avg_ms': late_total / count * 1000 if count else 0.0,
+        'late_max_ms': late_max * 1000
+    }
+
+
+def compare(a, b):
+    """Compare two traces report for report, ignoring timestamps
+
+    Returns the number of reports compared, how many differ, and the index
+    of the first difference (None if identical over the common length).
+    """
+    differing = 0
+    first = None
+    compared = 0
+    for index, (ra, rb) in enumerate(zip(a.records(), b.records())):
+        compared += 1
+        if ra[1:] != rb[1:]:
+            differing += 1
+            if first is None:
+                first = index
+    return {
+        'compared': compared,
+        'differing': differing,
+        'first_difference': first,
+        'length_a': len(a),
+        'length_b': len(b)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect, replay and compare input traces")
+    commands = parser.add_subparsers(dest='command', required=True)
+    info = commands.add_parser('info', help="summary of a trace")
+    info.add_argument('trace')
+    play = commands.add_parser('replay', help="send a trace to a gamepad backend")
+    play.add_argument('trace')
+    play.add_argument('--backend', default='vgamepad', choices=sorted(BACKENDS))
+    play.add_argument('--speed', type=float, default=1.0)
+    diff = commands.add_parser('compare', help="compare two traces report for report")
+    diff.add_argument('a')
+    diff.add_argument('b')
+    args = parser.parse_args(argv)
+
+    if args.command == 'info':
+        with TraceReader(args.trace) as reader:
+            duration = reader.duration()
+            rate = (len(reader) - 1) / duration if duration > 0 else 0.0
+            print(f"{args.trace}: {len(reader)} reports over {duration:.2f} s ({rate:.1f} Hz), "
+                  f"recorded {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(reader.started_at))}")
+    elif args.command == 'replay':
+        backend = BACKENDS[args.backend]()
+        time.sleep(backend.init_delay)
+        try:
+            with TraceReader(args.trace) as reader:
+                stats = replay(reader, backend, speed=args.speed)
+        finally:
+            backend.close()
+        print(f"Replayed {stats['reports']} reports in {stats['duration_s']:.2f} s, "
+              f"late avg {stats['late_avg_ms']:.3f} ms, max {stats['late_max_ms']:.3f} ms")
+    else:
+        with TraceReader(args.a) as a, TraceReader(args.b) as b:
+            result = compare(a, b)
+        print(result)
+        return 0 if not result['differing'] and result['length_a'] == result['length_b'] else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from log_setup import get_logger
+
+log = get_logger('jobs')
+
+# Job states
+PENDING = 'pending'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class Job:
+    """A long-running controller action tracked by id"""
+    __slots__ = ('id', 'kind', 'lobby_id', 'state', 'result', 'error',
+                 'created_at', 'started_at', 'finished_at', '_cancel')
+
+    def __init__(self, kind, lobby_id):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.lobby_id = lobby_id
+        self.state = PENDING
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # Set by the runner: cancels the underlying future
+        self._cancel = None
+
+    @property
+    def finished(self):
+        return self.state in FINISHED_STATES
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'lobby_id': self.lobby_id,
+            'state': self.state,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class JobManager:
+    """Runs long controller actions in the background and tracks their state
+
+    Blocking calls go to a small thread pool (submit); commands queued to
+    a controller, such as macros, are tracked through their Future
+    (start_command). on_change(job) is called on every state change so
+    completion can be pushed to clients. Finished jobs are kept for lookups
+    up to keep_finished entries.
+    """
+
+    def __init__(self, max_workers=4, on_change=None, keep_finished=256):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.on_change = on_change
+        self.keep_finished = keep_finished
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, job_id):
+        """Return a job by id, or None"""
+        return self._jobs.get(job_id)
+
+    def list(self, lobby_id=None):
+        """Return the tracked jobs, oldest first, optionally for one lobby"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if lobby_id is not None:
+            jobs = [job for job in jobs if job.lobby_id == lobby_id]
+        return jobs
+
+    def _register(self, kind, lobby_id, unique):
+        """Create a job, or return the active one of the same kind when unique (lock held)"""
+        if unique:
+            for job in self._jobs.values():
+                if job.kind == kind and job.lobby_id == lobby_id and not job.finished:
+                    return job, False
+        job = Job(kind, lobby_id)
+        self._jobs[job.id] = job
+        self._prune()
+        return job, True
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond keep_finished (lock held)"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def _notify(self, job):
+        if self.on_change:
+            try:
+                self.on_change(job)
+            except Exception:
+                log.exception("Error in job listener")
+
+    def _transition(self, job, state, result=None, error=None):
+        """Move a job to a new state; finished jobs never change again"""
+        with self._lock:
+            if job.finished:
+                return False
+            job.state = state
+            if state == RUNNING:
+                job.started_at = time.time()
+            else:
+                job.result = result
+                job.error = error
+                job.finished_at = time.time()
+        self._notify(job)
+        return True
+
+    def _complete(self, job, result):
+        # Server actions return {"success": ...} or {"error": ...} dicts
+        if isinstance(result, dict) and 'error' in result:
+            self._transition(job, FAILED, result=result, error=result['error'])
+        else:
+            self._transition(job, SUCCEEDED, result=result)
+
+    def submit(self, kind, lobby_id, fn, *args, unique=True):
+        """Run fn(*args) on the job pool; returns the Job right away"""
+        with self._lock:
+            job, created = self._register(kind, lobby_id, unique)
+        if not created:
+            return job
+        self._notify(job)
+
+        def run():
+            if not self._transition(job, RUNNING):
+                return
+            try:
+                result = fn(*args)
+            except Exception as e:
+                self._transition(job, FAILED, error=str(e))
+                return
+            self._complete(job, result)
+
+        future = self._executor.submit(run)
+        # A job can only be cancelled before its thread picks it up
+        job._cancel = future.cancel
+        return job
+
+    def start_command(self, kind, lobby_id, submit, unique=True, to_result=None):
+        """Track a controller command as a job; submit() queues it and returns its Future
+
+        to_result(value) turns the command's return value into the job
+        result (a server action dict). Cancelling the job cancels the
+        Future: a queued command is skipped, a running macro stops before
+        its next step.
+        """
+        with self._lock:
+            job, created = self._register(kind, lobby_id, unique)
+        if not created:
+            return job
+        self._notify(job)
+        self._transition(job, RUNNING)
+        try:
+            future = submit()
+        except Exception as e:
+            self._transition(job, FAILED, error=str(e))
+            return job
+
+        def done(future):
+            if future.cancelled():
+                self._transition(job, CANCELLED)
+            elif future.exception() is not None:
+                self._transition(job, FAILED, error=str(future.exception()))
+            else:
+                result = future.result()
+                self._complete(job, to_result(result) if to_result else result)
+
+        job._cancel = future.cancel
+        future.add_done_callback(done)
+        return job
+
+    def cancel(self, job_id):
+        """Cancel a job; returns the job, or None if unknown
+
+        Check job.state afterwards: a job that already finished, or whose
+        blocking call has started, keeps its state.
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        if job._cancel and job._cancel():
+            self._transition(job, CANCELLED)
+        return job
+
+    def shutdown(self):
+        """Cancel pending jobs and running macros, and stop accepting work"""
+        for job in self.list():
+            if not job.finished:
+                self.cancel(job.id)
+        self._executor.shutdown(wait=False, cancel_futures=True)
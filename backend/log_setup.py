@@ -0,0 +1,103 @@
+import atexit
+import logging
+import os
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(controller)s] %(message)s"
+DEFAULT_LEVEL = "INFO"
+QUEUE_SIZE = 10000
+# Per-tick debug lines are kept to at most one per interval per controller
+DEBUG_SAMPLE_INTERVAL = 1.0
+
+_listener = None
+
+
+class _ContextFilter(logging.Filter):
+    """Gives records logged outside a controller an empty context"""
+
+    def filter(self, record):
+        if not hasattr(record, 'controller'):
+            record.controller = '-'
+        return True
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queues records unformatted and drops them when the queue is full
+
+    The stock QueueHandler formats in the caller's thread; here formatting
+    happens on the listener thread, and a full queue never blocks a tick.
+    """
+
+    dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class Sampler:
+    """Lets one event through per interval; used to thin out per-tick debug logs"""
+    __slots__ = ('interval', '_next')
+
+    def __init__(self, interval=DEBUG_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._next = 0.0
+
+    def allow(self):
+        now = time.monotonic()
+        if now < self._next:
+            return False
+        self._next = now + self.interval
+        return True
+
+
+def setup_logging(level=None, stream=None):
+    """Route the 'nizua' loggers through a background queue listener
+
+    The level comes from the argument, then NIZUA_LOG_LEVEL, then INFO.
+    Calling it again only updates the level.
+    """
+    global _listener
+    level = (level or os.environ.get('NIZUA_LOG_LEVEL') or DEFAULT_LEVEL).upper()
+    logger = logging.getLogger('nizua')
+    logger.setLevel(level)
+    if _listener is not None:
+        return logger
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+    output.addFilter(_ContextFilter())
+
+    log_queue = queue.Queue(QUEUE_SIZE)
+    logger.addHandler(_DeferredQueueHandler(log_queue))
+    logger.propagate = False
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return logger
+
+
+def shutdown_logging():
+    """Write out queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name):
+    """Logger under the 'nizua' hierarchy"""
+    return logging.getLogger(f'nizua.{name}')
+
+
+def controller_logger(controller):
+    """Logger whose records carry the controller (lobby) name"""
+    return logging.LoggerAdapter(get_logger('controller'), {'controller': controller})
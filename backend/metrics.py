@@ -0,0 +1,249 @@
+import threading
+import time
+from bisect import bisect_left
+
+# Bucket upper bounds in seconds (an implicit +Inf bucket follows)
+TICK_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+LAG_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 1.0)
+UPDATE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025)
+HTTP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+
+
+class Counter:
+    """Monotonic counter"""
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        return [(name, labels, self.value)]
+
+
+class Timer(Counter):
+    """Counter of seconds that also counts the interval still running
+
+    start() opens an interval and stop() adds it to the total; an open
+    interval is included, up to now, whenever the counter is read.
+    """
+    __slots__ = ('_since',)
+
+    def __init__(self):
+        super().__init__()
+        self._since = None
+
+    def start(self, now):
+        with self._lock:
+            if self._since is None:
+                self._since = now
+
+    def stop(self, now):
+        with self._lock:
+            if self._since is not None:
+                self.value += now - self._since
+                self._since = None
+
+    def samples(self, name, labels):
+        with self._lock:
+            value = self.value
+            if self._since is not None:
+                value += time.monotonic() - self._since
+        return [(name, labels, value)]
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect and three additions
+
+    Buckets never grow, so memory is constant however many values are observed.
+    """
+    __slots__ = ('bounds', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        result = []
+        cumulative = 0
+        for bound, bucket in zip(self.bounds + (float('inf'),), counts):
+            cumulative += bucket
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            result.append((name + '_bucket', labels + (('le', le),), cumulative))
+        result.append((name + '_sum', labels, total))
+        result.append((name + '_count', labels, count))
+        return result
+
+
+class Family:
+    """A named metric with one child per label combination"""
+
+    def __init__(self, name, help_text, kind, label_names, factory):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.label_names = label_names
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Return the child for these label values; fetch once and keep it on hot paths"""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._factory())
+        return child
+
+    def collect(self):
+        """Return (name, help, kind, samples); plain tuples, so they can cross a pipe"""
+        samples = []
+        for values, child in list(self._children.items()):
+            samples.extend(child.samples(self.name, tuple(zip(self.label_names, values))))
+        return self.name, self.help, self.kind, samples
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class Registry:
+    """Set of metric families rendered together in Prometheus text format"""
+
+    def __init__(self):
+        self._families = []
+
+    def counter(self, name, help_text, label_names=()):
+        return self._add(Family(name, help_text, 'counter', label_names, Counter))
+
+    def timer(self, name, help_text, label_names=()):
+        return self._add(Family(name, help_text, 'counter', label_names, Timer))
+
+    def histogram(self, name, help_text, bounds, label_names=()):
+        return self._add(Family(name, help_text, 'histogram', label_names, lambda: Histogram(bounds)))
+
+    def _add(self, family):
+        self._families.append(family)
+        return family
+
+    def collect(self):
+        """Samples of every family (see Family.collect)"""
+        return [family.collect() for family in self._families]
+
+    def render(self, others=()):
+        """Prometheus text of this registry, merged with collect() results of other processes"""
+        families = {}
+        for collected in [self.collect(), *others]:
+            for name, help_text, kind, samples in collected:
+                if name in families:
+                    families[name][2].extend(samples)
+                else:
+                    families[name] = (help_text, kind, list(samples))
+        lines = []
+        for name, (help_text, kind, samples) in families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+TICK_DURATION = REGISTRY.histogram(
+    'nizua_tick_duration_seconds', 'Time spent running one step of a controller loop',
+    TICK_BUCKETS, ('controller', 'loop'))
+TICK_LAG = REGISTRY.histogram(
+    'nizua_tick_lag_seconds', 'Delay between a loop step deadline and its start',
+    LAG_BUCKETS, ('controller', 'loop'))
+GAMEPAD_UPDATES = REGISTRY.histogram(
+    'nizua_gamepad_update_seconds', 'Latency of gamepad.update() calls (the count is the number of calls)',
+    UPDATE_BUCKETS, ('controller',))
+ACTIONS = REGISTRY.counter(
+    'nizua_actions_total', 'Inputs triggered by the controller loops, by type',
+    ('controller', 'action'))
+PHASE_TIME = REGISTRY.timer(
+    'nizua_phase_seconds_total', 'Time spent by the movement loop of a connected controller in each phase',
+    ('controller', 'phase'))
+HTTP_LATENCY = REGISTRY.histogram(
+    'nizua_http_request_duration_seconds', 'HTTP request latency per route',
+    HTTP_BUCKETS, ('route', 'method', 'status'))
+
+
+class LoopMetrics:
+    """Tick histograms of one controller loop, observed by the scheduler"""
+    __slots__ = ('duration', 'lag')
+
+    def __init__(self, controller, loop):
+        self.duration = TICK_DURATION.labels(controller, loop)
+        self.lag = TICK_LAG.labels(controller, loop)
+
+    def observe(self, lag, duration):
+        self.lag.observe(lag)
+        self.duration.observe(duration)
+
+
+class ControllerMetrics:
+    """Pre-resolved metric children for one controller
+
+    Children are looked up once here so the loops only touch plain objects.
+    """
+
+    ACTION_TYPES = ('jump', 'shoot', 'ads', 'weapon_switch', 'x', 'right_bumper', 'left_bumper', 'select_class')
+
+    def __init__(self, controller):
+        self.movement = LoopMetrics(controller, 'movement')
+        self.anti_afk = LoopMetrics(controller, 'anti_afk')
+        self.update = GAMEPAD_UPDATES.labels(controller)
+        self.actions = {action: ACTIONS.labels(controller, action) for action in self.ACTION_TYPES}
+        self._controller = controller
+        self._phase_timer = None
+
+    def action(self, name):
+        self.actions[name].inc()
+
+    def phase_changed(self, phase):
+        """Close the previous phase's interval and open one for phase (None: stop timing)"""
+        now = time.monotonic()
+        if self._phase_timer is not None:
+            self._phase_timer.stop(now)
+        self._phase_timer = PHASE_TIME.labels(self._controller, phase) if phase is not None else None
+        if self._phase_timer is not None:
+            self._phase_timer.start(now)
+
+
+def render(others=()):
+    """Return every metric in Prometheus text exposition format
+
+    others are REGISTRY.collect() results of other processes (the shards).
+    """
+    return REGISTRY.render(others)
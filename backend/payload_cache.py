@@ -0,0 +1,65 @@
+import hashlib
+import json
+import threading
+from collections import namedtuple
+
+# A serialized payload: body bytes, its ETag, HTTP status and the version it was built from
+Entry = namedtuple('Entry', 'body etag status version')
+
+
+def _default_dumps(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+
+
+class PayloadCache:
+    """Read payloads kept serialized until the data behind them changes
+
+    Each payload has a builder returning a JSON-able object and a version
+    counter. invalidate() only bumps the counter; the next get() rebuilds and
+    re-serializes once, every other read returns the stored bytes. The ETag
+    is a digest of the body, so it survives restarts and a change that
+    produces the same content keeps the clients' cached copy valid.
+    """
+
+    def __init__(self, dumps=_default_dumps):
+        self.dumps = dumps
+        self._builders = {}
+        self._versions = {}
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, builder, status=None):
+        """Add a payload; status(payload) gives its HTTP status (200 by default)
+
+        Only 200 payloads are kept: an error is rebuilt on the next read.
+        """
+        self._builders[name] = (builder, status)
+        self._versions[name] = 0
+
+    def version(self, name):
+        return self._versions[name]
+
+    def invalidate(self, *names):
+        """Mark payloads stale after a change to the data they are built from"""
+        with self._lock:
+            for name in names:
+                self._versions[name] += 1
+
+    def get(self, name):
+        """Return the current Entry for a payload, rebuilding it if stale"""
+        entry = self._entries.get(name)
+        version = self._versions[name]
+        if entry is not None and entry.version == version:
+            return entry
+        builder, status = self._builders[name]
+        payload = builder()
+        body = self.dumps(payload).encode('utf-8')
+        entry = Entry(body, hashlib.blake2b(body, digest_size=12).hexdigest(),
+                      status(payload) if status else 200, version)
+        # Built from the version read before the builder ran: a change made
+        # meanwhile leaves the entry stale and the next read rebuilds it
+        if entry.status == 200:
+            with self._lock:
+                if version == self._versions[name]:
+                    self._entries[name] = entry
+        return entry
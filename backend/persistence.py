@@ -0,0 +1,125 @@
+import os
+import tempfile
+import threading
+
+from log_setup import get_logger
+
+log = get_logger('persistence')
+
+# Longest wait between two attempts while writes keep failing (read-only file, full disk)
+MAX_RETRY_DELAY = 30.0
+
+
+def atomic_write(path, data, encoding='utf-8', before_replace=None):
+    """Replace path with data so readers only ever see the old or new file
+
+    The content goes to a temporary file in the same directory, is fsynced,
+    then renamed over the target. before_replace, if given, is called with
+    the temporary file's os.stat_result just before the rename, which keeps
+    its mtime and size.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding, newline='') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            stat = os.fstat(f.fileno())
+        if before_replace:
+            before_replace(stat)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class WriteBehindFile:
+    """Debounced background writer for one file
+
+    Callers change their in-memory state, then call mark_dirty(). The file is
+    rewritten once, delay seconds after the first unsaved change, however
+    many changes arrived in between. render() is called at write time and
+    must return the full file content. before_replace is passed on to
+    atomic_write().
+
+    A failed write is retried with a doubling delay, up to MAX_RETRY_DELAY;
+    only the first failure and the recovery are logged as such.
+    """
+
+    def __init__(self, path, render, delay=0.25, before_replace=None, encoding='utf-8'):
+        self.path = path
+        self.render = render
+        self.delay = delay
+        self.before_replace = before_replace
+        self.encoding = encoding
+        self.writes = 0
+        # Consecutive failed writes
+        self.failures = 0
+        self._cond = threading.Condition()
+        self._dirty = False
+        self._closed = False
+        # Serializes actual writes between the worker and flush()
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"write-behind:{os.path.basename(path)}")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def mark_dirty(self):
+        """Schedule a write of the current in-memory state"""
+        with self._cond:
+            if not self._dirty:
+                self._dirty = True
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                # Debounce: let further changes pile up before writing
+                self._cond.wait(self._next_delay())
+                if self._closed:
+                    return
+            self.flush()
+
+    def _next_delay(self):
+        if not self.failures:
+            return self.delay
+        return min(self.delay * 2 ** self.failures, MAX_RETRY_DELAY)
+
+    def flush(self):
+        """Write now if there are unsaved changes"""
+        with self._write_lock:
+            with self._cond:
+                if not self._dirty:
+                    return False
+                self._dirty = False
+            try:
+                atomic_write(self.path, self.render(), self.encoding, self.before_replace)
+            except Exception as e:
+                self.failures += 1
+                if self.failures == 1:
+                    log.error("Error while writing %s: %s", self.path, e)
+                else:
+                    log.debug("Write %s failed again (%d): %s", self.path, self.failures, e)
+                self.mark_dirty()
+                return False
+            if self.failures:
+                log.info("%s written after %d failed attempts", self.path, self.failures)
+                self.failures = 0
+            self.writes += 1
+            return True
+
+    def close(self):
+        """Flush pending changes and stop the writer thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=1)
+        self.flush()
@@ -0,0 +1,107 @@
+import os
+import random
+import zlib
+
+# NumPy is imported by the first stream (it costs ~80 ms of server startup)
+_numpy = None
+_numpy_loaded = False
+
+# Uniform draws consumed by one movement tick (see GamepadController._movement_loop)
+TICK_WIDTH = 9
+BLOCK_ROWS = 1024
+BLOCK_SIZE = 1024
+
+
+def _load_numpy():
+    """Return the numpy module, or None to use the pure-Python fallback"""
+    global _numpy, _numpy_loaded
+    if not _numpy_loaded:
+        try:
+            import numpy
+        except ImportError:  # Pure-Python fallback, same interface
+            numpy = None
+        _numpy = numpy
+        _numpy_loaded = True
+    return _numpy
+
+
+def seed_for(name, base_seed=None):
+    """Seed for one controller
+
+    With a base seed (argument or NIZUA_RANDOM_SEED) every controller gets a
+    stable seed derived from its name, so a whole session can be replayed.
+    Without one, the seed is random.
+    """
+    if base_seed is None:
+        base_seed = os.environ.get('NIZUA_RANDOM_SEED')
+    if base_seed is None or base_seed == '':
+        return int.from_bytes(os.urandom(8), 'little')
+    return (int(base_seed) * 1000003 + zlib.crc32(name.encode('utf-8'))) & 0xFFFFFFFFFFFFFFFF
+
+
+class RandomStream:
+    """Seedable per-controller stream of uniform [0, 1) values
+
+    Values are generated a block at a time (vectorized with NumPy when it is
+    installed) and handed out from plain Python lists. tick() returns a row
+    of TICK_WIDTH values for one movement tick; random()/uniform() serve
+    single draws. Rows and single draws come from two independent child
+    streams of the seed, so how the two kinds of draws interleave (which
+    depends on timing) does not change either sequence. The same seed
+    replays the same sequences on the same implementation (NumPy and the
+    fallback produce different ones).
+    """
+
+    def __init__(self, seed=None, tick_width=TICK_WIDTH, block_rows=BLOCK_ROWS, block_size=BLOCK_SIZE):
+        self.seed = seed if seed is not None else int.from_bytes(os.urandom(8), 'little')
+        self.tick_width = tick_width
+        self.block_rows = block_rows
+        self.block_size = block_size
+        self._numpy = numpy = _load_numpy()
+        if numpy is not None:
+            rows, values = numpy.random.SeedSequence(self.seed).spawn(2)
+            self._row_generator = numpy.random.Generator(numpy.random.PCG64(rows))
+            self._value_generator = numpy.random.Generator(numpy.random.PCG64(values))
+        else:
+            self._row_generator = random.Random(f"{self.seed}/rows")
+            self._value_generator = random.Random(f"{self.seed}/values")
+        self._rows = []
+        self._values = []
+
+    @property
+    def vectorized(self):
+        return self._numpy is not None
+
+    def _draw_rows(self):
+        if self._numpy is not None:
+            rows = self._row_generator.random((self.block_rows, self.tick_width)).tolist()
+        else:
+            draw = self._row_generator.random
+            rows = [[draw() for _ in range(self.tick_width)] for _ in range(self.block_rows)]
+        rows.reverse()  # Consumed from the end with pop()
+        return rows
+
+    def _draw_values(self):
+        if self._numpy is not None:
+            values = self._value_generator.random(self.block_size).tolist()
+        else:
+            draw = self._value_generator.random
+            values = [draw() for _ in range(self.block_size)]
+        values.reverse()
+        return values
+
+    def tick(self):
+        """Return the next row of tick_width uniform values"""
+        if not self._rows:
+            self._rows = self._draw_rows()
+        return self._rows.pop()
+
+    def random(self):
+        """Return the next uniform value in [0, 1)"""
+        if not self._values:
+            self._values = self._draw_values()
+        return self._values.pop()
+
+    def uniform(self, a, b):
+        """Return a value between a and b, like random.uniform"""
+        return a + (b - a) * self.random()
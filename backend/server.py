@@ -5,49 +5,129 @@ Serveur Flask pour gérer les fonctionnalités backend du loader avec support ga
 Version corrigée sans système de shortcuts - utilise uniquement les webviews d'Electron
 """
 
-from flask import Flask, jsonify, request
+from startup import timer as startup_timer
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
 import threading
 import time
 import json
 import os
 import sys
+import signal
 import configparser
+import io
+import argparse
+import multiprocessing
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+startup_timer.mark('import_flask')
+
+from log_setup import get_logger, setup_logging, shutdown_logging
+
+# Logs asynchrones (niveau via NIZUA_LOG_LEVEL), écrits sur stdout lu par Electron
+setup_logging()
+log = get_logger('server')
 
 # Import des classes du projet original
 try:
     from gamepad_control import GamepadController
 except ImportError:
-    print("Attention: gamepad_control.py non trouvé. Fonctionnalités gamepad désactivées.")
+    log.warning("gamepad_control.py non trouvé. Fonctionnalités gamepad désactivées.")
     GamepadController = None
 
+from config_schema import BY_KEY, coerce, default_values, settings_from_config, to_sections, typed_value, with_value
+from config_watcher import ConfigWatcher
+from persistence import WriteBehindFile, atomic_write
+from payload_cache import PayloadCache
+from game_catalog import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, GameCatalog
+from status_stream import StatusHub, stream_events
+from controller_pool import ControllerPool, PoolFullError
+from controller_defs import lobby_number
+from controller_mailbox import COMMAND_TIMEOUT, REPLY_TIMEOUT
+from controller_shards import ShardedControllerPool
+from status_board import StatusBoard
+from jobs import JobManager
+from tick_scheduler import get_scheduler
+from serving import SERVER_THREADS, ProductionServer, stop_on_stdin_eof
+from input_trace import backend_factory_for
+import metrics
+startup_timer.mark('import_modules')
+
 app = Flask(__name__)
 CORS(app)
 
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 5000
+
+# Nombre maximum de lobbies (et donc de manettes) gérés simultanément
+MAX_LOBBIES = 20
+DEFAULT_LOBBY_ID = "lobby1"
+# Manettes initialisées en parallèle par /api/controller/connect-bulk
+BULK_CONNECT_CONCURRENCY = MAX_LOBBIES
+# Threads des jobs bloquants (connexions) ; les macros tournent sur le scheduler
+JOB_WORKERS = 8
+# Intervalle des commentaires keep-alive du flux SSE (secondes)
+SSE_HEARTBEAT = 15.0
+
 class NizuaServer:
-    def __init__(self):
+    def __init__(self, shards=0):
         self.status = "running"
-        self.games = []
+        # Jeux indexés par id et par nom ; toute modification planifie la sauvegarde
+        self.catalog = GameCatalog(on_change=self.persist_settings)
         self.settings = {}
-        self.controller = None
+        # État des manettes en mémoire partagée, écrit par les manettes elles-mêmes
+        self.status_board = StatusBoard(MAX_LOBBIES)
+        if shards > 0:
+            # Manettes réparties sur des processus (un GIL par shard), ce processus coordonne
+            self.controllers = ShardedControllerPool(
+                shards, lambda: self.gamepad_settings,
+                on_status_change=lambda c: self.publish_controller_status(c.name, c),
+                max_controllers=MAX_LOBBIES, status_board=self.status_board)
+        else:
+            self.controllers = ControllerPool(self.create_controller, max_controllers=MAX_LOBBIES)
+        self.config_watcher = None
+        # Flux des changements de statut des manettes (SSE)
+        self.status_hub = StatusHub()
+        for i in range(1, MAX_LOBBIES + 1):
+            self.status_hub.publish('status', f"lobby{i}", self.get_controller_status(f"lobby{i}", include_timing=False))
+        # Actions longues exécutées en arrière-plan, fin de job poussée par SSE
+        self.jobs = JobManager(max_workers=JOB_WORKERS, on_change=self.publish_job)
+        # Protège self.config / self.settings contre l'écriture différée concurrente
+        self.config_lock = threading.RLock()
+        self.settings_path = "nizua_config.json"
         self.bo6_url = "https://www.xbox.com/en-US/play/launch/call-of-duty-black-ops-6---cross-gen-bundle/9PF528M6CRHQ"
         self.xbox_play_url = "https://xbox.com/play"
         
         self.load_config()
+        
+        # Écritures disque différées et atomiques (les changements s'appliquent en mémoire immédiatement)
+        self.config_file = WriteBehindFile(self.config_path, self.render_gamepad_config,
+                                           before_replace=self.on_gamepad_config_replace)
+        self.settings_file = WriteBehindFile(self.settings_path, self.render_settings)
+
+        # Réponses des lectures gardées sérialisées, reconstruites après modification
+        self.payloads = PayloadCache(dumps=lambda payload: app.json.dumps(payload, separators=(',', ':')))
+        config_status = lambda result: 200 if result.get('success') else 500
+        self.payloads.register('gamepad_config', self.get_gamepad_config_formatted, config_status)
+        self.payloads.register('gamepad_settings', self.get_gamepad_settings, config_status)
+        self.payloads.register('default_gamepad_config',
+                               lambda: {"success": True, "config": self.get_default_gamepad_config()})
+        self.payloads.register('games', self.get_games_payload)
+        self.payloads.register('settings', self.get_settings_payload)
 
     def load_config(self):
         """Charger la configuration depuis un fichier JSON et INI"""
         # Configuration JSON existante
-        config_path = "nizua_config.json"
+        config_path = self.settings_path
         if os.path.exists(config_path):
             try:
                 with open(config_path, 'r', encoding='utf-8') as f:
                     config = json.load(f)
-                    self.games = config.get('games', [])
+                    self.catalog.load(config.get('games', []))
                     self.settings = config.get('settings', {})
-                print(f"Configuration JSON chargée: {len(self.games)} jeux trouvés")
+                log.info("Configuration JSON chargée: %d jeux trouvés", len(self.catalog))
             except Exception as e:
-                print(f"Erreur lors du chargement de la configuration JSON: {e}")
+                log.error("Erreur lors du chargement de la configuration JSON: %s", e)
         else:
             self.create_default_config()
 
@@ -60,6 +140,91 @@ class NizuaServer:
             self.create_default_gamepad_config()
         
         self.config.read(self.config_path)
+        # Snapshot partagé par toutes les manettes (config.ini n'est lu qu'une fois)
+        self.gamepad_settings = settings_from_config(self.config)
+
+    def create_controller(self, lobby_id):
+        """Créer la manette d'un lobby avec le snapshot de configuration courant"""
+        # Rapports envoyés au pilote enregistrés si NIZUA_TRACE_DIR est défini (input_trace.py)
+        controller = GamepadController(lobby_id, settings=self.gamepad_settings,
+                                       backend_factory=backend_factory_for(lobby_id),
+                                       status_row=self.status_board.row_for(lobby_id))
+        controller.on_status_change = lambda c: self.publish_controller_status(lobby_id, c)
+        return controller
+
+    def publish_controller_status(self, lobby_id, controller):
+        """Publier le statut d'une manette aux clients SSE (ignoré s'il n'a pas changé)"""
+        status = controller.status()
+        status["controller_id"] = lobby_number(lobby_id)
+        self.status_hub.publish('status', lobby_id, status)
+
+    def publish_job(self, job):
+        """Publier l'état d'un job aux clients SSE"""
+        self.status_hub.publish('job', job.id, job.as_dict())
+
+    def render_gamepad_config(self):
+        """Contenu de config.ini tel qu'en mémoire"""
+        buffer = io.StringIO()
+        with self.config_lock:
+            self.config.write(buffer)
+        return buffer.getvalue()
+
+    def render_settings(self):
+        """Contenu de nizua_config.json tel qu'en mémoire"""
+        with self.config_lock:
+            config = {
+                'games': self.catalog.games(),
+                'settings': self.settings
+            }
+            return json.dumps(config, indent=2, ensure_ascii=False)
+
+    def persist_gamepad_config(self):
+        """Planifier l'écriture de config.ini (regroupée sur un court délai)"""
+        self.payloads.invalidate('gamepad_config', 'gamepad_settings')
+        self.config_file.mark_dirty()
+
+    def persist_settings(self):
+        """Planifier l'écriture de nizua_config.json"""
+        self.payloads.invalidate('games', 'settings')
+        self.settings_file.mark_dirty()
+
+    def on_gamepad_config_replace(self, stat):
+        # Notre propre écriture ne doit pas déclencher un rechargement à chaud :
+        # la signature est connue avant le renommage, que le watcher pourrait voir avant nous
+        if self.config_watcher:
+            self.config_watcher.ignore_current(stat)
+
+    def flush_pending_writes(self):
+        """Écrire immédiatement les changements en attente (arrêt du serveur)"""
+        self.config_file.close()
+        self.settings_file.close()
+
+    def push_gamepad_settings(self, settings):
+        """Publier un nouveau snapshot de configuration à toutes les manettes"""
+        self.gamepad_settings = settings
+        self.controllers.apply_settings(settings)
+
+    def reload_gamepad_config(self):
+        """Relire config.ini une seule fois et pousser le résultat aux manettes"""
+        config = configparser.ConfigParser()
+        config.read(self.config_path)
+        with self.config_lock:
+            self.config = config
+        self.payloads.invalidate('gamepad_config', 'gamepad_settings')
+        self.push_gamepad_settings(settings_from_config(config))
+        log.info("Configuration gamepad rechargée depuis config.ini")
+
+    def start_config_watcher(self):
+        """Surveiller config.ini pour appliquer les modifications externes sans redémarrage"""
+        if self.config_watcher is None:
+            self.config_watcher = ConfigWatcher(self.config_path, self.reload_gamepad_config)
+            mode = self.config_watcher.start()
+            log.info("Surveillance de config.ini activée (%s)", mode)
+
+    def stop_config_watcher(self):
+        if self.config_watcher:
+            self.config_watcher.stop()
+            self.config_watcher = None
 
     def create_default_config(self):
         """Créer une configuration par défaut"""
@@ -79,12 +244,14 @@ class NizuaServer:
             }
         }
         
+        self.catalog.load(default_config['games'])
+        self.settings = default_config['settings']
+        
         try:
-            with open("nizua_config.json", 'w', encoding='utf-8') as f:
-                json.dump(default_config, f, indent=2, ensure_ascii=False)
-            print("Configuration par défaut créée")
+            atomic_write(self.settings_path, json.dumps(default_config, indent=2, ensure_ascii=False))
+            log.info("Configuration par défaut créée")
         except Exception as e:
-            print(f"Erreur lors de la création de la configuration: {e}")
+            log.error("Erreur lors de la création de la configuration: %s", e)
 
     def create_default_gamepad_config(self):
         """Créer une configuration gamepad par défaut (version mise à jour)"""
@@ -96,43 +263,25 @@ class NizuaServer:
             config[section_name] = section_data
         
         try:
-            with open(self.config_path, 'w') as configfile:
-                config.write(configfile)
-            print("Configuration gamepad par défaut créée")
+            buffer = io.StringIO()
+            config.write(buffer)
+            atomic_write(self.config_path, buffer.getvalue())
+            log.info("Configuration gamepad par défaut créée")
         except Exception as e:
-            print(f"Erreur lors de la création de la configuration gamepad: {e}")
+            log.error("Erreur lors de la création de la configuration gamepad: %s", e)
     
     def get_default_gamepad_config(self):
-        """Obtenir la configuration gamepad par défaut"""
-        return {
-            'Movement': {
-                'look_intensity': '3.0',
-                'move_intensity': '2.0',
-                'forward_intensity': '2.0',
-                'ads_chance': '0.040000000000000036',
-                'jump_chance': '1.0',
-                'jump_interval': '1.0',
-                'weapon_switch_chance': '1.0',
-                'weapon_switch_interval': '15.0',
-                'strafe_chance': '0.25',
-                'forward_bias': '0.4',
-                'shoot_chance': '0.09999999999999998',
-                'shoot_duration': '0.29799999999999993',
-                'crouch_chance': '0.3',
-                'x_button_chance': '0.3',
-                'x_button_interval': '5.0',
-                'min_movement_duration': '9.377633711507293',
-                'max_movement_duration': '14.817396002160994',
-                'min_break_duration': '1.0',
-                'max_break_duration': '3.1766612641815235'
-            },
-            'AntiAFK': {
-                'interval': '60.599999999999994',
-                'right_bumper_duration': '0.1359999999999999',
-                'left_bumper_duration': '0.1417857142857143',
-                'delay_between_buttons': '1.012'
-            }
-        }
+        """Obtenir la configuration gamepad par défaut (générée depuis config_schema)"""
+        return to_sections(default_values())
+
+    def validate_gamepad_parameter(self, section, key, value):
+        """Vérifier le type et les bornes d'un paramètre connu du schéma
+
+        Les paramètres personnalisés (hors schéma) sont acceptés tels quels.
+        """
+        param = BY_KEY.get((section, key))
+        if param is not None:
+            coerce(param, value)
         
     def save_gamepad_config(self, config_data):
         """Sauvegarder la configuration gamepad complète"""
@@ -144,18 +293,16 @@ class NizuaServer:
             for section_name, section_data in config_data.items():
                 new_config.add_section(section_name)
                 for key, value in section_data.items():
+                    self.validate_gamepad_parameter(section_name, key, value)
                     new_config.set(section_name, key, str(value))
 
-            # Sauvegarder dans le fichier
-            with open(self.config_path, 'w') as configfile:
-                new_config.write(configfile)
+            # Remplacer la config en mémoire puis planifier la sauvegarde
+            with self.config_lock:
+                self.config = new_config
+            self.persist_gamepad_config()
 
-            # Recharger la config en mémoire
-            self.config = new_config
-
-            # Mettre à jour le contrôleur si connecté
-            if self.controller:
-                self.controller.reload_config()
+            # Mettre à jour les contrôleurs connectés
+            self.push_gamepad_settings(settings_from_config(new_config))
 
             return {"success": True, "message": "Configuration sauvegardée avec succès"}
         except Exception as e:
@@ -174,102 +321,107 @@ class NizuaServer:
         except Exception as e:
                 return {"error": f"Erreur lors de la réinitialisation: {str(e)}"}
     
+    def apply_gamepad_value(self, section, key, value):
+        """Appliquer un paramètre aux manettes connectées (un seul snapshot pour toutes)"""
+        settings = with_value(self.gamepad_settings, section, key, value)
+        if settings is not None:
+            self.push_gamepad_settings(settings)
+
     def add_gamepad_parameter(self, section, key, value):
         """Ajouter un nouveau paramètre à la configuration gamepad"""
         try:
-            if section not in self.config:
-                self.config.add_section(section)
+            with self.config_lock:
+                # Vérifier si le paramètre existe déjà
+                if self.config.has_option(section, key):
+                    return {"error": f"Le paramètre {section}.{key} existe déjà. Utilisez update pour le modifier."}
             
-            # Vérifier si le paramètre existe déjà
-            if self.config.has_option(section, key):
-                return {"error": f"Le paramètre {section}.{key} existe déjà. Utilisez update pour le modifier."}
+                self.validate_gamepad_parameter(section, key, value)
+                if section not in self.config:
+                    self.config.add_section(section)
             
-            self.config.set(section, key, str(value))
+                self.config.set(section, key, str(value))
             
-            # Sauvegarder dans le fichier
-            with open(self.config_path, 'w') as configfile:
-                self.config.write(configfile)
+                # Sauvegarder dans le fichier (écriture différée)
+                self.persist_gamepad_config()
             
-            # Mettre à jour le contrôleur si connecté
-            if self.controller:
-                self.controller.update_config(section, key, value)
+                # Mettre à jour les contrôleurs connectés
+                self.apply_gamepad_value(section, key, value)
             
-            return {"success": True, "message": f"Paramètre {section}.{key} ajouté avec succès"}
+                return {"success": True, "message": f"Paramètre {section}.{key} ajouté avec succès"}
         except Exception as e:
             return {"error": f"Erreur lors de l'ajout du paramètre: {str(e)}"}
     
     def modify_gamepad_parameter(self, section, key, value):
         """Modifier un paramètre existant de la configuration gamepad"""
         try:
-            if section not in self.config:
-                return {"error": f"Section {section} non trouvée"}
+            with self.config_lock:
+                if section not in self.config:
+                    return {"error": f"Section {section} non trouvée"}
             
-            if not self.config.has_option(section, key):
-                return {"error": f"Paramètre {section}.{key} non trouvé"}
+                if not self.config.has_option(section, key):
+                    return {"error": f"Paramètre {section}.{key} non trouvé"}
             
-            old_value = self.config.get(section, key)
-            self.config.set(section, key, str(value))
+                old_value = self.config.get(section, key)
+                self.validate_gamepad_parameter(section, key, value)
+                self.config.set(section, key, str(value))
             
-            # Sauvegarder dans le fichier
-            with open(self.config_path, 'w') as configfile:
-                self.config.write(configfile)
+                # Sauvegarder dans le fichier (écriture différée)
+                self.persist_gamepad_config()
             
-            # Mettre à jour le contrôleur si connecté
-            if self.controller:
-                self.controller.update_config(section, key, value)
+                # Mettre à jour les contrôleurs connectés
+                self.apply_gamepad_value(section, key, value)
             
-            return {
-                "success": True, 
-                "message": f"Paramètre {section}.{key} modifié avec succès",
-                "old_value": old_value,
-                "new_value": str(value)
-            }
+                return {
+                    "success": True, 
+                    "message": f"Paramètre {section}.{key} modifié avec succès",
+                    "old_value": old_value,
+                    "new_value": str(value)
+                }
         except Exception as e:
             return {"error": f"Erreur lors de la modification du paramètre: {str(e)}"}
     
     def delete_gamepad_parameter(self, section, key):
         """Supprimer un paramètre de la configuration gamepad"""
         try:
-            if section not in self.config:
-                return {"error": f"Section {section} non trouvée"}
+            with self.config_lock:
+                if section not in self.config:
+                    return {"error": f"Section {section} non trouvée"}
             
-            if not self.config.has_option(section, key):
-                return {"error": f"Paramètre {section}.{key} non trouvé"}
+                if not self.config.has_option(section, key):
+                    return {"error": f"Paramètre {section}.{key} non trouvé"}
             
-            old_value = self.config.get(section, key)
-            self.config.remove_option(section, key)
+                old_value = self.config.get(section, key)
+                self.config.remove_option(section, key)
             
-            # Supprimer la section si elle est vide
-            if len(self.config.options(section)) == 0:
-                self.config.remove_section(section)
+                # Supprimer la section si elle est vide
+                if len(self.config.options(section)) == 0:
+                    self.config.remove_section(section)
             
-            # Sauvegarder dans le fichier
-            with open(self.config_path, 'w') as configfile:
-                self.config.write(configfile)
+                # Sauvegarder dans le fichier (écriture différée)
+                self.persist_gamepad_config()
             
-            return {
-                "success": True, 
-                "message": f"Paramètre {section}.{key} supprimé avec succès",
-                "deleted_value": old_value
-            }
+                # Un paramètre connu supprimé revient à sa valeur par défaut
+                if (section, key) in BY_KEY:
+                    self.push_gamepad_settings(settings_from_config(self.config))
+            
+                return {
+                    "success": True, 
+                    "message": f"Paramètre {section}.{key} supprimé avec succès",
+                    "deleted_value": old_value
+                }
         except Exception as e:
             return {"error": f"Erreur lors de la suppression du paramètre: {str(e)}"}
     
     def get_gamepad_config_formatted(self):
-        """Obtenir la configuration gamepad dans un format structuré"""
+        """Obtenir la configuration gamepad dans un format structuré (valeurs typées selon le schéma)"""
         try:
             config_dict = {}
-            for section_name in self.config.sections():
-                config_dict[section_name] = {}
-                for key, value in self.config.items(section_name):
-                    # Essayer de convertir en nombre si possible
-                    try:
-                        if '.' in value:
-                            config_dict[section_name][key] = float(value)
-                        else:
-                            config_dict[section_name][key] = int(value)
-                    except ValueError:
-                        config_dict[section_name][key] = value
+            with self.config_lock:
+                for section_name in self.config.sections():
+                    config_dict[section_name] = {
+                        key: typed_value(section_name, key, value)
+                        for key, value in self.config.items(section_name)
+                    }
             
             return {"success": True, "config": config_dict}
         except Exception as e:
@@ -282,134 +434,387 @@ class NizuaServer:
             "bo6_launch": self.bo6_url
         }
 
-    def connect_controller(self):
-        """Connecter la manette"""
+    def connect_controller(self, lobby_id=DEFAULT_LOBBY_ID):
+        """Connecter la manette d'un lobby"""
         if GamepadController is None:
             return {"error": "Module gamepad non disponible"}
         
         try:
-            if not self.controller:
-                self.controller = GamepadController()
-            
-            if self.controller.gamepad is None:
-                if self.controller.connect():
-                    self.controller.start()
-                    return {"success": True, "message": "Manette connectée"}
-                else:
-                    return {"error": "Échec de connexion de la manette"}
-            else:
-                return {"success": True, "message": "Manette déjà connectée"}
+            if self.controllers.connect(lobby_id):
+                return {"success": True, "message": "Manette connectée", "lobby_id": lobby_id}
+            return {"success": True, "message": "Manette déjà connectée", "lobby_id": lobby_id}
+        except PoolFullError:
+            return {"error": f"Maximum {MAX_LOBBIES} manettes connectées"}
         except Exception as e:
             return {"error": str(e)}
 
-    def disconnect_controller(self):
-        """Déconnecter la manette"""
+    def connect_controllers(self, lobby_ids, concurrency=BULK_CONNECT_CONCURRENCY):
+        """Connecter plusieurs manettes en parallèle
+
+        L'initialisation d'une manette est surtout de l'attente : avec assez de
+        workers, connecter N manettes prend à peu près le temps d'une seule.
+        Retourne le résultat de chaque lobby, les échecs n'interrompent pas les autres.
+        """
+        if GamepadController is None:
+            return {"error": "Module gamepad non disponible"}
+        
+        lobby_ids = list(dict.fromkeys(lobby_ids))  # Sans doublons, ordre conservé
+        if not lobby_ids:
+            return {"error": "Aucun lobby demandé"}
+        
+        started = time.perf_counter()
+        workers = max(1, min(concurrency, len(lobby_ids)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="connect") as executor:
+            results = dict(zip(lobby_ids, executor.map(self.connect_controller, lobby_ids)))
+        
+        connected = [lobby_id for lobby_id, result in results.items() if result.get('success')]
+        failed = [lobby_id for lobby_id in lobby_ids if lobby_id not in connected]
+        return {
+            "success": not failed,
+            "partial": bool(connected) and bool(failed),
+            "results": results,
+            "connected": connected,
+            "failed": failed,
+            "duration": round(time.perf_counter() - started, 3)
+        }
+
+    def start_connect_job(self, lobby_id=DEFAULT_LOBBY_ID):
+        """Connecter une manette en arrière-plan ; retourne le job"""
+        return self.jobs.submit('connect', lobby_id, self.connect_controller, lobby_id)
+
+    def start_bulk_connect_job(self, lobby_ids, concurrency=BULK_CONNECT_CONCURRENCY):
+        """Connecter plusieurs manettes en arrière-plan ; retourne le job"""
+        return self.jobs.submit('connect-bulk', None, self.connect_controllers, lobby_ids, concurrency, unique=False)
+
+    def disconnect_controller(self, lobby_id=DEFAULT_LOBBY_ID):
+        """Déconnecter la manette d'un lobby"""
         try:
-            if self.controller:
-                self.controller.disconnect()
-                self.controller = None
-                return {"success": True, "message": "Manette déconnectée"}
+            if self.controllers.release(lobby_id):
+                return {"success": True, "message": "Manette déconnectée", "lobby_id": lobby_id}
             return {"error": "Aucune manette connectée"}
         except Exception as e:
             return {"error": str(e)}
 
-    def toggle_movement(self):
+    def queued_command(self, label, lobby_id):
+        """Réponse d'une commande encore dans la file de la manette (l'état suivra par SSE)"""
+        return {"success": True, "queued": True, "message": f"{label} : commande en attente", "lobby_id": lobby_id}
+
+    def toggle_movement(self, lobby_id=DEFAULT_LOBBY_ID, enabled=None):
         """Activer/désactiver le mouvement automatique"""
-        if not self.controller:
+        controller = self.controllers.get(lobby_id)
+        if not controller:
             return {"error": "Manette non connectée"}
         
         try:
-            is_enabled = self.controller.toggle_movement()
+            # Commande mise dans la file de la manette ; un état explicite (enabled) est idempotent
+            if enabled is None:
+                command = controller.submit('toggle_movement')
+            else:
+                command = controller.submit('set_movement', enabled)
+            is_enabled = command.result(REPLY_TIMEOUT)
             status = "activé" if is_enabled else "désactivé"
             return {"success": True, "message": f"Mouvement {status}", "enabled": is_enabled}
+        except futures.TimeoutError:
+            return self.queued_command("Mouvement", lobby_id)
         except Exception as e:
             return {"error": str(e)}
 
-    def toggle_anti_afk(self):
+    def toggle_anti_afk(self, lobby_id=DEFAULT_LOBBY_ID, enabled=None):
         """Activer/désactiver l'anti-AFK"""
-        if not self.controller:
+        controller = self.controllers.get(lobby_id)
+        if not controller:
             return {"error": "Manette non connectée"}
         
         try:
-            is_enabled = self.controller.toggle_anti_afk()
+            if enabled is None:
+                command = controller.submit('toggle_anti_afk')
+            else:
+                command = controller.submit('set_anti_afk', enabled)
+            is_enabled = command.result(REPLY_TIMEOUT)
             status = "activé" if is_enabled else "désactivé"
             return {"success": True, "message": f"Anti-AFK {status}", "enabled": is_enabled}
+        except futures.TimeoutError:
+            return self.queued_command("Anti-AFK", lobby_id)
         except Exception as e:
             return {"error": str(e)}
 
-    def select_class(self):
+    def select_class_result(self, selected):
+        """Réponse d'une sélection de classe, identique en synchrone et en job"""
+        if selected:
+            return {"success": True, "message": "Classe sélectionnée"}
+        return {"error": "Échec de sélection de classe"}
+
+    def select_class(self, lobby_id=DEFAULT_LOBBY_ID):
         """Sélectionner une classe"""
-        if not self.controller:
+        controller = self.controllers.get(lobby_id)
+        if not controller:
             return {"error": "Manette non connectée"}
         
         try:
-            if self.controller.select_class():
-                return {"success": True, "message": "Classe sélectionnée"}
-            else:
-                return {"error": "Échec de sélection de classe"}
+            return self.select_class_result(controller.submit('select_class').result(COMMAND_TIMEOUT))
         except Exception as e:
             return {"error": str(e)}
 
-    def get_controller_status(self):
-        """Obtenir le statut de la manette"""
-        if not self.controller:
-            return {"connected": False, "movement_enabled": False, "anti_afk_enabled": False}
-        
-        return {
-            "connected": self.controller.gamepad is not None,
-            "movement_enabled": getattr(self.controller, 'movement_enabled', False),
-            "anti_afk_enabled": getattr(self.controller, 'anti_afk_enabled', False)
-        }
+    def start_select_class_job(self, lobby_id=DEFAULT_LOBBY_ID):
+        """Lancer la sélection de classe sur le scheduler ; retourne le job (ou une erreur)"""
+        controller = self.controllers.get(lobby_id)
+        if not controller:
+            return {"error": "Manette non connectée"}
+        # Une sélection déjà en cours pour ce lobby est réutilisée ; la macro passe
+        # par la file de la manette, après les commandes déjà reçues. Une manette
+        # sans pad fait échouer le job (« Gamepad not connected »), y compris en shards
+        return self.jobs.start_command('select-class', lobby_id, lambda: controller.submit('select_class'),
+                                       to_result=self.select_class_result)
+
+    def get_controller_status(self, lobby_id=DEFAULT_LOBBY_ID, include_timing=True):
+        """Obtenir le statut de la manette d'un lobby"""
+        controller = self.controllers.get(lobby_id)
+        if not controller:
+            status = {"connected": False, "movement_enabled": False, "anti_afk_enabled": False,
+                      "phase": "idle", "last_error": None}
+        else:
+            status = controller.status()
+            if include_timing:
+                status["tick_rate"] = controller.tick_rate()
+        status["controller_id"] = lobby_number(lobby_id)
+        return status
+
+    def get_all_controller_status(self):
+        """Obtenir le statut de toutes les manettes (format multi-lobby)
+
+        Lu en une passe dans le tableau partagé, sans toucher aux manettes
+        (qui peuvent vivre dans d'autres processus).
+        """
+        controllers = {}
+        for i, status in enumerate(self.status_board.read_all(), start=1):
+            status["controller_id"] = i
+            controllers[f"lobby{i}"] = status
+        return controllers
 
     def update_gamepad_setting(self, section, key, value):
         """Mettre à jour un paramètre de la manette"""
         try:
-            if section not in self.config:
-                self.config.add_section(section)
+            with self.config_lock:
+                self.validate_gamepad_parameter(section, key, value)
+                if section not in self.config:
+                    self.config.add_section(section)
             
-            self.config.set(section, key, str(value))
+                self.config.set(section, key, str(value))
             
-            # Sauvegarder dans le fichier
-            with open(self.config_path, 'w') as configfile:
-                self.config.write(configfile)
+                # Sauvegarder dans le fichier (écriture différée)
+                self.persist_gamepad_config()
             
-            # Mettre à jour le contrôleur si connecté
-            if self.controller:
-                self.controller.update_config(section, key, value)
+                # Mettre à jour les contrôleurs connectés
+                self.apply_gamepad_value(section, key, value)
             
-            return {"success": True, "message": f"Paramètre {section}.{key} mis à jour"}
+                return {"success": True, "message": f"Paramètre {section}.{key} mis à jour"}
         except Exception as e:
             return {"error": str(e)}
 
+    def update_settings(self, new_settings):
+        """Mettre à jour les paramètres du loader (sauvegarde différée)"""
+        with self.config_lock:
+            self.settings.update(new_settings)
+        self.persist_settings()
+        return self.settings
+
+    def get_games_payload(self, search=None, installed=None, offset=0, limit=DEFAULT_PAGE_SIZE):
+        """Page de jeux renvoyée par /api/games ('count' = nombre total de jeux retenus)"""
+        games, total = self.catalog.query(search, installed, offset, limit)
+        return {
+            'games': games,
+            'count': total,
+            'offset': offset,
+            'limit': limit,
+            'has_more': offset + len(games) < total
+        }
+
+    def add_game(self, game):
+        """Ajouter un jeu au catalogue (sauvegarde différée)"""
+        try:
+            game = self.catalog.add(game)
+            return {"success": True, "message": f"Jeu {game['name']} ajouté", "game": game}
+        except ValueError as e:
+            return {"error": f"Erreur lors de l'ajout du jeu: {str(e)}"}
+
+    def update_game(self, game_id, fields):
+        """Modifier un jeu du catalogue ; None si le jeu n'existe pas"""
+        try:
+            game = self.catalog.update(game_id, fields)
+        except ValueError as e:
+            return {"error": f"Erreur lors de la modification du jeu: {str(e)}"}
+        if game is None:
+            return None
+        return {"success": True, "message": f"Jeu {game['name']} modifié", "game": game}
+
+    def delete_game(self, game_id):
+        """Retirer un jeu du catalogue ; None si le jeu n'existe pas"""
+        game = self.catalog.remove(game_id)
+        if game is None:
+            return None
+        return {"success": True, "message": f"Jeu {game['name']} supprimé", "game": game}
+
+    def get_settings_payload(self):
+        """Copie des paramètres du loader (sérialisée hors du verrou)"""
+        with self.config_lock:
+            return dict(self.settings)
+
     def get_gamepad_settings(self):
         """Obtenir tous les paramètres de la manette"""
         try:
             settings = {}
-            for section in self.config.sections():
-                settings[section] = dict(self.config.items(section))
+            with self.config_lock:
+                for section in self.config.sections():
+                    settings[section] = dict(self.config.items(section))
             return {"success": True, "settings": settings}
         except Exception as e:
             return {"error": str(e)}
 
-nizua_server = NizuaServer()
+# Construit par init_server() au démarrage : importer ce module ne lit ni
+# n'écrit aucun fichier de configuration
+nizua_server = None
+
+def init_server(shards=0):
+    """Créer l'instance NizuaServer (lecture des configurations)"""
+    global nizua_server
+    if nizua_server is None:
+        nizua_server = NizuaServer(shards=shards)
+        startup_timer.mark('init')
+    return nizua_server
+
+class InvalidLobbyError(ValueError):
+    """Identifiant de lobby hors de lobby1..lobby{MAX_LOBBIES} (réponse 400)"""
+
+def is_valid_lobby_id(lobby_id):
+    """lobby1..lobby{MAX_LOBBIES} : les seuls lobbies ayant une ligne dans le tableau de statut"""
+    if not isinstance(lobby_id, str):
+        return False
+    number = lobby_number(lobby_id)
+    return number is not None and 1 <= number <= MAX_LOBBIES and lobby_id == f"lobby{number}"
+
+def get_lobby_id():
+    """Lire le lobby ciblé par la requête (corps JSON ou query string)"""
+    data = request.get_json(silent=True) or {}
+    lobby_id = data.get('lobby_id') or request.args.get('lobby_id') or DEFAULT_LOBBY_ID
+    if not is_valid_lobby_id(lobby_id):
+        raise InvalidLobbyError(lobby_id)
+    return lobby_id
+
+def wants_wait():
+    """Le client demande l'ancien comportement bloquant ({"wait": true})"""
+    data = request.get_json(silent=True) or {}
+    return bool(data.get('wait')) or request.args.get('wait') in ('1', 'true')
+
+def job_response(job):
+    """Réponse 202 d'une action lancée en arrière-plan"""
+    return jsonify({"success": True, "job_id": job.id, "job": job.as_dict()}), 202
+
+def cached_response(name):
+    """Réponse JSON pré-sérialisée avec ETag ; 304 si le client a déjà cette version"""
+    entry = nizua_server.payloads.get(name)
+    response = Response(entry.body, status=entry.status, mimetype='application/json')
+    if entry.status == 200:
+        response.set_etag(entry.etag)
+        # Le client peut garder sa copie mais doit la revalider (If-None-Match)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.make_conditional(request)
+    return response
+
+def get_enabled_flag():
+    """Lire l'état explicite demandé par le frontend (None = bascule)"""
+    data = request.get_json(silent=True) or {}
+    return data.get('enabled')
+
+# Latence HTTP par route (exportée par /api/metrics)
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    # Temps jusqu'à la première requête (démarrage à froid vu par Electron)
+    if startup_timer.first_request():
+        log.info("Démarrage : %s", startup_timer.as_dict()['phases_ms'])
+
+@app.after_request
+def record_request_latency(response):
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.HTTP_LATENCY.labels(route, request.method, str(response.status_code)).observe(
+            time.perf_counter() - started)
+    return response
 
 # Routes API pour le statut
+@app.route('/api/ready', methods=['GET'])
+def get_ready():
+    """Serveur prêt à répondre (sans toucher à la configuration), avec le détail du démarrage"""
+    ready = nizua_server is not None and startup_timer.ready_at is not None
+    return jsonify({'ready': ready, 'startup': startup_timer.as_dict()}), 200 if ready else 503
+
 @app.route('/api/status', methods=['GET'])
 def get_status():
     """Obtenir le statut du serveur"""
     return jsonify({
         'status': nizua_server.status,
         'timestamp': time.time(),
-        'games_count': len(nizua_server.games)
+        'games_count': len(nizua_server.catalog)
     })
 
 @app.route('/api/games', methods=['GET'])
 def get_games():
-    """Obtenir la liste des jeux"""
-    return jsonify({
-        'games': nizua_server.games,
-        'count': len(nizua_server.games)
-    })
+    """Obtenir les jeux, filtrés et paginés (?q=, ?name=, ?installed=, ?offset=, ?limit=)"""
+    args = request.args
+    if not args:
+        # Première page sans filtre : réponse mise en cache
+        return cached_response('games')
+    
+    name = args.get('name')
+    if name is not None:
+        # Recherche exacte (insensible à la casse) via l'index des noms
+        game = nizua_server.catalog.find_by_name(name)
+        games = [game] if game else []
+        return jsonify({'games': games, 'count': len(games), 'offset': 0, 'limit': 1, 'has_more': False})
+    
+    try:
+        offset = int(args.get('offset', 0))
+        limit = min(int(args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "offset et limit doivent être des entiers"}), 400
+    if offset < 0 or limit < 1:
+        return jsonify({"error": "offset doit être positif et limit au moins 1"}), 400
+    
+    installed = args.get('installed')
+    if installed is not None:
+        installed = installed.lower() in ('1', 'true', 'yes')
+    return jsonify(nizua_server.get_games_payload(args.get('q'), installed, offset, limit))
+
+@app.route('/api/games', methods=['POST'])
+def add_game():
+    """Ajouter un jeu au catalogue"""
+    game = request.get_json(silent=True)
+    if not isinstance(game, dict):
+        return jsonify({"error": "Corps JSON manquant"}), 400
+    result = nizua_server.add_game(game)
+    status_code = 201 if result.get('success') else 400
+    return jsonify(result), status_code
+
+@app.route('/api/games/<int:game_id>', methods=['PUT'])
+def update_game(game_id):
+    """Modifier un jeu du catalogue"""
+    fields = request.get_json(silent=True)
+    if not isinstance(fields, dict):
+        return jsonify({"error": "Corps JSON manquant"}), 400
+    result = nizua_server.update_game(game_id, fields)
+    if result is None:
+        return jsonify({'error': 'Jeu non trouvé'}), 404
+    status_code = 200 if result.get('success') else 400
+    return jsonify(result), status_code
+
+@app.route('/api/games/<int:game_id>', methods=['DELETE'])
+def delete_game(game_id):
+    """Retirer un jeu du catalogue"""
+    result = nizua_server.delete_game(game_id)
+    if result is None:
+        return jsonify({'error': 'Jeu non trouvé'}), 404
+    return jsonify(result)
 
 # Routes pour les URLs Xbox (pour les webviews)
 @app.route('/api/xbox/urls', methods=['GET'])
@@ -420,83 +825,158 @@ def get_xbox_urls():
 # Routes pour les fonctionnalités gamepad
 @app.route('/api/controller/connect', methods=['POST'])
 def connect_controller():
-    """Connecter la manette"""
-    result = nizua_server.connect_controller()
+    """Connecter la manette (job en arrière-plan, sauf avec "wait")"""
+    if not wants_wait():
+        return job_response(nizua_server.start_connect_job(get_lobby_id()))
+    result = nizua_server.connect_controller(get_lobby_id())
     status_code = 200 if result.get('success') else 400
     return jsonify(result), status_code
 
+@app.route('/api/controller/connect-bulk', methods=['POST'])
+def connect_controllers():
+    """Connecter les manettes de plusieurs lobbies en parallèle
+
+    Corps: {"lobby_ids": ["lobby1", ...], "concurrency": 20 (optionnel), "wait": false}
+    Sans "wait", retourne un job (202). Avec "wait": 200 si tout a réussi,
+    207 en cas d'échec partiel, 400 sinon.
+    """
+    data = request.get_json(silent=True) or {}
+    lobby_ids = data.get('lobby_ids')
+    if not isinstance(lobby_ids, list) or not all(isinstance(l, str) and l for l in lobby_ids):
+        return jsonify({"error": "lobby_ids doit être une liste d'identifiants"}), 400
+    invalid = [l for l in lobby_ids if not is_valid_lobby_id(l)]
+    if invalid:
+        return jsonify({"error": f"Lobbies inconnus (lobby1 à lobby{MAX_LOBBIES}) : {', '.join(invalid)}"}), 400
+    if len(lobby_ids) > MAX_LOBBIES:
+        return jsonify({"error": f"Maximum {MAX_LOBBIES} lobbies par requête"}), 400
+    try:
+        concurrency = int(data.get('concurrency', BULK_CONNECT_CONCURRENCY))
+    except (TypeError, ValueError):
+        return jsonify({"error": "concurrency doit être un entier"}), 400
+    concurrency = max(1, min(concurrency, MAX_LOBBIES))
+    
+    if not wants_wait():
+        return job_response(nizua_server.start_bulk_connect_job(lobby_ids, concurrency))
+    result = nizua_server.connect_controllers(lobby_ids, concurrency)
+    if result.get('success'):
+        status_code = 200
+    elif result.get('partial'):
+        status_code = 207
+    else:
+        status_code = 400
+    return jsonify(result), status_code
+
 @app.route('/api/controller/disconnect', methods=['POST'])
 def disconnect_controller():
     """Déconnecter la manette"""
-    result = nizua_server.disconnect_controller()
+    result = nizua_server.disconnect_controller(get_lobby_id())
     status_code = 200 if result.get('success') else 400
     return jsonify(result), status_code
 
 @app.route('/api/controller/status', methods=['GET'])
 def get_controller_status():
     """Obtenir le statut de la manette"""
-    return jsonify(nizua_server.get_controller_status())
+    return jsonify(nizua_server.get_controller_status(get_lobby_id()))
 
 @app.route('/api/controller/status-all', methods=['GET'])
 def get_all_controller_status():
     """Obtenir le statut de toutes les manettes (format multi-lobby)"""
-    controllers = {}
-    
-    # Générer le statut pour jusqu'à 20 lobbies
-    for i in range(1, 21):
-        lobby_id = f"lobby{i}"
-        
-        # Vérifier si une manette est connectée pour ce lobby
-        # Pour l'instant, on utilise le même contrôleur pour tous les lobbies
-        # Tu peux modifier cette logique pour gérer plusieurs contrôleurs
-        if nizua_server.controller and nizua_server.controller.gamepad:
-            controllers[lobby_id] = {
-                "connected": True,
-                "movement_enabled": getattr(nizua_server.controller, 'movement_enabled', False),
-                "anti_afk_enabled": getattr(nizua_server.controller, 'anti_afk_enabled', False),
-                "controller_id": i  # ID unique pour chaque lobby
-            }
-        else:
-            controllers[lobby_id] = {
-                "connected": False,
-                "movement_enabled": False,
-                "anti_afk_enabled": False,
-                "controller_id": i
-            }
+    controllers = nizua_server.get_all_controller_status()
     
     return jsonify({
         "controllers": controllers,
-        "total_lobbies": 20,
+        "total_lobbies": MAX_LOBBIES,
         "connected_count": sum(1 for c in controllers.values() if c["connected"])
     })
 
+@app.route('/api/controller/events', methods=['GET'])
+def controller_events():
+    """Flux SSE des changements de statut des manettes
+
+    Un client qui se reconnecte reprend depuis Last-Event-ID (ou ?since=).
+    """
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('since')
+    return Response(
+        stream_events(nizua_server.status_hub, 'status', last_id, heartbeat=SSE_HEARTBEAT),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Métriques des manettes et du serveur au format texte Prometheus
+
+    En mode shards, les métriques des manettes sont collectées dans chaque shard.
+    """
+    shards = []
+    if isinstance(nizua_server.controllers, ShardedControllerPool):
+        shards = nizua_server.controllers.collect_metrics()
+    return Response(metrics.render(shards), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/controller/scheduler', methods=['GET'])
+def get_scheduler_stats():
+    """Obtenir le retard par tick du planificateur partagé des manettes (un par shard)"""
+    if GamepadController is None:
+        return jsonify({"error": "Module gamepad non disponible"}), 400
+    if isinstance(nizua_server.controllers, ShardedControllerPool):
+        return jsonify({"shards": nizua_server.controllers.scheduler_stats()})
+    return jsonify(get_scheduler().stats())
+
 @app.route('/api/controller/movement', methods=['POST'])
 def toggle_movement():
     """Activer/désactiver le mouvement"""
-    result = nizua_server.toggle_movement()
+    result = nizua_server.toggle_movement(get_lobby_id(), get_enabled_flag())
     status_code = 200 if result.get('success') else 400
     return jsonify(result), status_code
 
 @app.route('/api/controller/anti-afk', methods=['POST'])
 def toggle_anti_afk():
     """Activer/désactiver l'anti-AFK"""
-    result = nizua_server.toggle_anti_afk()
+    result = nizua_server.toggle_anti_afk(get_lobby_id(), get_enabled_flag())
     status_code = 200 if result.get('success') else 400
     return jsonify(result), status_code
 
 @app.route('/api/controller/select-class', methods=['POST'])
 def select_class():
-    """Sélectionner une classe"""
-    result = nizua_server.select_class()
+    """Sélectionner une classe (job en arrière-plan, sauf avec "wait")"""
+    if not wants_wait():
+        job = nizua_server.start_select_class_job(get_lobby_id())
+        if isinstance(job, dict):
+            return jsonify(job), 400
+        return job_response(job)
+    result = nizua_server.select_class(get_lobby_id())
     status_code = 200 if result.get('success') else 400
     return jsonify(result), status_code
 
+# Routes API pour les jobs
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """Lister les jobs récents (filtrables par ?lobby_id=)"""
+    jobs = nizua_server.jobs.list(request.args.get('lobby_id'))
+    return jsonify({"jobs": [job.as_dict() for job in jobs]})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Obtenir l'état d'un job"""
+    job = nizua_server.jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job introuvable"}), 404
+    return jsonify(job.as_dict())
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Annuler un job en attente ou une macro en cours"""
+    job = nizua_server.jobs.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job introuvable"}), 404
+    if job.state != 'cancelled':
+        return jsonify({"error": f"Job non annulable (état: {job.state})", "job": job.as_dict()}), 409
+    return jsonify({"success": True, "job": job.as_dict()})
+
 @app.route('/api/controller/config', methods=['GET'])
 def get_gamepad_config():
     """Obtenir la configuration gamepad complète (formatée)"""
-    result = nizua_server.get_gamepad_config_formatted()
-    status_code = 200 if result.get('success') else 500
-    return jsonify(result), status_code
+    return cached_response('gamepad_config')
 
 @app.route('/api/controller/config', methods=['POST'])
 def save_gamepad_config():
@@ -566,16 +1046,13 @@ def delete_gamepad_parameter():
 @app.route('/api/controller/config/default', methods=['GET'])
 def get_default_gamepad_config():
     """Obtenir la configuration par défaut"""
-    default_config = nizua_server.get_default_gamepad_config()
-    return jsonify({"success": True, "config": default_config})
+    return cached_response('default_gamepad_config')
 
 # Routes pour la gestion des paramètres gamepad
 @app.route('/api/controller/settings', methods=['GET'])
 def get_gamepad_settings():
     """Obtenir les paramètres de la manette"""
-    result = nizua_server.get_gamepad_settings()
-    status_code = 200 if result.get('success') else 500
-    return jsonify(result), status_code
+    return cached_response('gamepad_settings')
 
 @app.route('/api/controller/settings', methods=['POST'])
 def update_gamepad_setting():
@@ -596,7 +1073,7 @@ def update_gamepad_setting():
 @app.route('/api/games/<int:game_id>', methods=['GET'])
 def get_game(game_id):
     """Obtenir les détails d'un jeu spécifique"""
-    game = next((g for g in nizua_server.games if g['id'] == game_id), None)
+    game = nizua_server.catalog.get(game_id)
     if game:
         return jsonify(game)
     return jsonify({'error': 'Jeu non trouvé'}), 404
@@ -604,14 +1081,14 @@ def get_game(game_id):
 @app.route('/api/games/<int:game_id>/launch', methods=['POST'])
 def launch_game(game_id):
     """Lancer un jeu (redirection vers les webviews)"""
-    game = next((g for g in nizua_server.games if g['id'] == game_id), None)
+    game = nizua_server.catalog.get(game_id)
     if not game:
         return jsonify({'error': 'Jeu non trouvé'}), 404
     
     if not game.get('installed', False):
         return jsonify({'error': 'Jeu non installé'}), 400
     
-    print(f"Redirection vers webview pour le jeu: {game['name']}")
+    log.info("Redirection vers webview pour le jeu: %s", game['name'])
     
     return jsonify({
         'success': True,
@@ -623,26 +1100,18 @@ def launch_game(game_id):
 @app.route('/api/settings', methods=['GET'])
 def get_settings():
     """Obtenir les paramètres"""
-    return jsonify(nizua_server.settings)
+    return cached_response('settings')
 
 @app.route('/api/settings', methods=['POST'])
 def update_settings():
     """Mettre à jour les paramètres"""
     try:
         new_settings = request.json
-        nizua_server.settings.update(new_settings)
-        
-        config = {
-            'games': nizua_server.games,
-            'settings': nizua_server.settings
-        }
-        
-        with open("nizua_config.json", 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+        settings = nizua_server.update_settings(new_settings)
         
         return jsonify({
             'success': True,
-            'settings': nizua_server.settings
+            'settings': settings
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -657,6 +1126,10 @@ def get_xbox_info():
         'features': ['Game Pass', 'Xbox Live', 'Cloud Gaming']
     })
 
+@app.errorhandler(InvalidLobbyError)
+def invalid_lobby(error):
+    return jsonify({'error': f"Lobby inconnu : {error} (lobby1 à lobby{MAX_LOBBIES})"}), 400
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint non trouvé'}), 404
@@ -665,16 +1138,84 @@ def not_found(error):
 def internal_error(error):
     return jsonify({'error': 'Erreur interne du serveur'}), 500
 
-def run_server():
-    """Démarrer le serveur Flask"""
-    print("Démarrage du serveur Nizua Loader avec support gamepad...")
-    print("Serveur disponible sur http://localhost:5000")
-    print("Système de webviews Electron activé (pas de shortcuts)")
-    app.run(host='127.0.0.1', port=5000, debug=False, threaded=True)
+def run_server(dev=False, port=SERVER_PORT, threads=SERVER_THREADS, shards=0, stdin_stop=False):
+    """Démarrer le serveur (waitress en production, serveur Flask avec --dev)
+
+    Avec stdin_stop, la fermeture de stdin par le processus parent (Electron)
+    déclenche le même arrêt propre que SIGTERM.
+    """
+    log.info("Démarrage du serveur Nizua Loader avec support gamepad...")
+    log.info("Serveur disponible sur http://localhost:%d", port)
+    log.info("Système de webviews Electron activé (pas de shortcuts)")
+    
+    init_server(shards)
+    server = None
+    dev_server = None
+    if not dev:
+        try:
+            server = ProductionServer(app, SERVER_HOST, port, threads=threads,
+                                      on_drain=nizua_server.status_hub.close)
+        except ImportError:
+            log.warning("waitress non installé, utilisation du serveur de développement Flask")
+    
+    if server:
+        # SIGTERM (arrêt par Electron) : drain des requêtes en cours puis arrêt propre
+        signal.signal(signal.SIGTERM, lambda signum, frame: server.stop())
+        log.info("Mode production (waitress, %d threads)", threads)
+    else:
+        # Équivalent de app.run(threaded=True), mais le socket est ouvert avant
+        # le signal de disponibilité
+        from werkzeug.serving import make_server
+        dev_server = make_server(SERVER_HOST, port, app, threaded=True)
+        # SIGTERM passe par le bloc finally pour vider les écritures
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        log.info("Mode développement (serveur Flask)")
+    if stdin_stop:
+        # Sous Windows, Electron ne peut que tuer le processus : il ferme stdin à la place
+        stop_on_stdin_eof(server.stop if server else dev_server.shutdown)
+    
+    nizua_server.start_config_watcher()
+    if shards > 0:
+        # Processus des shards lancés avant la première connexion
+        nizua_server.controllers.start()
+        log.info("Manettes réparties sur %d processus", shards)
+    # Le socket écoute : Electron attend cette ligne sur stdout
+    startup_timer.signal_ready(port)
+    try:
+        if server:
+            server.run()
+        else:
+            dev_server.serve_forever()
+    finally:
+        if dev_server:
+            dev_server.server_close()
+        nizua_server.stop_config_watcher()
+        nizua_server.status_hub.close()
+        nizua_server.jobs.shutdown()
+        nizua_server.controllers.shutdown()
+        nizua_server.status_board.close()
+        nizua_server.flush_pending_writes()
+        shutdown_logging()
+
+def parse_args(argv=None):
+    """Options de la ligne de commande"""
+    parser = argparse.ArgumentParser(description="Serveur backend Nizua Loader")
+    parser.add_argument('--dev', action='store_true', help="serveur de développement Flask (un thread par requête)")
+    parser.add_argument('--port', type=int, default=SERVER_PORT, help="port d'écoute")
+    parser.add_argument('--threads', type=int, default=SERVER_THREADS, help="threads de travail en production")
+    parser.add_argument('--shards', type=int, default=int(os.environ.get('NIZUA_SHARDS', 0)),
+                        help="processus de manettes (0 = tout dans ce processus)")
+    parser.add_argument('--stop-on-stdin-eof', action='store_true',
+                        help="arrêt propre quand le processus parent ferme stdin")
+    return parser.parse_args(argv)
 
 if __name__ == '__main__':
+    # Nécessaire aux processus des shards dans server.exe (PyInstaller)
+    multiprocessing.freeze_support()
+    args = parse_args()
     try:
-        run_server()
+        run_server(dev=args.dev, port=args.port, threads=args.threads, shards=args.shards,
+                   stdin_stop=args.stop_on_stdin_eof)
     except KeyboardInterrupt:
         print("\nArrêt du serveur Nizua Loader")
         sys.exit(0)
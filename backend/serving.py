@@ -0,0 +1,106 @@
+import sys
+import threading
+import time
+
+# Production server tuning
+SERVER_THREADS = 16  # Bounded worker pool; an open SSE stream holds one worker
+CONNECTION_LIMIT = 100  # Stop accepting beyond this many open connections
+KEEPALIVE_TIMEOUT = 120  # Idle keep-alive connections are closed after this many seconds
+LISTEN_BACKLOG = 128
+DRAIN_TIMEOUT = 5.0  # Max time spent finishing in-flight requests on shutdown
+LOOP_TIMEOUT = 0.5  # Poll timeout; bounds how long a stop request waits to be seen
+
+
+class ProductionServer:
+    """Runs a WSGI app under waitress with a graceful drain on stop
+
+    waitress provides the bounded thread pool, HTTP/1.1 keep-alive and
+    connection limit. Stopping closes the listening socket first, then keeps
+    the I/O loop running until in-flight responses are sent or DRAIN_TIMEOUT
+    expires, so no request is cut off mid-response.
+    """
+
+    def __init__(self, app, host, port, threads=SERVER_THREADS, on_drain=None):
+        from waitress import create_server
+
+        self.on_drain = on_drain
+        self._stopping = threading.Event()
+        self.server = create_server(
+            app,
+            host=host,
+            port=port,
+            threads=threads,
+            connection_limit=CONNECTION_LIMIT,
+            channel_timeout=KEEPALIVE_TIMEOUT,
+            backlog=LISTEN_BACKLOG,
+            asyncore_loop_timeout=LOOP_TIMEOUT,
+            ident="Nizua"
+        )
+
+    def stop(self):
+        """Ask run() to drain and return; safe to call from a signal handler"""
+        self._stopping.set()
+
+    def _loop_once(self):
+        self.server.asyncore.loop(timeout=LOOP_TIMEOUT, map=self.server._map, count=1)
+
+    def run(self):
+        """Serve until stop() is called, then drain and shut down"""
+        try:
+            while not self._stopping.is_set():
+                self._loop_once()
+        except (SystemExit, KeyboardInterrupt):
+            pass
+        self.drain()
+
+    def _busy(self):
+        dispatcher = self.server.task_dispatcher
+        if dispatcher.queue:
+            return True
+        for channel in list(self.server.active_channels.values()):
+            if channel.requests or channel.total_outbufs_len:
+                return True
+            # Idle keep-alive connection: close it on the next loop pass
+            channel.will_close = True
+        return False
+
+    def drain(self, timeout=DRAIN_TIMEOUT):
+        """Stop accepting, finish in-flight requests, then stop the workers"""
+        server = self.server
+        if server.accepting:
+            server.accepting = False
+            server.del_channel()
+            server.socket.close()
+        if self.on_drain:
+            self.on_drain()  # e.g. end long-lived streams so they finish too
+        deadline = time.monotonic() + timeout
+        while self._busy() and time.monotonic() < deadline:
+            self._loop_once()
+        # Give closing channels one pass to flush and close
+        self._loop_once()
+        server.task_dispatcher.shutdown(cancel_pending=True, timeout=1)
+        server.trigger.close()
+
+
+def stop_on_stdin_eof(stop):
+    """Call stop() once stdin reaches end of file (the parent closed the pipe)
+
+    Lets a parent process ask for a graceful stop on Windows, where killing
+    the process runs no handler at all. Returns False if there is no stdin.
+    """
+    stream = sys.stdin
+    if stream is None:
+        return False
+
+    def watch():
+        try:
+            while stream.buffer.read(4096):
+                pass
+        except (OSError, ValueError):
+            pass  # Pipe broken or closed: the parent is gone too
+        stop()
+
+    thread = threading.Thread(target=watch, name="stdin-watch")
+    thread.daemon = True
+    thread.start()
+    return True
@@ -0,0 +1,77 @@
+import json
+import os
+import sys
+import threading
+import time
+
+# Prefix of the stdout line the Electron main process waits for
+READY_PREFIX = "NIZUA_READY"
+
+
+class StartupTimer:
+    """Wall-clock breakdown of backend startup, phase by phase
+
+    Time starts when this module is first imported. When the launcher sets
+    NIZUA_SPAWN_TIME (epoch milliseconds at spawn), the time the interpreter
+    took to get there is reported as the 'interpreter' phase.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.phases = []
+        spawn_ms = os.environ.get('NIZUA_SPAWN_TIME')
+        if spawn_ms:
+            try:
+                before = time.time() - int(spawn_ms) / 1000
+            except ValueError:
+                before = None
+            if before is not None and before >= 0:
+                self.phases.append(('interpreter', before))
+        self._last = self.origin
+        self._lock = threading.Lock()
+        self.ready_at = None
+        self.first_request_at = None
+
+    def mark(self, name):
+        """Record the time since the previous mark as phase name"""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def first_request(self):
+        """Record the time to the first request once ready; True only on that request"""
+        if self.first_request_at is not None or self.ready_at is None:
+            return False
+        with self._lock:
+            if self.first_request_at is not None:
+                return False
+            self.first_request_at = time.time()
+            self.mark('first_request')
+        return True
+
+    def total(self):
+        """Seconds from spawn (or first import) to the last mark"""
+        return sum(duration for _, duration in self.phases)
+
+    def as_dict(self):
+        return {
+            'phases_ms': {name: round(duration * 1000, 1) for name, duration in self.phases},
+            'total_ms': round(self.total() * 1000, 1),
+            'ready': self.ready_at is not None
+        }
+
+    def signal_ready(self, port, stream=None):
+        """Mark startup complete and print the readiness line on stdout
+
+        The line is written directly (not through logging) so it is emitted
+        whatever the log level, as soon as the socket accepts connections.
+        """
+        self.mark('listen')
+        self.ready_at = time.time()
+        info = {'port': port, 'pid': os.getpid(), 'startup_ms': round(self.total() * 1000, 1)}
+        stream = stream or sys.stdout
+        stream.write(f"{READY_PREFIX} {json.dumps(info)}\n")
+        stream.flush()
+
+
+timer = StartupTimer()
@@ -0,0 +1,247 @@
+import threading
+import time
+from multiprocessing import shared_memory
+
+from controller_defs import TARGET_HZ, lobby_number
+
+# Phases as stored in a row (index into this tuple)
+PHASES = ('idle', 'movement', 'break')
+# last_error is truncated to this many UTF-8 bytes
+ERROR_BYTES = 160
+# Attempts at a consistent copy before taking rows mid-write as they are
+READ_RETRIES = 100
+
+_dtype = None
+
+
+def status_dtype():
+    """Row layout: a seqlock counter then the published controller state"""
+    global _dtype
+    if _dtype is None:
+        import numpy  # Imported with the first board (~80 ms of startup otherwise)
+        _dtype = numpy.dtype([
+            ('seq', '<u4'),
+            ('connected', 'u1'),
+            ('movement_enabled', 'u1'),
+            ('anti_afk_enabled', 'u1'),
+            ('phase', 'u1'),
+            ('ticks', '<u8'),
+            ('achieved_hz', '<f4'),
+            ('last_error', f'S{ERROR_BYTES}'),
+        ], align=True)
+    return _dtype
+
+
+def lobby_row(lobby_id):
+    """Row of a lobby: lobbyN is row N - 1; None for other ids"""
+    number = lobby_number(lobby_id)
+    return number - 1 if number else None
+
+
+def _empty_status():
+    return {"connected": False, "movement_enabled": False, "anti_afk_enabled": False,
+            "phase": "idle", "last_error": None}
+
+
+class StatusRow:
+    """Writer for one row; only the process owning the controller writes it
+
+    Every write makes the row's counter odd, stores the fields, then makes
+    it even again. Threads of the owning process serialize on the row's
+    lock. Only the latest writer created for a row writes: a released
+    controller whose last status arrives after the lobby reconnected does
+    not overwrite its successor's row.
+    """
+
+    def __init__(self, board, index):
+        array = board.array
+        self.index = index
+        self._board = board
+        self._seq = array['seq']
+        self._connected = array['connected']
+        self._movement = array['movement_enabled']
+        self._anti_afk = array['anti_afk_enabled']
+        self._phase = array['phase']
+        self._ticks = array['ticks']
+        self._hz = array['achieved_hz']
+        self._error = array['last_error']
+        self._lock = board.row_lock(index)
+
+    @property
+    def current(self):
+        """False once a newer writer was created for the row"""
+        return self._board.writer(self.index) is self
+
+    def _begin(self):
+        # | 1 also recovers a row left odd by a writer that died mid-write
+        seq = int(self._seq[self.index]) | 1
+        self._seq[self.index] = seq
+        return seq
+
+    def _end(self, seq):
+        self._seq[self.index] = (seq + 1) & 0xFFFFFFFF
+
+    def write(self, status, ticks=None, achieved_hz=None):
+        """Store a status() dict, and the tick counters when given"""
+        i = self.index
+        error = status["last_error"]
+        error = error.encode('utf-8')[:ERROR_BYTES] if error else b''
+        with self._lock:
+            if not self.current:
+                return
+            seq = self._begin()
+            self._connected[i] = status["connected"]
+            self._movement[i] = status["movement_enabled"]
+            self._anti_afk[i] = status["anti_afk_enabled"]
+            self._phase[i] = PHASES.index(status["phase"])
+            self._error[i] = error
+            if ticks is not None:
+                self._ticks[i] = ticks
+                self._hz[i] = achieved_hz
+            self._end(seq)
+
+    def set_ticks(self, ticks, achieved_hz):
+        """Store the tick counters (called on every movement tick)"""
+        i = self.index
+        with self._lock:
+            if not self.current:
+                return
+            seq = self._begin()
+            self._ticks[i] = ticks
+            self._hz[i] = achieved_hz
+            self._end(seq)
+
+
+class StatusBoard:
+    """Controller state in a fixed-layout table in shared memory
+
+    One row per lobby. Controllers write their own row on every status change
+    and tick; the shard processes attach to the same block by name. Readers
+    copy the whole table in one pass and check each row's counter (seqlock)
+    instead of taking any lock or asking the controllers. This relies on
+    stores becoming visible in program order, as they do on x86.
+
+    The block is created on first use, so NumPy is not imported at startup.
+    """
+
+    def __init__(self, rows, name=None):
+        self.rows = rows
+        self._name = name
+        self._owner = name is None
+        self._shm = None
+        self.array = None
+        self._lock = threading.Lock()
+        # Per row: the lock and the current writer of this process
+        self._row_locks = [threading.Lock() for _ in range(rows)]
+        self._writers = {}
+
+    @classmethod
+    def attach(cls, name, rows):
+        """Open a board created by another process"""
+        board = cls(rows, name)
+        board.open()
+        return board
+
+    @property
+    def opened(self):
+        return self.array is not None
+
+    @property
+    def name(self):
+        """Shared memory name to pass to attach()"""
+        self.open()
+        return self._shm.name
+
+    def open(self):
+        with self._lock:
+            if self.array is not None:
+                return
+            import numpy
+            dtype = status_dtype()
+            size = dtype.itemsize * self.rows
+            if self._owner:
+                shm = shared_memory.SharedMemory(create=True, size=size)
+                shm.buf[:size] = bytes(size)
+            else:
+                shm = shared_memory.SharedMemory(name=self._name)
+            self._shm = shm
+            self.array = numpy.ndarray((self.rows,), dtype=dtype, buffer=shm.buf)
+
+    def row(self, index):
+        """Writer for a row; it replaces the row's previous writer"""
+        self.open()
+        row = StatusRow(self, index)
+        with self._row_locks[index]:
+            self._writers[index] = row
+        return row
+
+    def row_lock(self, index):
+        return self._row_locks[index]
+
+    def writer(self, index):
+        """Current writer of a row in this process, or None"""
+        return self._writers.get(index)
+
+    def row_for(self, lobby_id):
+        """Writer for a lobby's row, or None if the lobby has none"""
+        index = lobby_row(lobby_id)
+        if index is None or index >= self.rows:
+            return None
+        return self.row(index)
+
+    def snapshot(self):
+        """Copy of the table in which every row is consistent
+
+        Rows changed during the copy are copied again; after READ_RETRIES
+        passes the remaining ones are returned as they are.
+        """
+        array = self.array
+        copy = array.copy()
+        for _ in range(READ_RETRIES):
+            seq = array['seq']
+            # Odd: write in progress; changed: written during the copy
+            torn = ((copy['seq'] & 1) == 1) | (copy['seq'] != seq)
+            if not torn.any():
+                break
+            # Let a writer of this process that was preempted mid-write finish
+            time.sleep(0)
+            copy[torn] = array[torn]
+        return copy
+
+    def read_all(self):
+        """Status of every row, in the format of GamepadController.status()
+
+        Connected rows also carry tick_rate.
+        """
+        if not self.opened:
+            return [_empty_status() for _ in range(self.rows)]
+        result = []
+        for _, connected, movement, anti_afk, phase, ticks, hz, error in self.snapshot().tolist():
+            status = {
+                "connected": bool(connected),
+                "movement_enabled": bool(movement),
+                "anti_afk_enabled": bool(anti_afk),
+                "phase": PHASES[phase] if phase < len(PHASES) else "idle",
+                "last_error": error.decode('utf-8', 'ignore') or None,
+            }
+            if connected:
+                status["tick_rate"] = {"target_hz": TARGET_HZ, "achieved_hz": round(hz, 1), "ticks": ticks}
+            result.append(status)
+        return result
+
+    def close(self):
+        """Detach, and free the block if this process created it"""
+        with self._lock:
+            shm, self._shm = self._shm, None
+            self.array = None
+        if shm is None:
+            return
+        try:
+            shm.close()
+        except BufferError:
+            pass  # Rows still held by controllers; unmapped at exit
+        if self._owner:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
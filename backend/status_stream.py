@@ -0,0 +1,109 @@
+import json
+import os
+import threading
+from collections import deque
+
+
+class StatusHub:
+    """Sequenced feed of state changes for Server-Sent Events clients
+
+    Each publish gets the next sequence number and is kept in a bounded
+    backlog, so a reconnecting client can resume from the last id it saw.
+    Event ids are "<epoch>-<seq>": the epoch is drawn per hub, so an id
+    from before a backend restart never matches and the client gets a
+    snapshot. Publishing a value identical to the latest one for the same
+    key is a no-op, which keeps the feed limited to real changes.
+    """
+
+    def __init__(self, backlog=1024):
+        self.epoch = os.urandom(4).hex()
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._events = deque(maxlen=backlog)
+        self._latest = {}
+        self.closed = False
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def event_id(self, seq):
+        """SSE id of a sequence number"""
+        return f"{self.epoch}-{seq}"
+
+    def parse_id(self, event_id):
+        """Sequence number of an id from this hub, or None (other epoch, malformed)"""
+        epoch, _, seq = (event_id or '').partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def close(self):
+        """End every open stream (on server shutdown)"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def publish(self, event, key, data):
+        """Record a change; returns its sequence number, or None if nothing changed"""
+        with self._cond:
+            if self._latest.get((event, key)) == data:
+                return None
+            self._seq += 1
+            self._latest[(event, key)] = data
+            self._events.append((self._seq, event, key, data))
+            self._cond.notify_all()
+            return self._seq
+
+    def snapshot(self, event):
+        """Return ({key: data} for the latest value of each key, current seq)"""
+        with self._cond:
+            return {key: data for (name, key), data in self._latest.items() if name == event}, self._seq
+
+    def wait(self, after, timeout):
+        """Return events newer than after, blocking up to timeout for the first one
+
+        Returns None if after is older than the backlog (the client must resync).
+        """
+        with self._cond:
+            if after < self._seq and self._events and self._events[0][0] > after + 1:
+                return None
+            if after >= self._seq and not self.closed:
+                self._cond.wait(timeout)
+            return [entry for entry in self._events if entry[0] > after]
+
+
+def format_sse(event, data, event_id=None):
+    """Encode one Server-Sent Events message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def stream_events(hub, snapshot_event, last_event_id=None, heartbeat=15.0):
+    """Generator of SSE messages for one client
+
+    Starts with a full snapshot unless last_event_id comes from this hub
+    and can be resumed from the backlog, then sends each change as it is
+    published and a comment line as heartbeat while idle.
+    """
+    yield "retry: 2000\n\n"
+    last_id = hub.parse_id(last_event_id)
+    if last_id is None or last_id > hub.seq or hub.wait(last_id, 0) is None:
+        data, last_id = hub.snapshot(snapshot_event)
+        yield format_sse('snapshot', data, hub.event_id(last_id))
+    while not hub.closed:
+        events = hub.wait(last_id, heartbeat)
+        if events is None:
+            data, last_id = hub.snapshot(snapshot_event)
+            yield format_sse('snapshot', data, hub.event_id(last_id))
+            continue
+        if not events:
+            yield ": heartbeat\n\n"
+            continue
+        for seq, event, key, data in events:
+            yield format_sse(event, {'key': key, 'data': data}, hub.event_id(seq))
+            last_id = seq
@@ -0,0 +1,29 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Backend modules use bare imports, as when server.py runs from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tick_scheduler import TickScheduler
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = TickScheduler(workers=2, name="test")
+    yield scheduler
+    scheduler.shutdown()
+
+
+@pytest.fixture
+def wait_until():
+    """Poll predicate until it is true; fails the test after timeout seconds"""
+    def wait(predicate, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() > deadline:
+                pytest.fail("condition not met in time")
+            time.sleep(0.001)
+    return wait
@@ -0,0 +1,71 @@
+import configparser
+import dataclasses
+import pickle
+
+import pytest
+
+from config_schema import (BY_KEY, PARAMS, ControllerSettings, coerce, default_values, load_values,
+                           settings_from_config, to_sections, typed_value, with_value)
+
+
+def config_with(section, key, raw):
+    config = configparser.ConfigParser()
+    config.read_dict({section: {key: raw}})
+    return config
+
+
+def test_defaults_are_within_bounds():
+    for param in PARAMS:
+        assert param.minimum <= param.default <= param.maximum, param.key
+
+
+def test_coerce_converts_and_checks_bounds():
+    param = BY_KEY['Movement', 'jump_chance']
+    assert coerce(param, '0.5') == 0.5
+    with pytest.raises(ValueError, match="outside"):
+        coerce(param, '1.5')
+    with pytest.raises(ValueError, match="invalid value"):
+        coerce(param, 'often')
+    with pytest.raises(ValueError, match="invalid value"):
+        coerce(param, None)
+
+
+def test_invalid_entries_fall_back_to_the_default():
+    config = config_with('Movement', 'jump_chance', '2')
+    config.read_dict({'AntiAFK': {'interval': 'soon'}})
+    values = load_values(config)
+    assert values['jump_chance'] == BY_KEY['Movement', 'jump_chance'].default
+    assert values['anti_afk_interval'] == BY_KEY['AntiAFK', 'interval'].default
+    assert load_values(configparser.ConfigParser()) == default_values()
+
+
+def test_sections_roundtrip_through_config():
+    values = dict(default_values(), look_intensity=5.5, anti_afk_interval=30.0)
+    config = configparser.ConfigParser()
+    config.read_dict(to_sections(values))
+    assert settings_from_config(config) == ControllerSettings(**values)
+
+
+def test_with_value_returns_a_new_snapshot():
+    settings = ControllerSettings()
+    changed = with_value(settings, 'Movement', 'look_intensity', '4')
+    assert changed.look_intensity == 4.0
+    assert settings.look_intensity == BY_KEY['Movement', 'look_intensity'].default
+    assert with_value(settings, 'Movement', 'unknown', 1) is None
+    with pytest.raises(ValueError):
+        with_value(settings, 'Movement', 'look_intensity', 11)
+
+
+def test_snapshots_are_frozen_and_picklable():
+    settings = ControllerSettings(look_intensity=4.0)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        settings.look_intensity = 1.0
+    assert pickle.loads(pickle.dumps(settings)) == settings
+
+
+def test_typed_value():
+    assert typed_value('Movement', 'jump_chance', '0.5') == 0.5
+    assert typed_value('Movement', 'jump_chance', 'often') == 'often'
+    assert typed_value('Custom', 'count', '3') == 3
+    assert typed_value('Custom', 'ratio', '0.25') == 0.25
+    assert typed_value('Custom', 'label', 'abc') == 'abc'
@@ -0,0 +1,43 @@
+from config_watcher import ConfigWatcher
+from persistence import atomic_write
+
+
+def test_own_writes_do_not_fire(tmp_path):
+    path = tmp_path / 'config.ini'
+    path.write_text('a')
+    changes = []
+    watcher = ConfigWatcher(str(path), lambda: changes.append(1))
+
+    atomic_write(str(path), 'bb', before_replace=watcher.ignore_current)
+    atomic_write(str(path), 'ccc', before_replace=watcher.ignore_current)
+    assert not watcher.check()
+    assert changes == []
+
+
+def test_file_seen_before_the_rename_does_not_fire(tmp_path):
+    path = tmp_path / 'config.ini'
+    path.write_text('a')
+    changes = []
+    watcher = ConfigWatcher(str(path), lambda: changes.append(1))
+
+    def check_before_replace(stat):
+        watcher.ignore_current(stat)
+        assert not watcher.check()  # Still the previous file
+
+    atomic_write(str(path), 'bb', before_replace=check_before_replace)
+    assert not watcher.check()
+    assert changes == []
+
+
+def test_external_edit_fires_once(tmp_path):
+    path = tmp_path / 'config.ini'
+    path.write_text('a')
+    changes = []
+    watcher = ConfigWatcher(str(path), lambda: changes.append(1))
+
+    atomic_write(str(path), 'bb', before_replace=watcher.ignore_current)
+    assert not watcher.check()
+    path.write_text('edited by hand')
+    assert watcher.check()
+    assert not watcher.check()
+    assert changes == [1]
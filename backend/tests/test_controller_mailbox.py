@@ -0,0 +1,124 @@
+from concurrent.futures import CancelledError
+
+import pytest
+
+from controller_mailbox import Mailbox, MailboxClosedError, MailboxFullError
+
+
+def _blocking():
+    """Generator command that holds the mailbox until cancelled"""
+    yield 10
+
+
+def _macro_tasks(scheduler):
+    return [task for task in scheduler._tasks if task.name.endswith(':macro')]
+
+
+def test_commands_run_in_arrival_order(scheduler):
+    mailbox = Mailbox("test", scheduler)
+    seen = []
+    futures = [mailbox.post(seen.append, i) for i in range(50)]
+    futures[-1].result(1)
+    assert seen == list(range(50))
+
+
+def test_future_carries_result_or_exception(scheduler):
+    mailbox = Mailbox("test", scheduler)
+
+    def fail():
+        raise ValueError("boom")
+
+    assert mailbox.post(lambda: 42).result(1) == 42
+    with pytest.raises(ValueError, match="boom"):
+        mailbox.post(fail).result(1)
+
+
+def test_generator_command_holds_later_commands(scheduler):
+    mailbox = Mailbox("test", scheduler)
+    order = []
+
+    def slow():
+        yield 0.05
+        order.append('slow')
+        return 'done'
+
+    first = mailbox.post(slow)
+    second = mailbox.post(order.append, 'next')
+    assert first.result(1) == 'done'
+    second.result(1)
+    assert order == ['slow', 'next']
+
+
+def test_full_mailbox_refuses_commands(scheduler, wait_until):
+    mailbox = Mailbox("test", scheduler, capacity=2)
+    running = mailbox.post(_blocking)
+    wait_until(lambda: len(mailbox) == 0)
+    queued = [mailbox.post(lambda: None), mailbox.post(lambda: None)]
+    with pytest.raises(MailboxFullError):
+        mailbox.post(lambda: None)
+    running.cancel()
+    for future in queued:
+        future.result(1)
+
+
+def test_cancelled_command_is_skipped(scheduler, wait_until):
+    mailbox = Mailbox("test", scheduler)
+    seen = []
+    running = mailbox.post(_blocking)
+    wait_until(lambda: len(mailbox) == 0)
+    skipped = mailbox.post(seen.append, 'skipped')
+    assert skipped.cancel()
+    running.cancel()
+    mailbox.post(seen.append, 'ran').result(1)
+    assert seen == ['ran']
+
+
+def test_close_runs_queued_commands_then_the_final_one(scheduler, wait_until):
+    mailbox = Mailbox("test", scheduler)
+    seen = []
+    mailbox.post(seen.append, 1)
+    final = mailbox.close(seen.append, 'final')
+    with pytest.raises(MailboxClosedError):
+        mailbox.post(seen.append, 2)
+    final.result(1)
+    assert seen == [1, 'final']
+    wait_until(lambda: mailbox._task.done)
+
+
+def test_macro_does_not_block_later_commands(scheduler, wait_until):
+    mailbox = Mailbox("test", scheduler)
+    steps = []
+
+    def macro():
+        for i in range(500):
+            steps.append(i)
+            yield 0.01
+        return True
+
+    running = mailbox.post_macro(macro)
+    assert mailbox.post(lambda: 'toggle').result(0.5) == 'toggle'
+    assert not running.done()
+
+    mailbox.cancel_macros()
+    with pytest.raises(CancelledError):
+        running.result(1)
+    wait_until(lambda: not _macro_tasks(scheduler))
+    count = len(steps)
+    assert mailbox.post(lambda: None).result(1) is None
+    assert len(steps) == count
+
+
+def test_macro_result_and_error_reach_its_future(scheduler):
+    mailbox = Mailbox("test", scheduler)
+
+    def succeed():
+        yield 0.01
+        return 'selected'
+
+    def fail():
+        raise RuntimeError("Gamepad not connected")
+        yield
+
+    assert mailbox.post_macro(succeed).result(1) == 'selected'
+    with pytest.raises(RuntimeError, match="not connected"):
+        mailbox.post_macro(fail).result(1)
@@ -0,0 +1,94 @@
+import pytest
+
+from game_catalog import MAX_PAGE_SIZE, GameCatalog
+
+
+@pytest.fixture
+def catalog():
+    changes = []
+    catalog = GameCatalog([
+        {'id': 1, 'name': 'Warzone', 'installed': True},
+        {'id': 2, 'name': 'Fortnite', 'installed': False},
+    ], on_change=lambda: changes.append(1))
+    catalog.changes = changes
+    return catalog
+
+
+def test_load_skips_invalid_and_duplicate_games():
+    catalog = GameCatalog([
+        {'id': 1, 'name': 'Warzone'},
+        {'id': 1, 'name': 'Other'},
+        {'id': 2, 'name': 'warzone '},
+        {'id': 3, 'name': ''},
+        {'name': 'No id'},
+        'not a game',
+        {'id': 4, 'name': 'Apex', 'path': 3},
+        {'id': 5, 'name': 'Apex'},
+    ])
+    assert [game['id'] for game in catalog.games()] == [1, 5]
+
+
+def test_add_assigns_the_next_id(catalog):
+    game = catalog.add({'name': '  Apex  '})
+    assert game == {'id': 3, 'name': 'Apex'}
+    assert catalog.get(3) is game
+    assert catalog.find_by_name('APEX') is game
+    assert catalog.changes == [1]
+
+
+@pytest.mark.parametrize('game', [
+    {'name': 'warzone'},
+    {'id': 2, 'name': 'Apex'},
+    {'id': 0, 'name': 'Apex'},
+    {'id': True, 'name': 'Apex'},
+    {'id': '7', 'name': 'Apex'},
+    {'name': ' '},
+])
+def test_add_refuses_conflicts_and_invalid_games(catalog, game):
+    with pytest.raises(ValueError):
+        catalog.add(game)
+    assert len(catalog) == 2
+    assert catalog.changes == []
+
+
+def test_update_stores_a_new_dict(catalog):
+    before = catalog.get(1)
+    game = catalog.update(1, {'name': 'Call of Duty', 'id': 9, 'installed': False})
+    assert game == {'id': 1, 'name': 'Call of Duty', 'installed': False}
+    assert before == {'id': 1, 'name': 'Warzone', 'installed': True}
+    assert catalog.find_by_name('warzone') is None
+    assert catalog.find_by_name('call of duty') is game
+    assert catalog.update(42, {'name': 'x'}) is None
+    assert catalog.changes == [1]
+
+
+def test_update_refuses_a_name_used_by_another_game(catalog):
+    with pytest.raises(ValueError):
+        catalog.update(1, {'name': 'FORTNITE'})
+    assert catalog.get(1)['name'] == 'Warzone'
+    # Changing only the case of its own name is fine
+    assert catalog.update(2, {'name': 'FORTNITE'})['name'] == 'FORTNITE'
+
+
+def test_remove_frees_the_name(catalog):
+    assert catalog.remove(2)['name'] == 'Fortnite'
+    assert catalog.remove(2) is None
+    assert 2 not in catalog
+    assert catalog.add({'name': 'Fortnite'})['id'] == 2
+
+
+def test_query_filters_and_paginates(catalog):
+    for i in range(10):
+        catalog.add({'name': f'Game {i}', 'installed': i % 2 == 0})
+    page, total = catalog.query(search='game', installed=True, offset=1, limit=2)
+    assert total == 5
+    assert [game['name'] for game in page] == ['Game 2', 'Game 4']
+    assert catalog.query(search='FORT') == ([catalog.get(2)], 1)
+    assert catalog.query(offset=-5, limit=-1) == ([], 12)
+
+
+def test_query_clamps_the_page_size():
+    catalog = GameCatalog([{'id': i, 'name': f'Game {i}'} for i in range(1, MAX_PAGE_SIZE + 11)])
+    page, total = catalog.query(limit=10 ** 6)
+    assert len(page) == MAX_PAGE_SIZE
+    assert total == MAX_PAGE_SIZE + 10
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+import persistence
+from persistence import MAX_RETRY_DELAY, WriteBehindFile, atomic_write
+
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text('old')
+    seen = []
+
+    def before_replace(stat):
+        seen.append((path.read_text(), stat.st_mtime_ns, stat.st_size))
+
+    atomic_write(str(path), 'new content', before_replace=before_replace)
+    stat = os.stat(path)
+    assert path.read_text() == 'new content'
+    # Called before the rename, with the stat the file keeps afterwards
+    assert seen == [('old', stat.st_mtime_ns, stat.st_size)]
+    assert os.listdir(tmp_path) == ['config.json']
+
+
+def test_failed_atomic_write_keeps_the_old_file(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text('old')
+
+    def fail(stat):
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        atomic_write(str(path), 'new', before_replace=fail)
+    assert path.read_text() == 'old'
+    assert os.listdir(tmp_path) == ['config.json']
+
+
+def test_changes_are_coalesced_into_one_write(tmp_path, wait_until):
+    path = tmp_path / 'config.json'
+    state = {'value': 0}
+    writer = WriteBehindFile(str(path), lambda: str(state['value']), delay=0.05)
+    try:
+        for i in range(100):
+            state['value'] = i
+            writer.mark_dirty()
+        wait_until(lambda: writer.writes == 1)
+        assert path.read_text() == '99'
+        assert not writer.flush()
+    finally:
+        writer.close()
+    assert writer.writes == 1
+
+
+def test_close_flushes_pending_changes(tmp_path):
+    path = tmp_path / 'config.json'
+    writer = WriteBehindFile(str(path), lambda: 'saved', delay=60)
+    writer.mark_dirty()
+    writer.close()
+    assert path.read_text() == 'saved'
+
+
+def test_failed_writes_back_off_then_recover(tmp_path, wait_until, monkeypatch):
+    path = tmp_path / 'config.json'
+    real_write = persistence.atomic_write
+    broken = [True]
+
+    def flaky_write(*args, **kwargs):
+        if broken[0]:
+            raise OSError("read-only file system")
+        return real_write(*args, **kwargs)
+
+    monkeypatch.setattr(persistence, 'atomic_write', flaky_write)
+    writer = WriteBehindFile(str(path), lambda: 'saved', delay=0.01)
+    try:
+        writer.mark_dirty()
+        wait_until(lambda: writer.failures >= 3)
+        # Delays double: 0.01, 0.02, 0.04, ... instead of retrying every 0.01 s
+        assert writer._next_delay() == pytest.approx(0.01 * 2 ** writer.failures)
+        broken[0] = False
+        wait_until(lambda: writer.writes == 1)
+        assert writer.failures == 0
+        assert path.read_text() == 'saved'
+    finally:
+        writer.close()
+
+
+def test_retry_delay_is_capped(tmp_path):
+    writer = WriteBehindFile(str(tmp_path / 'config.json'), lambda: '', delay=1)
+    try:
+        writer.failures = 20
+        assert writer._next_delay() == MAX_RETRY_DELAY
+    finally:
+        writer.close()
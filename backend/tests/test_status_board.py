@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from status_board import ERROR_BYTES, StatusBoard, lobby_row
+
+
+def status(connected=True, phase='idle', last_error=None):
+    return {"connected": connected, "movement_enabled": phase == 'movement', "anti_afk_enabled": False,
+            "phase": phase, "last_error": last_error}
+
+
+@pytest.fixture
+def board():
+    board = StatusBoard(4)
+    board.open()
+    yield board
+    board.close()
+
+
+def test_lobby_row():
+    assert lobby_row('lobby1') == 0
+    assert lobby_row('lobby20') == 19
+    assert lobby_row('lobby0') is None
+    assert lobby_row('lobby') is None
+    assert lobby_row('foo') is None
+
+
+def test_unopened_board_reads_disconnected():
+    board = StatusBoard(2)
+    assert [row["connected"] for row in board.read_all()] == [False, False]
+    assert not board.opened
+
+
+def test_write_then_read_back(board):
+    board.row_for('lobby2').write(status(phase='movement'), 42, 99.5)
+    row = board.read_all()[1]
+    assert row["connected"] and row["movement_enabled"] and row["phase"] == 'movement'
+    assert row["tick_rate"] == {"target_hz": 100.0, "achieved_hz": 99.5, "ticks": 42}
+    assert board.read_all()[0]["connected"] is False
+
+
+def test_lobby_outside_the_board_has_no_row(board):
+    assert board.row_for('lobby5') is None
+    assert board.row_for('foo') is None
+
+
+def test_last_error_is_truncated(board):
+    board.row(0).write(status(last_error="é" * ERROR_BYTES))
+    assert len(board.read_all()[0]["last_error"].encode('utf-8')) <= ERROR_BYTES
+
+
+def test_superseded_writer_is_ignored(board):
+    old = board.row_for('lobby1')
+    old.write(status())
+    new = board.row_for('lobby1')
+    new.write(status(), 3, 100.0)
+    old.write(status(connected=False))
+    old.set_ticks(0, 0.0)
+    row = board.read_all()[0]
+    assert row["connected"] and row["tick_rate"]["ticks"] == 3
+
+
+def test_attached_board_shares_rows(board):
+    other = StatusBoard.attach(board.name, board.rows)
+    try:
+        other.row(1).write(status(phase='break'))
+        assert board.read_all()[1]["phase"] == 'break'
+    finally:
+        other.close()
+
+
+def test_write_recovers_a_row_left_mid_write(board):
+    row = board.row(0)
+    board.array['seq'][0] = 7  # A writer died with the counter odd
+    row.write(status())
+    assert board.array['seq'][0] % 2 == 0
+    assert board.read_all()[0]["connected"]
+
+
+def test_snapshot_rows_are_consistent_under_concurrent_writes(board):
+    # The writer keeps ticks and achieved_hz equal: a torn read would see them differ
+    row = board.row(0)
+    stop = threading.Event()
+
+    def write():
+        n = 0
+        while not stop.is_set():
+            n += 1
+            row.set_ticks(n, float(n))
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        for _ in range(2000):
+            copy = board.snapshot()
+            assert copy['seq'][0] % 2 == 0
+            assert copy['ticks'][0] == copy['achieved_hz'][0]
+    finally:
+        stop.set()
+        writer.join()
@@ -0,0 +1,176 @@
+import threading
+import time
+
+from tick_scheduler import PARKED, TickScheduler
+
+
+def test_steps_run_until_the_generator_returns(scheduler, wait_until):
+    steps = []
+
+    def task():
+        for i in range(3):
+            steps.append(i)
+            yield 0.01
+
+    handle = scheduler.spawn(task())
+    wait_until(lambda: handle.done)
+    assert steps == [0, 1, 2]
+
+
+def test_call_later_runs_once(scheduler, wait_until):
+    calls = []
+    handle = scheduler.call_later(0.01, calls.append, 'fired')
+    wait_until(lambda: handle.done)
+    time.sleep(0.03)
+    assert calls == ['fired']
+
+
+def test_parked_task_resumes_only_when_woken(scheduler, wait_until):
+    steps = []
+
+    def task():
+        while True:
+            steps.append(1)
+            yield None
+
+    handle = scheduler.spawn(task())
+    wait_until(lambda: handle.state == PARKED)
+    time.sleep(0.05)
+    assert len(steps) == 1
+    handle.wake()
+    wait_until(lambda: len(steps) == 2 and handle.state == PARKED)
+
+
+def test_wake_during_a_step_runs_the_next_one_at_once(scheduler, wait_until):
+    entered = threading.Event()
+    release = threading.Event()
+    steps = []
+
+    def task():
+        while True:
+            steps.append(1)
+            if len(steps) == 1:
+                entered.set()
+                release.wait(1)
+            yield None  # Would park for good without the pending wake
+
+    handle = scheduler.spawn(task())
+    assert entered.wait(1)
+    handle.wake()
+    release.set()
+    wait_until(lambda: len(steps) == 2)
+
+
+def test_cancel_ends_a_parked_task(scheduler, wait_until):
+    def task():
+        while True:
+            yield None
+
+    handle = scheduler.spawn(task())
+    wait_until(lambda: handle.state == PARKED)
+    handle.cancel()
+    wait_until(lambda: handle.done)
+    assert handle not in scheduler._tasks
+
+
+def test_cancel_during_a_step_prevents_the_next(scheduler, wait_until):
+    entered = threading.Event()
+    release = threading.Event()
+    steps = []
+
+    def task():
+        while True:
+            steps.append(1)
+            entered.set()
+            release.wait(1)
+            yield 0
+
+    handle = scheduler.spawn(task())
+    assert entered.wait(1)
+    handle.cancel()
+    release.set()
+    wait_until(lambda: handle.done)
+    time.sleep(0.02)
+    assert len(steps) == 1
+
+
+def test_concurrent_wakes_never_overlap_steps(wait_until):
+    scheduler = TickScheduler(workers=4, name="race")
+    lock = threading.Lock()
+    active = [0]
+    overlaps = [0]
+    steps = [0]
+
+    def task():
+        while True:
+            with lock:
+                active[0] += 1
+                if active[0] > 1:
+                    overlaps[0] += 1
+            time.sleep(0.0002)
+            with lock:
+                active[0] -= 1
+                steps[0] += 1
+            yield None
+
+    try:
+        handle = scheduler.spawn(task())
+
+        def wake_many():
+            for _ in range(300):
+                handle.wake()
+
+        threads = [threading.Thread(target=wake_many) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wait_until(lambda: handle.state == PARKED)
+        assert overlaps[0] == 0
+        assert 1 < steps[0] <= 1 + 8 * 300
+        # Superseded heap entries were skipped, not left to run later
+        count = steps[0]
+        time.sleep(0.05)
+        assert steps[0] == count
+    finally:
+        scheduler.shutdown()
+
+
+def test_timed_steps_share_wakeups_on_the_grid(wait_until):
+    scheduler = TickScheduler(workers=2, name="grid", resolution=0.01)
+    try:
+        def task():
+            for _ in range(20):
+                yield 0.01
+
+        handles = [scheduler.spawn(task()) for _ in range(20)]
+        wait_until(lambda: all(handle.done for handle in handles), timeout=5)
+        # 400 timed steps; one wakeup per 10 ms slot, not one per step
+        assert scheduler.wakeups < 100
+    finally:
+        scheduler.shutdown()
+
+
+def test_deadlines_are_on_the_grid_and_never_in_the_past():
+    scheduler = TickScheduler(workers=1, name="deadline", resolution=0.01)
+    try:
+        for delay in (0.001, 0.004, 0.006, 0.013, 0.5):
+            before = time.monotonic()
+            deadline = scheduler._deadline(delay)
+            assert deadline >= before
+            assert abs(deadline / 0.01 - round(deadline / 0.01)) < 1e-6 or deadline <= time.monotonic()
+        assert scheduler._deadline(0) <= time.monotonic()
+    finally:
+        scheduler.shutdown()
+
+
+def test_shutdown_stops_every_worker():
+    scheduler = TickScheduler(workers=3, name="stop")
+
+    def task():
+        while True:
+            yield 0.01
+
+    scheduler.spawn(task())
+    scheduler.shutdown()
+    assert not any(thread.is_alive() for thread in scheduler._threads)
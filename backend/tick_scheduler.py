@@ -0,0 +1,270 @@
+import heapq
+import itertools
+import threading
+import time
+
+from controller_defs import TICK_INTERVAL
+from log_setup import get_logger
+
+log = get_logger('scheduler')
+
+# Timed steps are rounded to this grid, so that every task due in the same
+# slot shares one timer wakeup instead of each keeping its own phase
+TICK_RESOLUTION = TICK_INTERVAL
+
+
+class TickStats:
+    """Tick counters for one task (lag is the delay past the requested deadline)"""
+    __slots__ = ('ticks', 'lag_total', 'lag_max', 'last_lag')
+
+    def __init__(self):
+        self.ticks = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.last_lag = 0.0
+
+    def record(self, lag):
+        self.ticks += 1
+        self.lag_total += lag
+        self.last_lag = lag
+        if lag > self.lag_max:
+            self.lag_max = lag
+
+    def as_dict(self):
+        return {
+            'ticks': self.ticks,
+            'lag_avg_ms': (self.lag_total / self.ticks * 1000) if self.ticks else 0.0,
+            'lag_max_ms': self.lag_max * 1000,
+            'last_lag_ms': self.last_lag * 1000
+        }
+
+
+# Task states
+SCHEDULED = 'scheduled'
+RUNNING = 'running'
+PARKED = 'parked'
+DONE = 'done'
+
+
+class Task:
+    """A generator driven by the TickScheduler
+
+    The generator yields the delay in seconds before its next step, in place
+    of calling time.sleep, or None to park until woken, and ends by returning.
+    """
+    __slots__ = ('name', '_gen', '_scheduler', 'state', 'cancelled', 'stats', 'metrics',
+                 '_generation', '_wake_pending')
+
+    def __init__(self, gen, name, scheduler, metrics=None):
+        self.name = name
+        self._gen = gen
+        self._scheduler = scheduler
+        self.state = SCHEDULED
+        self.cancelled = False
+        self.stats = TickStats()
+        # Optional observer of each step: metrics.observe(lag, duration)
+        self.metrics = metrics
+        # Bumped on every reschedule so superseded heap entries are skipped
+        self._generation = 0
+        self._wake_pending = False
+
+    @property
+    def done(self):
+        return self.state == DONE
+
+    def wake(self):
+        """Run the next step now, cutting short a parked or timed wait"""
+        self._scheduler.wake(self)
+
+    def cancel(self):
+        """Stop the task; takes effect immediately unless a step is running"""
+        self.cancelled = True
+        self._scheduler.wake(self)
+
+
+def _call_once(callback, args):
+    callback(*args)
+    return
+    yield
+
+
+class TickScheduler:
+    """Heap-based timer loop that runs every controller's tasks on a few workers
+
+    One worker at a time sleeps until the earliest deadline; the others wait
+    idle until there is more due work than a single worker can take. Parked
+    tasks cost nothing until woken.
+
+    Deadlines of timed steps are rounded to the nearest point of a grid of
+    resolution seconds (0 disables it), never earlier than now: controllers
+    ticking at the same rate all fall in the same slots, so timer wakeups
+    stay flat as controllers are added. A step may run up to half a slot
+    early or late; one made due now (wake(), a zero delay) is not moved.
+    """
+
+    def __init__(self, workers=2, name="tick-scheduler", resolution=TICK_RESOLUTION):
+        self.name = name
+        self.resolution = resolution
+        # Returns from the timer wait (deadline reached or earlier deadline queued)
+        self.wakeups = 0
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._timer = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._timer_waiting = False
+        self._running = True
+        self._tasks = set()
+        self.stats_total = TickStats()
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"{name}-{i}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def spawn(self, gen, name=None, delay=0.0, metrics=None):
+        """Schedule a generator task; returns its Task handle"""
+        task = Task(gen, name or getattr(gen, '__name__', 'task'), self, metrics)
+        with self._lock:
+            self._tasks.add(task)
+            self._schedule(task, self._deadline(delay))
+        return task
+
+    def call_later(self, delay, callback, *args):
+        """Run a plain callback once after delay seconds"""
+        return self.spawn(_call_once(callback, args), getattr(callback, '__name__', 'callback'), delay)
+
+    def _deadline(self, delay):
+        """Deadline of a step delay seconds from now, rounded to the grid"""
+        now = time.monotonic()
+        if delay <= 0 or not self.resolution:
+            return now
+        # Nearest rather than next slot: a loop keeping its own cadence then
+        # stays in the same slot each period instead of drifting across one
+        return max(round((now + delay) / self.resolution) * self.resolution, now)
+
+    def _schedule(self, task, deadline):
+        """Queue the task's next step (lock held)"""
+        if not self._running:
+            return
+        task._generation += 1
+        task.state = SCHEDULED
+        heapq.heappush(self._heap, (deadline, next(self._counter), task, task._generation))
+        if self._heap[0][2] is task:
+            if self._timer_waiting:
+                self._timer.notify()
+            else:
+                self._idle.notify()
+
+    def wake(self, task):
+        """Move a parked or waiting task's next step to now"""
+        with self._lock:
+            if task.state == RUNNING:
+                task._wake_pending = True
+            elif task.state != DONE:
+                self._schedule(task, time.monotonic())
+
+    def _next(self):
+        """Block until a task is due; returns it, or None on shutdown"""
+        with self._lock:
+            while self._running:
+                if self._heap:
+                    now = time.monotonic()
+                    deadline = self._heap[0][0]
+                    if deadline <= now:
+                        _, _, task, generation = heapq.heappop(self._heap)
+                        if self._heap and not self._timer_waiting:
+                            self._idle.notify()
+                        if generation != task._generation or task.state != SCHEDULED:
+                            continue
+                        task.state = RUNNING
+                        if not task.cancelled:
+                            lag = now - deadline
+                            task.stats.record(lag)
+                            self.stats_total.record(lag)
+                        return task
+                    if not self._timer_waiting:
+                        self._timer_waiting = True
+                        try:
+                            self._timer.wait(deadline - now)
+                        finally:
+                            self._timer_waiting = False
+                            self.wakeups += 1
+                        continue
+                self._idle.wait()
+            return None
+
+    def _finish(self, task):
+        with self._lock:
+            task.state = DONE
+            self._tasks.discard(task)
+
+    def _worker(self):
+        while True:
+            task = self._next()
+            if task is None:
+                return
+            if task.cancelled:
+                self._finish(task)
+                continue
+            started = time.perf_counter()
+            try:
+                delay = next(task._gen)
+            except StopIteration:
+                self._finish(task)
+                continue
+            except Exception:
+                log.exception("Error in scheduled task %s", task.name)
+                self._finish(task)
+                continue
+            if task.metrics is not None:
+                task.metrics.observe(task.stats.last_lag, time.perf_counter() - started)
+            with self._lock:
+                if task.cancelled:
+                    task.state = DONE
+                    self._tasks.discard(task)
+                elif task._wake_pending:
+                    task._wake_pending = False
+                    self._schedule(task, time.monotonic())
+                elif delay is None:
+                    task.state = PARKED
+                else:
+                    self._schedule(task, self._deadline(delay))
+
+    def stats(self):
+        """Return aggregate and per-task tick lag"""
+        with self._lock:
+            tasks = {task.name: task.stats.as_dict() for task in self._tasks}
+            pending = len(self._heap)
+        return {
+            'workers': len(self._threads),
+            'resolution_ms': self.resolution * 1000,
+            'wakeups': self.wakeups,
+            'pending': pending,
+            'total': self.stats_total.as_dict(),
+            'tasks': tasks
+        }
+
+    def shutdown(self, timeout=1):
+        """Stop every worker; pending tasks are dropped"""
+        with self._lock:
+            self._running = False
+            self._heap.clear()
+            self._timer.notify_all()
+            self._idle.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the process-wide scheduler shared by every controller"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = TickScheduler()
+        return _default_scheduler
@@ -35,20 +35,62 @@ function createWindow() {
   });
 }
 
+// Backend state, driven by its stdout: 'starting' until the readiness line
+let serverState = { status: 'starting', port: 5000 };
+let serverReady;
+let resolveServerReady;
+const READY_PREFIX = 'NIZUA_READY ';
+// Give up waiting for the readiness line after this long
+const SERVER_READY_TIMEOUT = 30000;
+// Time left to the backend to drain requests and flush its files before it is killed
+const SERVER_STOP_TIMEOUT = 10000;
+let serverStopping = null;
+let quitting = false;
+
+function handleServerLine(line) {
+  if (line.startsWith(READY_PREFIX)) {
+    try {
+      const info = JSON.parse(line.slice(READY_PREFIX.length));
+      serverState = { status: 'running', ...info };
+    } catch (error) {
+      serverState = { status: 'running', port: 5000 };
+    }
+    console.log(`Python server ready in ${serverState.startup_ms} ms`);
+    resolveServerReady(serverState);
+    if (mainWindow) {
+      mainWindow.webContents.send('server-message', { type: 'ready', ...serverState });
+    }
+    return;
+  }
+  console.log(`Python server: ${line}`);
+}
+
 function startPythonServer() {
   const isDev = process.argv.includes('--dev');
   const serverScript = isDev
     ? path.join(__dirname, '../backend/server.py')
     : path.join(process.resourcesPath, 'server.exe');
 
+  // The backend stops cleanly when its stdin is closed (see stopPythonServer)
   const spawnArgs = isDev
-    ? ['python', [serverScript]]
-    : [serverScript];
+    ? ['python', [serverScript, '--dev', '--stop-on-stdin-eof']]
+    : [serverScript, ['--stop-on-stdin-eof']];
 
-  pythonProcess = spawn(...spawnArgs);
+  serverState = { status: 'starting', port: 5000 };
+  serverReady = new Promise((resolve) => { resolveServerReady = resolve; });
 
+  // NIZUA_SPAWN_TIME lets the backend include interpreter startup in its timing
+  pythonProcess = spawn(...spawnArgs, {
+    env: { ...process.env, NIZUA_SPAWN_TIME: String(Date.now()) }
+  });
+
+  // stdout arrives in arbitrary chunks: split it into lines
+  let pending = '';
   pythonProcess.stdout.on('data', (data) => {
-    console.log(`Python server: ${data}`);
+    pending += data.toString();
+    const lines = pending.split(/\r?\n/);
+    pending = lines.pop();
+    lines.filter((line) => line.length > 0).forEach(handleServerLine);
   });
 
   pythonProcess.stderr.on('data', (data) => {
@@ -57,15 +99,53 @@ function startPythonServer() {
 
   pythonProcess.on('close', (code) => {
     console.log(`Python server exited with code ${code}`);
+    serverState = { status: 'error', error: `Server exited with code ${code}` };
+    resolveServerReady(serverState);
   });
 }
 
+function isServerRunning() {
+  return Boolean(pythonProcess) && pythonProcess.exitCode === null && pythonProcess.signalCode === null;
+}
+
+// Graceful stop: on Windows, kill() is TerminateProcess and the backend would
+// lose its pending writes. Closing stdin lets it drain and flush, and it is
+// only killed if it has not exited after SERVER_STOP_TIMEOUT.
+function stopPythonServer() {
+  if (!isServerRunning()) {
+    return Promise.resolve();
+  }
+  if (!serverStopping) {
+    const proc = pythonProcess;
+    serverStopping = new Promise((resolve) => {
+      const timer = setTimeout(() => {
+        console.error('Python server did not stop in time, killing it');
+        proc.kill();
+      }, SERVER_STOP_TIMEOUT);
+      proc.once('exit', () => {
+        clearTimeout(timer);
+        serverStopping = null;
+        resolve();
+      });
+      proc.stdin.end();
+    });
+  }
+  return serverStopping;
+}
+
 ipcMain.handle('get-server-status', async () => {
-  try {
-    return { status: 'running', port: 5000 };
-  } catch (error) {
-    return { status: 'error', error: error.message };
+  return serverState;
+});
+
+// Resolves once the backend is ready (or has failed to start)
+ipcMain.handle('wait-server-ready', async () => {
+  if (!serverReady) {
+    return serverState;
   }
+  const timeout = new Promise((resolve) => {
+    setTimeout(() => resolve({ status: 'error', error: 'Server startup timed out' }), SERVER_READY_TIMEOUT);
+  });
+  return Promise.race([serverReady, timeout]);
 });
 
 ipcMain.handle('get-lobby-count', () => {
@@ -113,16 +193,22 @@ app.whenReady().then(() => {
 });
 
 app.on('window-all-closed', () => {
-  if (pythonProcess) {
-    pythonProcess.kill();
-  }
   if (process.platform !== 'darwin') {
+    // before-quit stops the backend
     app.quit();
+  } else {
+    stopPythonServer();
   }
 });
 
-app.on('before-quit', () => {
-  if (pythonProcess) {
-    pythonProcess.kill();
+app.on('before-quit', (event) => {
+  if (quitting || !isServerRunning()) {
+    return;
   }
+  // Hold the quit until the backend has exited
+  event.preventDefault();
+  stopPythonServer().then(() => {
+    quitting = true;
+    app.quit();
+  });
 });
@@ -3,6 +3,7 @@ const { contextBridge, ipcRenderer } = require('electron');
 // Expose des API sécurisées au renderer process
 contextBridge.exposeInMainWorld('electronAPI', {
   getServerStatus: () => ipcRenderer.invoke('get-server-status'),
+  waitServerReady: () => ipcRenderer.invoke('wait-server-ready'),
   getLobbyCount: () => ipcRenderer.invoke('get-lobby-count'),
   
   // Événements pour la communication avec le serveur Python
@@ -1,7 +1,13 @@
 // API Client Module - Handles all server communication
+
+// waitForJob gives up on a job after this long (a bulk connect can take minutes)
+const JOB_TIMEOUT = 5 * 60 * 1000;
+
 class ApiClient {
     constructor(baseUrl = 'http://127.0.0.1:5000') {
         this.baseUrl = baseUrl;
+        // job id -> resolve callback of waitForJob
+        this.jobWaiters = new Map();
     }
 
     async request(endpoint, options = {}) {
@@ -15,7 +21,9 @@ class ApiClient {
             });
 
             if (!response.ok) {
-                throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+                const error = new Error(`HTTP ${response.status}: ${response.statusText}`);
+                error.status = response.status;
+                throw error;
             }
 
             return await response.json();
@@ -30,12 +38,30 @@ class ApiClient {
         return this.request('/api/status');
     }
 
+    // 200 once the backend accepts requests, 503 while it is starting
+    async getReadiness() {
+        return this.request('/api/ready');
+    }
+
     // Controller endpoints
     async connectController(lobbyId = null) {
-        return this.request('/api/controller/connect', {
+        return this.runJob(this.request('/api/controller/connect', {
             method: 'POST',
             body: JSON.stringify({ lobby_id: lobbyId })
-        });
+        }));
+    }
+
+    // Connects several lobbies' controllers in parallel; a partial failure
+    // (HTTP 207) still returns the per-lobby results
+    async connectControllers(lobbyIds, concurrency = null) {
+        const body = { lobby_ids: lobbyIds };
+        if (concurrency !== null) {
+            body.concurrency = concurrency;
+        }
+        return this.runJob(this.request('/api/controller/connect-bulk', {
+            method: 'POST',
+            body: JSON.stringify(body)
+        }));
     }
 
     async disconnectController(lobbyId = null, controllerId = null) {
@@ -53,6 +79,28 @@ class ApiClient {
         return this.request('/api/controller/status-all');
     }
 
+    // Server-Sent Events stream of controller status changes.
+    // EventSource reconnects by itself and resumes from the last event id.
+    subscribeControllerEvents(onStatus, onSnapshot) {
+        const source = new EventSource(`${this.baseUrl}/api/controller/events`);
+
+        source.addEventListener('snapshot', (event) => {
+            onSnapshot(JSON.parse(event.data));
+        });
+        source.addEventListener('status', (event) => {
+            const { key, data } = JSON.parse(event.data);
+            onStatus(key, data);
+        });
+        source.addEventListener('job', (event) => {
+            this.settleJob(JSON.parse(event.data).data);
+        });
+        source.onerror = () => {
+            console.warn('Flux de statut interrompu, reconnexion...');
+        };
+
+        return source;
+    }
+
     async toggleMovement(lobbyId = null, controllerId = null, enabled = null) {
         return this.request('/api/controller/movement', {
             method: 'POST',
@@ -76,12 +124,78 @@ class ApiClient {
     }
 
     async selectClass(lobbyId = null, controllerId = null) {
-        return this.request('/api/controller/select-class', {
+        return this.runJob(this.request('/api/controller/select-class', {
             method: 'POST',
             body: JSON.stringify({ lobby_id: lobbyId, controller_id: controllerId })
+        }));
+    }
+
+    // Background jobs: long actions answer 202 with a job id right away and
+    // their completion is pushed over the event stream (polled as a fallback)
+    async runJob(startRequest) {
+        const started = await startRequest;
+        if (!started.job_id) {
+            return started;
+        }
+        const job = await this.waitForJob(started.job_id);
+        if (job.state === 'succeeded') {
+            return job.result;
+        }
+        if (job.result && job.result.error) {
+            return job.result;
+        }
+        return { error: job.error || `Job ${job.state}` };
+    }
+
+    // Resolves with the finished job. Rejects if the backend no longer knows
+    // the job (404 after a restart, any other 4xx) or after timeout ms;
+    // network errors and 5xx are retried on the next poll.
+    waitForJob(jobId, pollInterval = 2000, timeout = JOB_TIMEOUT) {
+        return new Promise((resolve, reject) => {
+            let timer = null;
+            let deadline = null;
+            const finish = (settle, value) => {
+                clearInterval(timer);
+                clearTimeout(deadline);
+                this.jobWaiters.delete(jobId);
+                settle(value);
+            };
+            const poll = () => {
+                this.getJob(jobId).then(job => this.settleJob(job)).catch((error) => {
+                    if (error.status && error.status < 500) {
+                        finish(reject, new Error(`Job ${jobId} introuvable (${error.message})`));
+                    }
+                });
+            };
+            timer = setInterval(poll, pollInterval);
+            deadline = setTimeout(() => {
+                finish(reject, new Error(`Job ${jobId} : délai dépassé`));
+            }, timeout);
+            this.jobWaiters.set(jobId, (job) => finish(resolve, job));
+            // The job may already be over before the waiter was registered
+            poll();
         });
     }
 
+    settleJob(job) {
+        if (!['succeeded', 'failed', 'cancelled'].includes(job.state)) {
+            return;
+        }
+        const resolve = this.jobWaiters.get(job.id);
+        if (resolve) {
+            this.jobWaiters.delete(job.id);
+            resolve(job);
+        }
+    }
+
+    async getJob(jobId) {
+        return this.request(`/api/jobs/${jobId}`);
+    }
+
+    async cancelJob(jobId) {
+        return this.request(`/api/jobs/${jobId}/cancel`, { method: 'POST' });
+    }
+
     // Settings endpoints
     async getGamepadConfig() {
         return this.request('/api/controller/config');
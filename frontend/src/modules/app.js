@@ -1,4 +1,7 @@
 // Main Application Module - Orchestrates all other modules
+const SERVER_READY_POLL_MS = 250;
+const SERVER_READY_ATTEMPTS = 120;
+
 class NizuaApp {
     constructor() {
         this.serverUrl = 'http://127.0.0.1:5000';
@@ -24,11 +27,13 @@ class NizuaApp {
         this.setupTabSystem();
         
         // Initialize server connection and settings
+        await this.waitForServer();
         await this.checkServerStatus();
         await this.settingsManager.loadSettings();
         await this.controllerManager.updateControllerStatus();
 
-        // Start periodic updates
+        // Controller status is pushed by the server, server status is polled
+        this.startStatusStream();
         this.startPeriodicUpdates();
 
         console.log('Nizua Loader initialized successfully');
@@ -141,6 +146,25 @@ class NizuaApp {
         }
     }
 
+    // Wait for the backend's readiness signal instead of guessing when it is up
+    async waitForServer() {
+        if (window.electronAPI && window.electronAPI.waitServerReady) {
+            const state = await window.electronAPI.waitServerReady();
+            if (state.status === 'running') {
+                return;
+            }
+        }
+        // Without Electron (or if it gave up), poll /api/ready for a while
+        for (let attempt = 0; attempt < SERVER_READY_ATTEMPTS; attempt++) {
+            try {
+                await window.apiClient.getReadiness();
+                return;
+            } catch (error) {
+                await new Promise((resolve) => setTimeout(resolve, SERVER_READY_POLL_MS));
+            }
+        }
+    }
+
     async checkServerStatus() {
         try {
             const status = await window.apiClient.getServerStatus();
@@ -156,10 +180,20 @@ class NizuaApp {
         this.uiManager.updateLobbyList(lobbies);
     }
 
+    startStatusStream() {
+        this.statusStream = window.apiClient.subscribeControllerEvents(
+            (lobbyId, status) => this.controllerManager.applyStatusUpdate(lobbyId, status),
+            (controllers) => this.controllerManager.applyStatusSnapshot(controllers)
+        );
+    }
+
     startPeriodicUpdates() {
         setInterval(() => {
             this.checkServerStatus();
-            this.controllerManager.updateControllerStatus();
+            // Fall back to polling only while the status stream is down
+            if (!this.statusStream || this.statusStream.readyState !== EventSource.OPEN) {
+                this.controllerManager.updateControllerStatus();
+            }
         }, 30000);
     }
 }
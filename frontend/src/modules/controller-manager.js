@@ -30,6 +30,30 @@ class ControllerManager {
         }
     }
 
+    // Status pushed by the server (SSE); only lobbies known to the UI are tracked
+    applyStatusUpdate(lobbyId, status) {
+        if (!this.controllerStatus.controllers[lobbyId]) {
+            return;
+        }
+        this.controllerStatus.controllers[lobbyId] = {
+            ...this.controllerStatus.controllers[lobbyId],
+            ...status
+        };
+        this.updateButtonStates();
+    }
+
+    applyStatusSnapshot(controllers) {
+        Object.keys(controllers || {}).forEach(lobbyId => {
+            if (this.controllerStatus.controllers[lobbyId]) {
+                this.controllerStatus.controllers[lobbyId] = {
+                    ...this.controllerStatus.controllers[lobbyId],
+                    ...controllers[lobbyId]
+                };
+            }
+        });
+        this.updateButtonStates();
+    }
+
     async toggleMovement() {
         const connectedControllers = this.getConnectedControllers();
         
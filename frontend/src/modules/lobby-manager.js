@@ -20,13 +20,17 @@ class LobbyManager {
             throw new Error(`Maximum ${this.maxLobbies} lobbies autorisés`);
         }
 
+        const newLobbyIds = [];
         for (let i = 0; i < requestedCount; i++) {
             const lobbyId = `lobby${this.lobbies.length + 1}`;
             this.lobbies.push(lobbyId);
             await this.createLobbyInstance(lobbyId);
-            await this.connectControllerForLobby(lobbyId);
+            newLobbyIds.push(lobbyId);
         }
 
+        // All controllers are provisioned in one request, in parallel on the server
+        await this.connectControllersForLobbies(newLobbyIds);
+
         this.updateLobbyDisplay();
         return requestedCount;
     }
@@ -406,18 +410,46 @@ class LobbyManager {
         }
     }
 
+    async connectControllersForLobbies(lobbyIds) {
+        try {
+            const result = await window.apiClient.connectControllers(lobbyIds);
+            
+            if (result.error) {
+                throw new Error(result.error);
+            }
+            
+            result.connected.forEach(lobbyId => this.onControllerConnected(lobbyId));
+            result.failed.forEach(lobbyId => {
+                console.error(`Erreur connexion manette pour ${lobbyId}:`, result.results[lobbyId].error);
+            });
+            
+            return result.connected.length;
+        } catch (error) {
+            console.error('Erreur lors de la connexion des manettes:', error);
+            return 0;
+        }
+    }
+
+    onControllerConnected(lobbyId) {
+        console.log(`Manette connectée pour ${lobbyId}`);
+        if (window.controllerManager) {
+            window.controllerManager.addController(lobbyId, {
+                controller_id: parseInt(lobbyId.replace('lobby', ''))
+            });
+        }
+        
+        // Start gamepad simulation
+        setTimeout(() => {
+            this.startGamepadSimulation(lobbyId);
+        }, 2000);
+    }
+
     async connectControllerForLobby(lobbyId) {
         try {
             const result = await window.apiClient.connectController(lobbyId);
             
             if (result.success) {
-                console.log(`Manette connectée pour ${lobbyId}`);
-                
-                // Start gamepad simulation
-                setTimeout(() => {
-                    this.startGamepadSimulation(lobbyId);
-                }, 2000);
-                
+                this.onControllerConnected(lobbyId);
                 return true;
             } else {
                 console.error(`Erreur connexion manette pour ${lobbyId}:`, result.error);
@@ -460,6 +492,14 @@ class LobbyManager {
         // Destroy session
         this.sessionManager.destroySession(lobbyId);
 
+        // Release the server-side controller for this lobby
+        window.apiClient.disconnectController(lobbyId).catch(error => {
+            console.error(`Erreur lors de la déconnexion de manette pour ${lobbyId}:`, error);
+        });
+        if (window.controllerManager) {
+            window.controllerManager.removeController(lobbyId);
+        }
+
         // Stop simulation
         if (this.simulationIntervals && this.simulationIntervals.has(lobbyId)) {
             clearInterval(this.simulationIntervals.get(lobbyId));